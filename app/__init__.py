@@ -3,6 +3,8 @@ import pymysql
 from flask import Flask, g, current_app
 from flask_login import LoginManager
 from config import config
+from app.services.metrics_service import MetricsService
+from app.migrations import run_migrations
 
 # Initialize Flask-Login
 login_manager = LoginManager()
@@ -10,15 +12,16 @@ login_manager = LoginManager()
 def get_db():
     """Get database connection from Flask g object or create new one"""
     if 'db' not in g:
-        g.db = pymysql.connect(
-            host=current_app.config['MYSQL_HOST'],
-            port=current_app.config['MYSQL_PORT'],
-            user=current_app.config['MYSQL_USER'],
-            password=current_app.config['MYSQL_PASSWORD'],
-            database=current_app.config['MYSQL_DATABASE'],
-            cursorclass=pymysql.cursors.DictCursor,
-            autocommit=False
-        )
+        with MetricsService.timed('db_connect'):
+            g.db = pymysql.connect(
+                host=current_app.config['MYSQL_HOST'],
+                port=current_app.config['MYSQL_PORT'],
+                user=current_app.config['MYSQL_USER'],
+                password=current_app.config['MYSQL_PASSWORD'],
+                database=current_app.config['MYSQL_DATABASE'],
+                cursorclass=pymysql.cursors.DictCursor,
+                autocommit=False
+            )
     return g.db
 
 def close_db(e=None):
@@ -28,56 +31,14 @@ def close_db(e=None):
         db.close()
 
 def init_db(app):
-    """Initialize database tables - drops and recreates all tables"""
+    """Apply any pending schema migrations (a cheap version check when current)"""
     with app.app_context():
         db = get_db()
-        cursor = db.cursor()
-        
-        # Disable foreign key checks to allow dropping tables in any order
-        cursor.execute("SET FOREIGN_KEY_CHECKS = 0")
-        
-        # Drop existing tables if they exist (drop in reverse order of dependencies)
-        cursor.execute("DROP TABLE IF EXISTS analyses")
-        cursor.execute("DROP TABLE IF EXISTS users")
-        
-        # Re-enable foreign key checks
-        cursor.execute("SET FOREIGN_KEY_CHECKS = 1")
-        
-        # Create users table
-        cursor.execute("""
-            CREATE TABLE users (
-                id INT AUTO_INCREMENT PRIMARY KEY,
-                username VARCHAR(80) UNIQUE NOT NULL,
-                email VARCHAR(120) UNIQUE NOT NULL,
-                password_hash VARCHAR(255) NOT NULL,
-                created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
-                updated_at DATETIME DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
-                INDEX idx_username (username),
-                INDEX idx_email (email)
-            ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci
-        """)
-        
-        # Create analyses table
-        cursor.execute("""
-            CREATE TABLE analyses (
-                id INT AUTO_INCREMENT PRIMARY KEY,
-                user_id INT NOT NULL,
-                filename VARCHAR(255) NOT NULL,
-                file_size BIGINT,
-                file_path VARCHAR(500),
-                total_rows BIGINT,
-                total_columns INT,
-                quality_score INT,
-                results_json TEXT,
-                created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE,
-                INDEX idx_user_id (user_id),
-                INDEX idx_created_at (created_at)
-            ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci
-        """)
-        
-        db.commit()
-        cursor.close()
+        run_migrations(
+            db,
+            lock_timeout=app.config['MIGRATION_LOCK_TIMEOUT'],
+            logger=app.logger
+        )
 
 def create_app(config_name='default'):
     """Application factory pattern"""
@@ -101,16 +62,57 @@ def create_app(config_name='default'):
     # Register database teardown
     app.teardown_appcontext(close_db)
 
-    # Initialize database tables
+    # Bring the database schema up to date
     try:
         init_db(app)
     except Exception as e:
         print(f"Warning: Could not initialize database: {e}")
 
     # Register blueprints
-    from app.routes import auth, api, main
+    from app.routes import auth, api, main, metrics
     app.register_blueprint(auth.bp)
     app.register_blueprint(api.bp)
     app.register_blueprint(main.bp)
+    app.register_blueprint(metrics.bp)
+
+    # Expire old uploads in the background; analysis rows are kept
+    if app.config['RETENTION_ENABLED'] and not app.testing:
+        from app.services.storage_service import StorageService
+        StorageService.start_retention(app)
+
+    # CSV parser engine and dialect sniffing
+    from app.services.csv_reader import CsvReader
+    CsvReader.configure(app.config)
+
+    # Analyses share one memory budget across workers
+    from app.services.memory_service import MemoryService
+    MemoryService.configure(app.config)
+
+    # Bounded cross-column profiles
+    from app.services.cross_column_service import CrossColumnService
+    CrossColumnService.configure(app.config)
+
+    # Progress records and cancel requests of running analyses, shared by workers
+    from app.services.progress_service import ProgressService
+    ProgressService.configure(app.config)
+
+    # Bounded, fail-fast Gemini calls
+    from app.services.gemini_client import GeminiClient
+    GeminiClient.configure(app.config)
+
+    # Request tracing with sampled export and a slow-request log
+    from app.services.trace_service import TraceService
+    TraceService.configure(app.config)
+    TraceService.init_app(app)
+
+    # Parsed uploads reused across a report's affected-rows and AI requests
+    from app.services.dataset_cache import DatasetCache
+    DatasetCache.configure(app.config)
+
+    # Deleted files are removed asynchronously; orphans are swept periodically
+    from app.services.reaper_service import ReaperService
+    ReaperService.configure(app.config)
+    if app.config['ORPHAN_SWEEP_ENABLED'] and not app.testing:
+        ReaperService.start_sweeper(app)
 
     return app
@@ -0,0 +1,315 @@
+import argparse
+import json
+import os
+import sys
+import time
+from glob import glob
+from flask import Flask
+from config import config
+from app.services.batch_service import BatchService
+from app.services.csv_reader import CsvReader
+from app.services.cross_column_service import CrossColumnService
+from app.services.file_service import FileService
+from app.services.json_service import JsonService
+from app.services.memory_service import MemoryService
+from app.services.rule_engine import RuleSet, RuleError
+
+
+def settings_for(config_name):
+    """Upper-case settings of a config class, shaped like app.config"""
+    config_class = config[config_name]
+    return {name: getattr(config_class, name) for name in dir(config_class) if name.isupper()}
+
+
+def expand_paths(patterns, allowed_extensions, compressed_extensions):
+    """
+    Files named by paths, directories and glob patterns, in order and without duplicates.
+
+    Directories and patterns only contribute files with a supported
+    extension; files named explicitly are always kept.
+    """
+    paths = []
+    seen = set()
+
+    def add(path):
+        path = os.path.realpath(path)
+        if path not in seen:
+            seen.add(path)
+            paths.append(path)
+
+    def supported(path):
+        return FileService.allowed_file(os.path.basename(path), allowed_extensions, compressed_extensions)
+
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            for root, dirs, names in os.walk(pattern):
+                dirs.sort()
+                for name in sorted(names):
+                    if supported(name):
+                        add(os.path.join(root, name))
+        elif any(char in pattern for char in '*?['):
+            for path in sorted(glob(pattern, recursive=True)):
+                if os.path.isfile(path) and supported(path):
+                    add(path)
+        else:
+            add(pattern)
+
+    return paths
+
+
+def file_key(path):
+    """(path, size, mtime) identifying one version of a file"""
+    stat = os.stat(path)
+    return path, stat.st_size, stat.st_mtime_ns
+
+
+def completed_keys(output_path):
+    """Keys of files a previous run already analyzed successfully into output_path"""
+    done = set()
+    if not os.path.exists(output_path):
+        return done
+
+    with open(output_path, 'rb') as handle:
+        for line in handle:
+            try:
+                record = JsonService.loads(line)
+            except ValueError:
+                # A line cut off by an interrupted run
+                continue
+            if record.get('success'):
+                done.add((record['path'], record['fileSize'], record['mtime']))
+
+    return done
+
+
+def open_output(output_path, resume):
+    """Binary stream for NDJSON records: stdout, a fresh file, or a file being resumed"""
+    if output_path is None:
+        return sys.stdout.buffer
+
+    if not resume:
+        return open(output_path, 'wb')
+
+    handle = open(output_path, 'ab+')
+    if handle.tell() > 0:
+        handle.seek(-1, os.SEEK_END)
+        if handle.read(1) != b'\n':
+            handle.write(b'\n')
+    return handle
+
+
+def load_rules(rules_path):
+    """Rule definitions from a JSON file, validated; None for the built-in rules"""
+    if rules_path is None:
+        return None
+
+    with open(rules_path) as handle:
+        rules = json.load(handle)
+    if not isinstance(rules, list):
+        raise RuleError('Rules file must contain a list of rules')
+    for rule in rules:
+        RuleSet.validate(rule)
+    return rules
+
+
+def database_app(config_name):
+    """
+    Minimal Flask app giving the models a database connection.
+
+    Unlike create_app it registers no routes and starts none of the
+    background sweeps, which would otherwise run against the upload folder.
+    """
+    from app import close_db, init_db
+
+    app = Flask(__name__)
+    app.config.from_object(config[config_name])
+    app.teardown_appcontext(close_db)
+    init_db(app)
+    return app
+
+
+def push_analyses(app, user_id, records, rules=None):
+    """Save successful NDJSON records, analyzed with rules, as analyses of user_id in one transaction"""
+    from app.models.analysis import Analysis
+
+    analyses = []
+    for record in records:
+        results = record['analysis']
+        # The app does not own these files: no file_path, so deleting the
+        # analysis never removes the source file
+        analysis = Analysis(
+            user_id=user_id,
+            filename=record['filename'],
+            file_size=results['fileSizeBytes'],
+            total_rows=results['totalRows'],
+            total_columns=results['totalColumns'],
+            quality_score=results['qualityScore'],
+            content_hash=record['contentHash']
+        )
+        analysis.set_results(results)
+        analysis.set_rules(rules)
+        analyses.append(analysis)
+
+    with app.app_context():
+        Analysis.save_many(analyses)
+
+
+def analyze(args):
+    """Run the analyze command; returns the process exit code"""
+    settings = settings_for(args.config)
+    CsvReader.configure(settings)
+    MemoryService.configure(settings)
+    CrossColumnService.configure(settings)
+    # The pool size bounds a CLI run; it does not queue on the web workers' ledger
+    MemoryService.LEDGER_PATH = None
+
+    try:
+        rules = load_rules(args.rules)
+    except (OSError, ValueError, RuleError) as exc:
+        print(f'Invalid rules file: {exc}', file=sys.stderr)
+        return 2
+
+    app = None
+    if args.push_db:
+        try:
+            app = database_app(args.config)
+        except Exception as exc:
+            print(f'Database unavailable: {exc}', file=sys.stderr)
+            return 1
+
+    paths = expand_paths(args.paths, settings['ALLOWED_EXTENSIONS'], settings['COMPRESSED_UPLOAD_EXTENSIONS'])
+    if args.output:
+        # The output is NDJSON itself; never analyze it when it sits among the inputs
+        paths = [path for path in paths if path != os.path.realpath(args.output)]
+    done = completed_keys(args.output) if args.resume else set()
+
+    file_infos = []
+    failed = []
+    skipped = 0
+    for path in paths:
+        try:
+            key = file_key(path)
+        except OSError as exc:
+            failed.append({'path': path, 'filename': os.path.basename(path), 'success': False, 'error': str(exc)})
+            continue
+        if key in done:
+            skipped += 1
+            continue
+        file_infos.append({'file_id': path, 'filename': os.path.basename(path), 'file_path': path,
+                           'file_size': key[1], 'mtime': key[2]})
+
+    started = time.perf_counter()
+    output = open_output(args.output, args.resume)
+    succeeded = 0
+    pending = []
+    push_failed = False
+
+    def write(record):
+        output.write(JsonService.dumps(record) + b'\n')
+        output.flush()
+
+    def flush_pending():
+        nonlocal push_failed, succeeded
+        if not pending:
+            return
+        try:
+            push_analyses(app, args.user_id, pending, rules=rules)
+        except Exception as exc:
+            print(f'Saving {len(pending)} analyses failed: {exc}', file=sys.stderr)
+            push_failed = True
+            succeeded -= len(pending)
+            for record in pending:
+                record.update({'success': False, 'error': f'Saving results failed: {exc}'})
+        # Records are written once saved, so --resume never skips an unsaved file
+        for record in pending:
+            write(record)
+        pending.clear()
+
+    try:
+        for record in failed:
+            write(record)
+
+        for info, results, content_hash, error in BatchService.analyze_many(
+                file_infos, args.workers, rules=rules, persist_state=False):
+            record = {
+                'path': info['file_path'],
+                'filename': info['filename'],
+                'fileSize': info['file_size'],
+                'mtime': info['mtime'],
+                'success': error is None
+            }
+
+            if error is not None:
+                record['error'] = error
+                failed.append(record)
+                write(record)
+                continue
+
+            succeeded += 1
+            record['contentHash'] = content_hash
+            record['analysis'] = results
+
+            if app is None:
+                write(record)
+            else:
+                pending.append(record)
+                if len(pending) >= args.push_batch:
+                    flush_pending()
+
+        if app is not None:
+            flush_pending()
+    finally:
+        if output is not sys.stdout.buffer:
+            output.close()
+
+    elapsed = time.perf_counter() - started
+    print(f'{succeeded} analyzed, {len(failed)} failed, {skipped} skipped in {elapsed:.1f}s', file=sys.stderr)
+
+    return 1 if failed or push_failed else 0
+
+
+def build_parser():
+    """Argument parser for python -m app.cli"""
+    parser = argparse.ArgumentParser(prog='python -m app.cli', description='Data quality analysis without the web app')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    command = commands.add_parser(
+        'analyze',
+        help='Analyze files in parallel and write one NDJSON result per file',
+        description='Analyze files in a process pool, writing one NDJSON record per file as it finishes.'
+    )
+    command.add_argument('paths', nargs='+',
+                         help='Files, directories or glob patterns (quote patterns to use recursive **)')
+    command.add_argument('-o', '--output', help='NDJSON output file (default: stdout)')
+    command.add_argument('-w', '--workers', type=int, default=os.cpu_count() or 1,
+                         help='Worker processes (default: CPU count)')
+    command.add_argument('--resume', action='store_true',
+                         help='Append to --output, skipping files it already holds a successful result for')
+    command.add_argument('--rules', help='JSON file with a list of rule definitions (default: built-in rules)')
+    command.add_argument('--config', default='default', choices=sorted(config),
+                         help='Configuration to take settings and database credentials from')
+    command.add_argument('--push-db', action='store_true',
+                         help='Also save each result to the analyses table of --user-id')
+    command.add_argument('--user-id', type=int, help='Owner of the saved analyses (required with --push-db)')
+    command.add_argument('--push-batch', type=int, default=100,
+                         help='Analyses saved per transaction (default: 100)')
+
+    return parser
+
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+
+    if args.resume and not args.output:
+        parser.error('--resume requires --output')
+    if args.push_db and args.user_id is None:
+        parser.error('--push-db requires --user-id')
+    if args.workers < 1 or args.push_batch < 1:
+        parser.error('--workers and --push-batch must be at least 1')
+
+    return analyze(args)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,230 @@
+"""Versioned, forward-only schema migrations.
+
+Each migration is applied once and recorded in schema_migrations. Steps are
+written to be idempotent (IF NOT EXISTS / information_schema checks) because
+MySQL DDL commits implicitly and a migration may be interrupted half way.
+"""
+import pymysql
+
+LOCK_NAME = 'delta_schema_migrations'
+
+
+class MigrationError(Exception):
+    """Raised when migrations cannot be applied"""
+
+
+def _column_exists(cursor, table, column):
+    cursor.execute("""
+        SELECT COUNT(*) AS found FROM information_schema.COLUMNS
+        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND COLUMN_NAME = %s
+    """, (table, column))
+    return cursor.fetchone()['found'] > 0
+
+
+def _column_type(cursor, table, column):
+    cursor.execute("""
+        SELECT DATA_TYPE AS data_type FROM information_schema.COLUMNS
+        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND COLUMN_NAME = %s
+    """, (table, column))
+    row = cursor.fetchone()
+    return row['data_type'].lower() if row else None
+
+
+def _index_exists(cursor, table, index):
+    cursor.execute("""
+        SELECT COUNT(*) AS found FROM information_schema.STATISTICS
+        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND INDEX_NAME = %s
+    """, (table, index))
+    return cursor.fetchone()['found'] > 0
+
+
+def _constraint_exists(cursor, table, constraint):
+    cursor.execute("""
+        SELECT COUNT(*) AS found FROM information_schema.TABLE_CONSTRAINTS
+        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND CONSTRAINT_NAME = %s
+    """, (table, constraint))
+    return cursor.fetchone()['found'] > 0
+
+
+def add_column(table, column, definition):
+    """Step that adds a column unless it already exists"""
+    def step(cursor):
+        if not _column_exists(cursor, table, column):
+            cursor.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+    return step
+
+
+def modify_column(table, column, definition):
+    """Step that redefines a column unless it already has the definition's type"""
+    data_type = definition.split()[0].lower()
+
+    def step(cursor):
+        if _column_type(cursor, table, column) != data_type:
+            cursor.execute(f"ALTER TABLE {table} MODIFY COLUMN {column} {definition}")
+    return step
+
+
+def add_index(table, index, columns):
+    """Step that adds an index unless it already exists"""
+    def step(cursor):
+        if not _index_exists(cursor, table, index):
+            cursor.execute(f"ALTER TABLE {table} ADD INDEX {index} ({columns})")
+    return step
+
+
+def add_foreign_key(table, constraint, definition):
+    """Step that adds a foreign key unless it already exists"""
+    def step(cursor):
+        if not _constraint_exists(cursor, table, constraint):
+            cursor.execute(f"ALTER TABLE {table} ADD CONSTRAINT {constraint} {definition}")
+    return step
+
+
+# (version, name, steps) - append only, never edit an applied migration
+MIGRATIONS = [
+    (1, 'create users and analyses', [
+        """
+        CREATE TABLE IF NOT EXISTS users (
+            id INT AUTO_INCREMENT PRIMARY KEY,
+            username VARCHAR(80) UNIQUE NOT NULL,
+            email VARCHAR(120) UNIQUE NOT NULL,
+            password_hash VARCHAR(255) NOT NULL,
+            created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+            updated_at DATETIME DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+            INDEX idx_username (username),
+            INDEX idx_email (email)
+        ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS analyses (
+            id INT AUTO_INCREMENT PRIMARY KEY,
+            user_id INT NOT NULL,
+            filename VARCHAR(255) NOT NULL,
+            file_size BIGINT,
+            file_path VARCHAR(500),
+            total_rows BIGINT,
+            total_columns INT,
+            quality_score INT,
+            results_json TEXT,
+            created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE,
+            INDEX idx_user_id (user_id),
+            INDEX idx_created_at (created_at)
+        ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci
+        """
+    ]),
+    (2, 'analysis lineage', [
+        add_column('analyses', 'parent_id', 'INT NULL'),
+        add_column('analyses', 'content_hash', 'CHAR(64)'),
+        add_index('analyses', 'idx_parent_id', 'parent_id'),
+        add_foreign_key('analyses', 'fk_analyses_parent',
+                        'FOREIGN KEY (parent_id) REFERENCES analyses(id) ON DELETE SET NULL')
+    ]),
+    (3, 'quality rules', [
+        """
+        CREATE TABLE IF NOT EXISTS quality_rules (
+            id INT AUTO_INCREMENT PRIMARY KEY,
+            user_id INT NOT NULL,
+            name VARCHAR(255) NOT NULL,
+            definition_json TEXT NOT NULL,
+            enabled TINYINT(1) NOT NULL DEFAULT 1,
+            created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE,
+            INDEX idx_user_id (user_id)
+        ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci
+        """
+    ]),
+    (4, 'index analyses by user and date', [
+        add_index('analyses', 'idx_user_created', 'user_id, created_at')
+    ]),
+    (5, 'analysis version for etags', [
+        add_column('analyses', 'version', 'INT NOT NULL DEFAULT 1')
+    ]),
+    (6, 'rules each analysis was produced with', [
+        add_column('analyses', 'rules_json', 'MEDIUMTEXT NULL')
+    ]),
+    # TEXT holds 64KB; results of wide files with cross-column profiles exceed it
+    (7, 'widen analysis results', [
+        modify_column('analyses', 'results_json', 'LONGTEXT')
+    ]),
+]
+
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+
+def current_version(db):
+    """Highest applied migration version, or 0 on a fresh database"""
+    cursor = db.cursor()
+    try:
+        cursor.execute("SELECT MAX(version) AS version FROM schema_migrations")
+        row = cursor.fetchone()
+        return row['version'] or 0
+    except pymysql.err.ProgrammingError:
+        # schema_migrations does not exist yet
+        return 0
+    finally:
+        cursor.close()
+
+
+def run_migrations(db, lock_timeout=60, logger=None):
+    """
+    Bring the schema up to LATEST_VERSION.
+
+    Workers that find the schema current return after a single SELECT. Only
+    one process applies pending migrations, serialized by a MySQL advisory
+    lock; the others wait and then see the new version.
+
+    Returns:
+        The schema version after running
+    """
+    version = current_version(db)
+    if version >= LATEST_VERSION:
+        return version
+
+    cursor = db.cursor()
+    try:
+        cursor.execute("SELECT GET_LOCK(%s, %s) AS acquired", (LOCK_NAME, lock_timeout))
+        if cursor.fetchone()['acquired'] != 1:
+            raise MigrationError('Timed out waiting for the schema migration lock')
+
+        try:
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS schema_migrations (
+                    version INT PRIMARY KEY,
+                    name VARCHAR(255) NOT NULL,
+                    applied_at DATETIME DEFAULT CURRENT_TIMESTAMP
+                ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci
+            """)
+
+            # Another worker may have finished while we waited for the lock
+            version = current_version(db)
+
+            for migration_version, name, steps in MIGRATIONS:
+                if migration_version <= version:
+                    continue
+
+                if logger:
+                    logger.info('Applying schema migration %s: %s', migration_version, name)
+
+                for step in steps:
+                    if callable(step):
+                        step(cursor)
+                    else:
+                        cursor.execute(step)
+
+                cursor.execute(
+                    "INSERT INTO schema_migrations (version, name) VALUES (%s, %s)",
+                    (migration_version, name)
+                )
+                db.commit()
+                version = migration_version
+        finally:
+            cursor.execute("SELECT RELEASE_LOCK(%s)", (LOCK_NAME,))
+            cursor.fetchall()
+
+        return version
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        cursor.close()
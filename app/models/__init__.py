@@ -1,5 +1,6 @@
 from app.models.user import User
 from app.models.analysis import Analysis
+from app.models.rule import Rule
 
-__all__ = ['User', 'Analysis']
+__all__ = ['User', 'Analysis', 'Rule']
 
@@ -1,15 +1,19 @@
 import os
+import hashlib
 from datetime import datetime
-import json
 from flask import current_app, g
 from app import get_db
+from app.services.metrics_service import MetricsService
+from app.services.reaper_service import ReaperService
+from app.services.json_service import JsonService
 
 class Analysis:
     """Analysis results model"""
     
     def __init__(self, id=None, user_id=None, filename=None, file_size=None,
                  file_path=None, total_rows=None, total_columns=None, 
-                 quality_score=None, results_json=None, created_at=None):
+                 quality_score=None, results_json=None, created_at=None,
+                 parent_id=None, content_hash=None, version=1, rules_json=None):
         self.id = id
         self.user_id = user_id
         self.filename = filename
@@ -20,19 +24,39 @@ class Analysis:
         self.quality_score = quality_score
         self.results_json = results_json
         self.created_at = created_at
+        self.parent_id = parent_id
+        self.content_hash = content_hash
+        self.version = version
+        self.rules_json = rules_json
 
     def set_results(self, results_dict):
         """Store results dictionary as JSON"""
-        self.results_json = json.dumps(results_dict)
+        self.results_json = JsonService.dumps(results_dict).decode('utf-8')
 
     def get_results(self):
         """Retrieve results dictionary from JSON"""
         if self.results_json:
-            return json.loads(self.results_json)
+            with MetricsService.timed('results_decode'):
+                return JsonService.loads(self.results_json)
         return {}
 
+    def set_rules(self, rules):
+        """Keep the rule definitions the analysis was produced with (None for the built-in rules)"""
+        self.rules_json = JsonService.dumps(rules).decode('utf-8')
+
+    def get_rules(self, default=None):
+        """Rule definitions the analysis was produced with; default for analyses saved before they were kept"""
+        if self.rules_json is None:
+            return default
+        return JsonService.loads(self.rules_json)
+
     def save(self):
         """Save analysis to database (INSERT or UPDATE)"""
+        with MetricsService.timed('analysis_save'):
+            return self._save()
+
+    def _save(self):
+        """Run the INSERT or UPDATE for save()"""
         db = get_db()
         cursor = db.cursor()
         
@@ -42,11 +66,13 @@ class Analysis:
                 cursor.execute("""
                     INSERT INTO analyses 
                     (user_id, filename, file_size, file_path, total_rows, 
-                     total_columns, quality_score, results_json, created_at)
-                    VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
+                     total_columns, quality_score, results_json, created_at,
+                     parent_id, content_hash, rules_json)
+                    VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
                 """, (self.user_id, self.filename, self.file_size, self.file_path,
                       self.total_rows, self.total_columns, self.quality_score,
-                      self.results_json, datetime.utcnow()))
+                      self.results_json, datetime.utcnow(), self.parent_id,
+                      self.content_hash, self.rules_json))
                 self.id = cursor.lastrowid
             else:
                 # UPDATE existing analysis
@@ -54,11 +80,14 @@ class Analysis:
                     UPDATE analyses 
                     SET user_id = %s, filename = %s, file_size = %s, file_path = %s,
                         total_rows = %s, total_columns = %s, quality_score = %s,
-                        results_json = %s
+                        results_json = %s, parent_id = %s, content_hash = %s,
+                        rules_json = %s, version = version + 1
                     WHERE id = %s
                 """, (self.user_id, self.filename, self.file_size, self.file_path,
                       self.total_rows, self.total_columns, self.quality_score,
-                      self.results_json, self.id))
+                      self.results_json, self.parent_id, self.content_hash,
+                      self.rules_json, self.id))
+                self.version = (self.version or 1) + 1
             
             db.commit()
             return True
@@ -68,8 +97,49 @@ class Analysis:
         finally:
             cursor.close()
 
+    @classmethod
+    def save_many(cls, analyses):
+        """INSERT several new analyses of one user in a single transaction"""
+        if not analyses:
+            return True
+
+        db = get_db()
+        cursor = db.cursor()
+        created_at = datetime.utcnow()
+        ids = []
+
+        try:
+            with MetricsService.timed('analysis_save_many'):
+                # One INSERT per row: the ids of a multi-row INSERT need not be
+                # consecutive under InnoDB's interleaved auto-increment locking
+                for a in analyses:
+                    cursor.execute("""
+                        INSERT INTO analyses 
+                        (user_id, filename, file_size, file_path, total_rows, 
+                         total_columns, quality_score, results_json, created_at,
+                         parent_id, content_hash, rules_json)
+                        VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+                    """, (a.user_id, a.filename, a.file_size, a.file_path,
+                          a.total_rows, a.total_columns, a.quality_score,
+                          a.results_json, created_at, a.parent_id, a.content_hash,
+                          a.rules_json))
+                    ids.append(cursor.lastrowid)
+
+                db.commit()
+
+            for analysis, analysis_id in zip(analyses, ids):
+                analysis.id = analysis_id
+                analysis.created_at = created_at
+
+            return True
+        except Exception as e:
+            db.rollback()
+            raise e
+        finally:
+            cursor.close()
+
     def delete(self):
-        """Delete analysis from database"""
+        """Delete analysis from database and queue its files for removal"""
         if self.id is None:
             return False
         
@@ -79,36 +149,47 @@ class Analysis:
         try:
             cursor.execute("DELETE FROM analyses WHERE id = %s", (self.id,))
             db.commit()
-            return True
         except Exception as e:
             db.rollback()
             raise e
         finally:
             cursor.close()
 
+        if self.file_path:
+            ReaperService.enqueue(ReaperService.upload_paths(self.file_path))
+        return True
+
     @classmethod
-    def get_by_id(cls, analysis_id, user_id=None):
-        """Get analysis by ID, optionally filtered by user_id"""
+    def get_by_id(cls, analysis_id, user_id=None, include_results=True):
+        """Get analysis by ID, optionally filtered by user_id
+
+        With include_results=False the (large) results_json column is not
+        fetched; call load_results() once it is actually needed.
+        """
         db = get_db()
         cursor = db.cursor()
+        results_column = 'results_json' if include_results else 'NULL AS results_json'
         
         try:
-            if user_id is not None:
-                cursor.execute("""
-                    SELECT id, user_id, filename, file_size, file_path, 
-                           total_rows, total_columns, quality_score, 
-                           results_json, created_at
-                    FROM analyses WHERE id = %s AND user_id = %s
-                """, (analysis_id, user_id))
-            else:
-                cursor.execute("""
-                    SELECT id, user_id, filename, file_size, file_path, 
-                           total_rows, total_columns, quality_score, 
-                           results_json, created_at
-                    FROM analyses WHERE id = %s
-                """, (analysis_id,))
+            with MetricsService.timed('analysis_get'):
+                if user_id is not None:
+                    cursor.execute(f"""
+                        SELECT id, user_id, filename, file_size, file_path, 
+                               total_rows, total_columns, quality_score, 
+                               {results_column}, created_at, parent_id, content_hash,
+                               version, rules_json
+                        FROM analyses WHERE id = %s AND user_id = %s
+                    """, (analysis_id, user_id))
+                else:
+                    cursor.execute(f"""
+                        SELECT id, user_id, filename, file_size, file_path, 
+                               total_rows, total_columns, quality_score, 
+                               {results_column}, created_at, parent_id, content_hash,
+                               version, rules_json
+                        FROM analyses WHERE id = %s
+                    """, (analysis_id,))
             
-            row = cursor.fetchone()
+                row = cursor.fetchone()
             
             if row:
                 return cls(
@@ -121,12 +202,57 @@ class Analysis:
                     total_columns=row['total_columns'],
                     quality_score=row['quality_score'],
                     results_json=row['results_json'],
-                    created_at=row['created_at']
+                    created_at=row['created_at'],
+                    parent_id=row['parent_id'],
+                    content_hash=row['content_hash'],
+                    version=row['version'],
+                    rules_json=row['rules_json']
                 )
             return None
         finally:
             cursor.close()
 
+    def load_results(self):
+        """Fetch results_json for an analysis loaded without it"""
+        if self.results_json is not None or self.id is None:
+            return self.results_json
+
+        db = get_db()
+        cursor = db.cursor()
+
+        try:
+            with MetricsService.timed('analysis_load_results'):
+                cursor.execute("SELECT results_json FROM analyses WHERE id = %s", (self.id,))
+                row = cursor.fetchone()
+            self.results_json = row['results_json'] if row else None
+            return self.results_json
+        finally:
+            cursor.close()
+
+    def etag(self, representation='results'):
+        """Strong ETag for one representation of this analysis"""
+        return f'analysis-{self.id}-v{self.version}-{representation}'
+
+    @classmethod
+    def history_etag(cls, user_id, limit=20):
+        """Strong ETag for a user's history page, from ids and versions only"""
+        db = get_db()
+        cursor = db.cursor()
+
+        try:
+            cursor.execute("""
+                SELECT id, version FROM analyses
+                WHERE user_id = %s
+                ORDER BY created_at DESC
+                LIMIT %s
+            """, (user_id, limit))
+            digest = hashlib.sha1(
+                ','.join(f"{row['id']}.{row['version']}" for row in cursor.fetchall()).encode()
+            ).hexdigest()
+            return f'history-{user_id}-{digest}'
+        finally:
+            cursor.close()
+
     @classmethod
     def get_by_user_id(cls, user_id, limit=20):
         """Get analyses by user_id, ordered by created_at DESC"""
@@ -137,7 +263,8 @@ class Analysis:
             cursor.execute("""
                 SELECT id, user_id, filename, file_size, file_path, 
                        total_rows, total_columns, quality_score, 
-                       results_json, created_at
+                       results_json, created_at, parent_id, content_hash,
+                       version
                 FROM analyses 
                 WHERE user_id = %s
                 ORDER BY created_at DESC
@@ -158,7 +285,10 @@ class Analysis:
                     total_columns=row['total_columns'],
                     quality_score=row['quality_score'],
                     results_json=row['results_json'],
-                    created_at=row['created_at']
+                    created_at=row['created_at'],
+                    parent_id=row['parent_id'],
+                    content_hash=row['content_hash'],
+                    version=row['version']
                 ))
             
             return analyses
@@ -167,7 +297,7 @@ class Analysis:
 
     @classmethod
     def delete_all_for_user(cls, user_id):
-        """Delete all analyses and associated files for a user.
+        """Delete all analyses for a user; their files are removed in the background.
 
         Returns:
             int: Number of analyses deleted.
@@ -180,32 +310,43 @@ class Analysis:
                 "SELECT file_path FROM analyses WHERE user_id = %s",
                 (user_id,)
             )
-            rows = cursor.fetchall()
-
-            file_paths = [row.get('file_path') for row in rows if row.get('file_path')]
-
-            for path in file_paths:
-                try:
-                    if path and os.path.exists(path):
-                        os.remove(path)
-                except OSError as exc:
-                    try:
-                        current_app.logger.warning(
-                            'Failed to remove analysis file %s: %s', path, exc
-                        )
-                    except Exception:
-                        pass
+            file_paths = [row['file_path'] for row in cursor.fetchall() if row.get('file_path')]
 
             cursor.execute("DELETE FROM analyses WHERE user_id = %s", (user_id,))
             deleted_count = cursor.rowcount
             db.commit()
-            return deleted_count
         except Exception as exc:
             db.rollback()
             raise exc
         finally:
             cursor.close()
 
+        # Only after the commit, and outside the transaction
+        ReaperService.enqueue(path for file_path in file_paths
+                              for path in ReaperService.upload_paths(file_path))
+        return deleted_count
+
+    @classmethod
+    def referenced_file_paths(cls, file_paths, chunk_size=500):
+        """Subset of file_paths still referenced by some analysis"""
+        file_paths = list(file_paths)
+        db = get_db()
+        cursor = db.cursor()
+        referenced = set()
+
+        try:
+            for start in range(0, len(file_paths), chunk_size):
+                chunk = file_paths[start:start + chunk_size]
+                placeholders = ', '.join(['%s'] * len(chunk))
+                cursor.execute(
+                    f"SELECT file_path FROM analyses WHERE file_path IN ({placeholders})",
+                    chunk
+                )
+                referenced.update(row['file_path'] for row in cursor.fetchall())
+            return referenced
+        finally:
+            cursor.close()
+
     def to_dict(self, include_results=False):
         """Convert analysis to dictionary"""
         data = {
@@ -216,7 +357,8 @@ class Analysis:
             'total_columns': self.total_columns,
             'quality_score': self.quality_score,
             'created_at': self.created_at.isoformat() if self.created_at else None,
-            'timestamp': self.created_at.isoformat() if self.created_at else None
+            'timestamp': self.created_at.isoformat() if self.created_at else None,
+            'parent_id': self.parent_id
         }
 
         if include_results:
@@ -0,0 +1,136 @@
+from datetime import datetime
+import json
+from app import get_db
+from app.services.rule_engine import DEFAULT_RULES
+
+class Rule:
+    """User-defined data quality rule model"""
+
+    def __init__(self, id=None, user_id=None, name=None, definition_json=None,
+                 enabled=True, created_at=None):
+        self.id = id
+        self.user_id = user_id
+        self.name = name
+        self.definition_json = definition_json
+        self.enabled = enabled
+        self.created_at = created_at
+
+    def set_definition(self, definition):
+        """Store rule definition dictionary as JSON"""
+        self.definition_json = json.dumps(definition)
+
+    def get_definition(self):
+        """Retrieve the rule definition, keyed by a stable rule id"""
+        definition = json.loads(self.definition_json) if self.definition_json else {}
+        definition['id'] = f'user_{self.id}'
+        if self.name and not definition.get('name'):
+            definition['name'] = self.name
+        return definition
+
+    def save(self):
+        """Save rule to database (INSERT or UPDATE)"""
+        db = get_db()
+        cursor = db.cursor()
+
+        try:
+            if self.id is None:
+                cursor.execute("""
+                    INSERT INTO quality_rules (user_id, name, definition_json, enabled, created_at)
+                    VALUES (%s, %s, %s, %s, %s)
+                """, (self.user_id, self.name, self.definition_json, self.enabled,
+                      datetime.utcnow()))
+                self.id = cursor.lastrowid
+            else:
+                cursor.execute("""
+                    UPDATE quality_rules
+                    SET name = %s, definition_json = %s, enabled = %s
+                    WHERE id = %s
+                """, (self.name, self.definition_json, self.enabled, self.id))
+
+            db.commit()
+            return True
+        except Exception as e:
+            db.rollback()
+            raise e
+        finally:
+            cursor.close()
+
+    def delete(self):
+        """Delete rule from database"""
+        if self.id is None:
+            return False
+
+        db = get_db()
+        cursor = db.cursor()
+
+        try:
+            cursor.execute("DELETE FROM quality_rules WHERE id = %s", (self.id,))
+            db.commit()
+            return True
+        except Exception as e:
+            db.rollback()
+            raise e
+        finally:
+            cursor.close()
+
+    @classmethod
+    def get_by_id(cls, rule_id, user_id):
+        """Get a rule by ID for the given user"""
+        db = get_db()
+        cursor = db.cursor()
+
+        try:
+            cursor.execute("""
+                SELECT id, user_id, name, definition_json, enabled, created_at
+                FROM quality_rules WHERE id = %s AND user_id = %s
+            """, (rule_id, user_id))
+            row = cursor.fetchone()
+
+            if row:
+                return cls(**row)
+            return None
+        finally:
+            cursor.close()
+
+    @classmethod
+    def get_by_user_id(cls, user_id):
+        """Get all rules defined by a user, oldest first"""
+        db = get_db()
+        cursor = db.cursor()
+
+        try:
+            cursor.execute("""
+                SELECT id, user_id, name, definition_json, enabled, created_at
+                FROM quality_rules
+                WHERE user_id = %s
+                ORDER BY id
+            """, (user_id,))
+            return [cls(**row) for row in cursor.fetchall()]
+        finally:
+            cursor.close()
+
+    @classmethod
+    def rules_for_user(cls, user_id):
+        """
+        Rule definitions to evaluate for a user's analyses.
+
+        Returns None (built-in rules only) when the user has no enabled
+        custom rules, so existing analyses keep their default behaviour.
+        """
+        custom = [rule.get_definition() for rule in cls.get_by_user_id(user_id) if rule.enabled]
+        if not custom:
+            return None
+        return list(DEFAULT_RULES) + custom
+
+    def to_dict(self):
+        """Convert rule to dictionary"""
+        return {
+            'id': self.id,
+            'name': self.name,
+            'enabled': bool(self.enabled),
+            'definition': self.get_definition(),
+            'created_at': self.created_at.isoformat() if self.created_at else None
+        }
+
+    def __repr__(self):
+        return f'<Rule {self.id}: {self.name}>'
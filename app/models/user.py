@@ -1,11 +1,56 @@
+import threading
+import time
+from collections import OrderedDict
 from datetime import datetime
 from werkzeug.security import generate_password_hash, check_password_hash
 from flask_login import UserMixin
 from flask import current_app, g
 from app import get_db
 
+class UserCache:
+    """Per-worker TTL + LRU cache of users keyed by id"""
+
+    def __init__(self):
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, user_id, ttl):
+        """Cached user, or None if missing or older than ttl seconds"""
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None:
+                return None
+
+            user, stored_at = entry
+            if time.monotonic() - stored_at > ttl:
+                del self._entries[user_id]
+                return None
+
+            self._entries.move_to_end(user_id)
+            return user
+
+    def put(self, user, max_size):
+        """Store a user, evicting the least recently used entries"""
+        with self._lock:
+            self._entries[user.id] = (user, time.monotonic())
+            self._entries.move_to_end(user.id)
+            while len(self._entries) > max_size:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, user_id):
+        """Drop a user from the cache"""
+        with self._lock:
+            self._entries.pop(user_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
 class User(UserMixin):
     """User model for authentication"""
+
+    cache = UserCache()
     
     def __init__(self, id=None, username=None, email=None, password_hash=None, 
                  created_at=None, updated_at=None):
@@ -48,6 +93,7 @@ class User(UserMixin):
                       datetime.utcnow(), self.id))
             
             db.commit()
+            User.cache.invalidate(self.id)
             return True
         except Exception as e:
             db.rollback()
@@ -66,6 +112,7 @@ class User(UserMixin):
         try:
             cursor.execute("DELETE FROM users WHERE id = %s", (self.id,))
             db.commit()
+            User.cache.invalidate(self.id)
             return True
         except Exception as e:
             db.rollback()
@@ -99,6 +146,42 @@ class User(UserMixin):
         finally:
             cursor.close()
 
+    @classmethod
+    def get_cached(cls, user_id):
+        """Get user by ID through the per-worker cache (used on every request)"""
+        config = current_app.config
+        ttl = config.get('USER_CACHE_TTL', 0)
+
+        if ttl <= 0:
+            return cls.get_by_id(user_id)
+
+        user = cls.cache.get(user_id, ttl)
+        if user is None:
+            user = cls.get_by_id(user_id)
+            if user is not None:
+                cls.cache.put(user, config.get('USER_CACHE_SIZE', 1024))
+        return user
+
+    @classmethod
+    def from_claims(cls, claims):
+        """Rebuild a user from signed session claims (no password hash)"""
+        created_at = claims.get('created_at')
+        return cls(
+            id=claims['id'],
+            username=claims.get('username'),
+            email=claims.get('email'),
+            created_at=datetime.fromisoformat(created_at) if created_at else None
+        )
+
+    def to_claims(self):
+        """Minimal identity claims stored in the signed session cookie"""
+        return {
+            'id': self.id,
+            'username': self.username,
+            'email': self.email,
+            'created_at': self.created_at.isoformat() if self.created_at else None
+        }
+
     @classmethod
     def get_by_email(cls, email):
         """Get user by email"""
@@ -1,14 +1,62 @@
 import os
-from flask import Blueprint, request, jsonify, current_app, send_file
+from flask import Blueprint, request, jsonify, current_app, Response, stream_with_context
 from flask_login import login_required, current_user
 from werkzeug.utils import secure_filename
 from app.models.analysis import Analysis
+from app.models.rule import Rule
 from app.services.file_service import FileService
 from app.services.analysis_service import AnalysisService
+from app.services.batch_service import BatchService
 from app.services.gemini_service import GeminiService
+from app.services.metrics_service import MetricsService
+from app.services.json_service import JsonService
+from app.services.storage_service import StorageService, StorageLimitExceeded
+from app.services.dataset_cache import DatasetCache
+from app.services.accumulator_service import AccumulatorService, StateInvalidated
+from app.services.memory_service import AdmissionTimeout
+from app.services.progress_service import ProgressService, AnalysisCancelled
+from app.services.rule_engine import RuleSet, RuleError
 
 bp = Blueprint('api', __name__, url_prefix='/api')
 
+def conditional_response(etag):
+    """
+    Answer 304 Not Modified when the client already holds this representation.
+
+    Saved analyses only change when their version does, so the check runs on
+    the ETag alone, before results_json is fetched or decoded.
+
+    Returns:
+        A 304 response, or None when the full body must be sent
+    """
+    for variant in JsonService.etag_variants(etag):
+        if request.if_none_match.contains(variant):
+            response = current_app.response_class(status=304)
+            response.set_etag(variant)
+            return cache_headers(response)
+    return None
+
+def cache_headers(response):
+    """Attach the per-user Cache-Control to a revalidatable response"""
+    response.headers['Cache-Control'] = current_app.config['RESULTS_CACHE_CONTROL']
+    response.vary.add('Cookie')
+    return response
+
+def upload_path(file_id):
+    """Path of one of the current user's uploads, or None for another user's or a malformed file ID"""
+    if not isinstance(file_id, str) or os.path.basename(file_id) != file_id \
+            or StorageService.owner(file_id) != current_user.id:
+        return None
+    return os.path.join(current_app.config['UPLOAD_FOLDER'], file_id)
+
+def data_expired():
+    """410 for analyses whose uploaded data was removed by retention or deletion"""
+    return jsonify({
+        'success': False,
+        'expired': True,
+        'message': 'The uploaded data for this analysis has expired; the saved report is still available'
+    }), 410
+
 @bp.route('/upload', methods=['POST'])
 @login_required
 def upload_file():
@@ -27,7 +75,13 @@ def upload_file():
         return jsonify({'success': False, 'message': validation_result['message']}), 400
 
     try:
-        file_info = FileService.save_file(file, current_app.config['UPLOAD_FOLDER'], current_user.id)
+        file_info = FileService.save_file(
+            file,
+            current_app.config['UPLOAD_FOLDER'],
+            current_user.id,
+            compression=current_app.config['UPLOAD_COMPRESSION'],
+            limit=current_app.config['MAX_FILE_SIZE']
+        )
 
         return jsonify({
             'success': True,
@@ -37,6 +91,10 @@ def upload_file():
             'message': 'File uploaded successfully'
         }), 200
 
+    except StorageLimitExceeded:
+        limit_mb = current_app.config['MAX_FILE_SIZE'] // (1024 * 1024)
+        return jsonify({'success': False, 'message': f'File size exceeds {limit_mb}MB limit once decompressed'}), 400
+
     except Exception as e:
         return jsonify({'success': False, 'message': str(e)}), 500
 
@@ -50,42 +108,270 @@ def analyze_file():
         return jsonify({'success': False, 'message': 'File ID required'}), 400
 
     file_id = data['file_id']
+    file_path = upload_path(file_id)
 
-    file_path = os.path.join(current_app.config['UPLOAD_FOLDER'], file_id)
-
-    if not os.path.exists(file_path):
+    if file_path is None or not os.path.exists(file_path):
         return jsonify({'success': False, 'message': 'File not found'}), 404
 
+    include_timings = bool(data.get('include_timings', current_app.config['ANALYSIS_INCLUDE_TIMINGS']))
+
+    parent = None
+    parent_id = data.get('parent_id')
+    if parent_id is not None:
+        parent = Analysis.get_by_id(parent_id, user_id=current_user.id)
+        if not parent:
+            return jsonify({'success': False, 'message': 'Parent analysis not found'}), 404
+
+    state_path = AccumulatorService.state_path(file_path)
+    job = ProgressService.start(file_id, current_user.id, StorageService.size(file_path))
+
     try:
-        results = AnalysisService.analyze_csv(file_path)
+        rules = Rule.rules_for_user(current_user.id)
+        results = None
+
+        # Appended version of a previous upload: fold in only the new rows
+        if parent and parent.file_path and os.path.exists(AccumulatorService.state_path(parent.file_path)) \
+                and AccumulatorService.prefix_matches(file_path, parent.file_size, parent.content_hash):
+            try:
+                results = AnalysisService.analyze_incremental(
+                    file_path,
+                    parent.file_size,
+                    AccumulatorService.state_path(parent.file_path),
+                    state_path=state_path,
+                    include_timings=include_timings,
+                    rules=rules,
+                    job=job
+                )
+                results['incremental']['parentId'] = parent.id
+            except (StateInvalidated, ValueError) as exc:
+                current_app.logger.info('Incremental analysis fell back to a full pass: %s', exc)
+
+        if results is None:
+            results = AnalysisService.analyze_file(
+                file_path,
+                include_timings=include_timings,
+                state_path=state_path,
+                rules=rules,
+                job=job
+            )
 
         analysis = Analysis(
             user_id=current_user.id,
             filename=results['filename'],
-            file_size=results.get('fileSizeBytes', os.path.getsize(file_path)),
+            file_size=results.get('fileSizeBytes', StorageService.size(file_path)),
             file_path=file_path,
             total_rows=results['totalRows'],
             total_columns=results['totalColumns'],
-            quality_score=results['qualityScore']
+            quality_score=results['qualityScore'],
+            parent_id=parent.id if parent else None,
+            content_hash=AccumulatorService.file_hash(file_path)
         )
         analysis.set_results(results)
+        analysis.set_rules(rules)
         analysis.save()
+        job.finish('done')
+
+        # Reuse the encoding just stored instead of serializing the results twice
+        return JsonService.raw_response(
+            JsonService.envelope(JsonService.embed(analysis.results_json, analysis_id=analysis.id))
+        )
+
+    except AnalysisCancelled as e:
+        job.finish('cancelled', str(e))
+        return jsonify({'success': False, 'cancelled': True, 'message': str(e)}), 409
+
+    except AdmissionTimeout as e:
+        job.finish('failed', str(e))
+        response = jsonify({'success': False, 'busy': True, 'message': str(e)})
+        response.headers['Retry-After'] = '30'
+        return response, 503
+
+    except Exception as e:
+        job.finish('failed', str(e))
+        return jsonify({'success': False, 'message': f'Analysis failed: {str(e)}'}), 500
+
+@bp.route('/analyze/<file_id>/progress', methods=['GET'])
+@login_required
+def analysis_progress(file_id):
+    """Stage, detector and bytes read of a running (or recently finished) analysis"""
+    record = ProgressService.get(file_id)
+
+    if not record or record.get('userId') != current_user.id:
+        return jsonify({'success': False, 'message': 'No analysis in progress'}), 404
+
+    response = jsonify({'success': True, 'data': record})
+    response.headers['Cache-Control'] = 'no-store'
+    return response
+
+@bp.route('/analyze/<file_id>/cancel', methods=['POST'])
+@login_required
+def cancel_analysis(file_id):
+    """Ask a running analysis to stop at its next chunk, column or detector"""
+    if upload_path(file_id) is None:
+        return jsonify({'success': False, 'message': 'File not found'}), 404
+
+    record = ProgressService.get(file_id)
+    if record and record['status'] != 'running':
+        return jsonify({'success': False, 'message': f"Analysis already {record['status']}"}), 409
+
+    if not ProgressService.request_cancel(file_id):
+        return jsonify({'success': False, 'message': 'Cancellation is unavailable'}), 501
+
+    return jsonify({'success': True, 'message': 'Cancellation requested'}), 202
+
+@bp.route('/analyze/batch', methods=['POST'])
+@login_required
+def analyze_batch():
+    """Analyze many CSV files (multi-file upload or a zip) in parallel.
+
+    Streams NDJSON: one 'file' event per finished file, then a 'complete'
+    event once every analysis has been stored in a single transaction.
+    """
+    config = current_app.config
+    uploads = [f for f in request.files.getlist('files') + request.files.getlist('file') if f and f.filename]
 
-        response_data = results.copy()
-        response_data['analysis_id'] = analysis.id
+    if not uploads:
+        return jsonify({'success': False, 'message': 'No files provided'}), 400
 
+    if len(uploads) > config['BATCH_MAX_FILES']:
         return jsonify({
+            'success': False,
+            'message': f'Batch exceeds {config["BATCH_MAX_FILES"]} files'
+        }), 400
+
+    file_infos = []
+    skipped = []
+
+    try:
+        for upload in uploads:
+            if FileService.allowed_file(upload.filename, config['BATCH_ARCHIVE_EXTENSIONS']):
+                saved, archive_skipped = FileService.extract_archive(
+                    upload, config['UPLOAD_FOLDER'], current_user.id, config
+                )
+                file_infos.extend(saved)
+                skipped.extend(archive_skipped)
+                continue
+
+            validation_result = FileService.validate_file(upload, config)
+            if not validation_result['valid']:
+                skipped.append(upload.filename)
+                continue
+
+            try:
+                file_infos.append(FileService.save_file(
+                    upload, config['UPLOAD_FOLDER'], current_user.id,
+                    compression=config['UPLOAD_COMPRESSION'], limit=config['MAX_FILE_SIZE']
+                ))
+            except StorageLimitExceeded:
+                skipped.append(upload.filename)
+    except Exception as e:
+        return jsonify({'success': False, 'message': f'Upload failed: {str(e)}'}), 400
+
+    if len(file_infos) > config['BATCH_MAX_FILES']:
+        for info in file_infos:
+            StorageService.remove(info['file_path'])
+        return jsonify({
+            'success': False,
+            'message': f'Batch exceeds {config["BATCH_MAX_FILES"]} files'
+        }), 400
+
+    if not file_infos:
+        return jsonify({'success': False, 'message': 'No valid CSV files in upload', 'skipped': skipped}), 400
+
+    rules = Rule.rules_for_user(current_user.id)
+    user_id = current_user.id
+
+    def generate():
+        yield JsonService.dumps({'event': 'start', 'total': len(file_infos), 'skipped': skipped}) + b'\n'
+
+        analyses = []
+        for index, (info, results, content_hash, error) in enumerate(
+                BatchService.analyze_many(file_infos, config['BATCH_MAX_WORKERS'], rules=rules), start=1):
+            event = {
+                'event': 'file',
+                'completed': index,
+                'total': len(file_infos),
+                'file_id': info['file_id'],
+                'filename': info['filename']
+            }
+
+            if error:
+                event.update({'success': False, 'message': f'Analysis failed: {error}'})
+            else:
+                analysis = Analysis(
+                    user_id=user_id,
+                    filename=info['filename'],
+                    file_size=info['file_size'],
+                    file_path=info['file_path'],
+                    total_rows=results['totalRows'],
+                    total_columns=results['totalColumns'],
+                    quality_score=results['qualityScore'],
+                    content_hash=content_hash
+                )
+                analysis.set_results(results)
+                analysis.set_rules(rules)
+                analyses.append(analysis)
+                event.update({
+                    'success': True,
+                    'qualityScore': results['qualityScore'],
+                    'totalRows': results['totalRows'],
+                    'issuesCount': len(results['issues'])
+                })
+
+            yield JsonService.dumps(event) + b'\n'
+
+        try:
+            Analysis.save_many(analyses)
+            yield JsonService.dumps({
+                'event': 'complete',
+                'success': True,
+                'analyses': [{'analysis_id': a.id, 'file_id': os.path.basename(a.file_path), 'filename': a.filename}
+                             for a in analyses]
+            }) + b'\n'
+        except Exception as e:
+            yield JsonService.dumps({'event': 'complete', 'success': False, 'message': f'Saving results failed: {str(e)}'}) + b'\n'
+
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
+@bp.route('/analyze/preview', methods=['POST'])
+@login_required
+def preview_file():
+    """Return a sampled estimate of the analysis while the full pass runs"""
+    data = request.get_json()
+
+    if not data or 'file_id' not in data:
+        return jsonify({'success': False, 'message': 'File ID required'}), 400
+
+    file_path = upload_path(data['file_id'])
+
+    if file_path is None or not os.path.exists(file_path):
+        return jsonify({'success': False, 'message': 'File not found'}), 404
+
+    try:
+        results = AnalysisService.analyze_preview(
+            file_path,
+            sample_size=current_app.config['PREVIEW_SAMPLE_ROWS'],
+            strata=current_app.config['PREVIEW_STRATA'],
+            rules=Rule.rules_for_user(current_user.id)
+        )
+
+        return JsonService.response({
             'success': True,
-            'data': response_data
-        }), 200
+            'data': results
+        })
 
     except Exception as e:
-        return jsonify({'success': False, 'message': f'Analysis failed: {str(e)}'}), 500
+        return jsonify({'success': False, 'message': f'Preview failed: {str(e)}'}), 500
 
 @bp.route('/history', methods=['GET'])
 @login_required
 def get_history():
     """Get analysis history for current user"""
+    etag = Analysis.history_etag(current_user.id, limit=20)
+    not_modified = conditional_response(etag)
+    if not_modified is not None:
+        return not_modified
+
     analyses = Analysis.get_by_user_id(current_user.id, limit=20)
 
     history = []
@@ -101,10 +387,11 @@ def get_history():
             'issuesCount': len(results.get('issues', []))
         })
 
-    return jsonify({
+    response = JsonService.response({
         'success': True,
         'history': history
-    }), 200
+    }, etag=etag)
+    return cache_headers(response)
 
 
 @bp.route('/history', methods=['DELETE'])
@@ -132,72 +419,101 @@ def clear_history():
 @login_required
 def get_results(analysis_id):
     """Get specific analysis results"""
-    analysis = Analysis.get_by_id(analysis_id, user_id=current_user.id)
+    analysis = Analysis.get_by_id(analysis_id, user_id=current_user.id, include_results=False)
 
     if not analysis:
         return jsonify({'success': False, 'message': 'Analysis not found'}), 404
 
-    results = analysis.get_results()
-    results['analysis_id'] = analysis.id
+    etag = analysis.etag('results')
+    not_modified = conditional_response(etag)
+    if not_modified is not None:
+        return not_modified
 
-    return jsonify({
-        'success': True,
-        'data': results
-    }), 200
+    # Stored results go out as stored, without a decode/encode round trip
+    body = JsonService.embed(analysis.load_results(), analysis_id=analysis.id)
+    return cache_headers(JsonService.raw_response(JsonService.envelope(body), etag=etag))
 
 @bp.route('/export/<int:analysis_id>', methods=['GET'])
 @login_required
 def export_results(analysis_id):
     """Export analysis results as JSON file"""
-    analysis = Analysis.get_by_id(analysis_id, user_id=current_user.id)
+    analysis = Analysis.get_by_id(analysis_id, user_id=current_user.id, include_results=False)
 
     if not analysis:
         return jsonify({'success': False, 'message': 'Analysis not found'}), 404
 
-    results = analysis.get_results()
-
-    import json
-    import tempfile
-
-    temp_file = tempfile.NamedTemporaryFile(mode='w', delete=False, suffix='.json')
-    json.dump(results, temp_file, indent=2)
-    temp_file.close()
+    etag = analysis.etag('export')
+    not_modified = conditional_response(etag)
+    if not_modified is not None:
+        return not_modified
 
-    return send_file(
-        temp_file.name,
-        as_attachment=True,
-        download_name=f'quality-report-{analysis_id}.json',
-        mimetype='application/json'
+    response = JsonService.raw_response(
+        JsonService.embed(analysis.load_results()),
+        etag=etag,
+        headers={'Content-Disposition': f'attachment; filename=quality-report-{analysis_id}.json'}
     )
+    return cache_headers(response)
 
 @bp.route('/analysis/<int:analysis_id>/affected-rows', methods=['GET'])
 @login_required
 def get_affected_rows(analysis_id):
     """Get rows affected by a specific issue"""
-    analysis = Analysis.get_by_id(analysis_id, user_id=current_user.id)
+    analysis = Analysis.get_by_id(analysis_id, user_id=current_user.id, include_results=False)
 
     if not analysis:
         return jsonify({'success': False, 'message': 'Analysis not found'}), 404
 
     issue_type = request.args.get('issue_type')
     column_name = request.args.get('column')
-    limit = int(request.args.get('limit', 50))
+    rule_id = request.args.get('rule')
+    dependent_column = request.args.get('dependent')
+    limit = min(int(request.args.get('limit', 50)), current_app.config['AFFECTED_ROWS_MAX_LIMIT'])
     offset = int(request.args.get('offset', 0))
+    response_format = request.args.get('format', 'rows')
+
+    if response_format not in ('rows', 'columnar'):
+        return jsonify({'success': False, 'message': 'format must be rows or columnar'}), 400
+
+    # Projection (?columns=a,b), sort (?sort=col&order=desc) and filters (?filter.<column>=<op>:<value>)
+    columns = [col.strip() for col in request.args.get('columns', '').split(',') if col.strip()]
+    sort_by = request.args.get('sort') or None
+    descending = request.args.get('order', 'asc').lower() == 'desc'
+
+    try:
+        filters = [
+            AnalysisService.parse_row_filter(key[len('filter.'):], spec)
+            for key in request.args if key.startswith('filter.')
+            for spec in request.args.getlist(key)
+        ]
+    except ValueError as exc:
+        return jsonify({'success': False, 'message': str(exc)}), 400
 
     if not issue_type:
         return jsonify({'success': False, 'message': 'issue_type parameter required'}), 400
 
     if not analysis.file_path or not os.path.exists(analysis.file_path):
-        return jsonify({'success': False, 'message': 'Data file not found'}), 404
+        return data_expired()
+
+    # Evaluate the rules in effect when the analysis ran, so the rows match its issue counts
+    rules = analysis.get_rules() if analysis.rules_json is not None else Rule.rules_for_user(current_user.id)
 
     try:
-        result = AnalysisService.get_affected_rows(
-            analysis.file_path,
-            issue_type,
-            column_name,
-            limit,
-            offset
-        )
+        with MetricsService.timed('affected_rows'):
+            result = AnalysisService.get_affected_rows(
+                analysis.file_path,
+                issue_type,
+                column_name,
+                limit,
+                offset,
+                rules=rules,
+                rule_id=rule_id,
+                response_format=response_format,
+                columns=columns,
+                sort_by=sort_by,
+                descending=descending,
+                filters=filters,
+                dependent_column=dependent_column
+            )
 
         if 'error' in result:
             return jsonify({
@@ -205,11 +521,13 @@ def get_affected_rows(analysis_id):
                 'message': f'Failed to retrieve affected rows: {result["error"]}'
             }), 500
 
-        return jsonify({
+        return JsonService.response({
             'success': True,
             'data': result
-        }), 200
+        })
 
+    except ValueError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
     except Exception as e:
         return jsonify({
             'success': False,
@@ -237,6 +555,8 @@ def generate_issue_analysis(analysis_id):
 
     issues = analysis_results.get('issues', [])
     column_name = request_data.get('column')
+    # One determinant column can carry a Dependency Violation per dependent column
+    dependent_column = request_data.get('dependent')
 
     def normalize(value):
         return (value or '').strip().lower()
@@ -245,6 +565,8 @@ def generate_issue_analysis(analysis_id):
     for issue in issues:
         if issue.get('type') != issue_type:
             continue
+        if dependent_column and issue.get('dependentColumn') != dependent_column:
+            continue
 
         issue_column = issue.get('column')
         if column_name is None and issue_column is None:
@@ -302,11 +624,11 @@ def generate_issue_analysis(analysis_id):
                 return jsonify({'success': False, 'message': 'Column name required for outlier analysis'}), 400
 
             if not analysis.file_path or not os.path.exists(analysis.file_path):
-                return jsonify({'success': False, 'message': 'Data file not found'}), 404
+                return data_expired()
 
             import pandas as pd
 
-            df = pd.read_csv(analysis.file_path)
+            df, _ = DatasetCache.read(analysis.file_path, usecols=[column_name])
             series = pd.to_numeric(df[column_name], errors='coerce')
 
             mean = series.mean()
@@ -339,11 +661,13 @@ def generate_issue_analysis(analysis_id):
                 'max_outlier': float(outlier_values.max())
             }
 
-        analysis_text = GeminiService.generate_issue_analysis(issue_payload)
+        completion = GeminiService.generate_issue_analysis(issue_payload)
 
+        # source is 'fallback' for templated text served while the AI API is unavailable
         return jsonify({
             'success': True,
-            'analysis': analysis_text
+            'analysis': completion.text,
+            'source': completion.source
         }), 200
 
     except Exception as e:
@@ -352,21 +676,72 @@ def generate_issue_analysis(analysis_id):
             'message': f'Failed to generate analysis: {str(e)}'
         }), 500
 
+@bp.route('/rules', methods=['GET'])
+@login_required
+def list_rules():
+    """List the current user's custom data quality rules"""
+    rules = Rule.get_by_user_id(current_user.id)
+
+    return jsonify({
+        'success': True,
+        'rules': [rule.to_dict() for rule in rules]
+    }), 200
+
+@bp.route('/rules', methods=['POST'])
+@login_required
+def create_rule():
+    """Create a declarative rule (range, comparison, regex, not_null, unique)"""
+    data = request.get_json()
+
+    if not data or not isinstance(data.get('definition'), dict):
+        return jsonify({'success': False, 'message': 'Rule definition required'}), 400
+
+    definition = data['definition']
+
+    try:
+        RuleSet.validate(definition)
+    except RuleError as exc:
+        return jsonify({'success': False, 'message': str(exc)}), 400
+
+    rule = Rule(
+        user_id=current_user.id,
+        name=str(data.get('name') or definition.get('name') or definition['type']).strip(),
+        enabled=bool(data.get('enabled', True))
+    )
+    rule.set_definition(definition)
+    rule.save()
+
+    return jsonify({
+        'success': True,
+        'rule': rule.to_dict()
+    }), 201
+
+@bp.route('/rules/<int:rule_id>', methods=['DELETE'])
+@login_required
+def delete_rule(rule_id):
+    """Delete a custom rule"""
+    rule = Rule.get_by_id(rule_id, current_user.id)
+
+    if not rule:
+        return jsonify({'success': False, 'message': 'Rule not found'}), 404
+
+    rule.delete()
+
+    return jsonify({
+        'success': True,
+        'message': 'Rule deleted successfully'
+    }), 200
+
 @bp.route('/delete/<int:analysis_id>', methods=['DELETE'])
 @login_required
 def delete_analysis(analysis_id):
     """Delete analysis and associated file"""
-    analysis = Analysis.get_by_id(analysis_id, user_id=current_user.id)
+    analysis = Analysis.get_by_id(analysis_id, user_id=current_user.id, include_results=False)
 
     if not analysis:
         return jsonify({'success': False, 'message': 'Analysis not found'}), 404
 
-    if analysis.file_path and os.path.exists(analysis.file_path):
-        try:
-            os.remove(analysis.file_path)
-        except:
-            pass  # File already deleted or inaccessible
-
+    # Files are removed by the background reaper once the row is gone
     analysis.delete()
 
     return jsonify({
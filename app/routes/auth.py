@@ -1,14 +1,28 @@
-from flask import Blueprint, render_template, request, jsonify, session, redirect, url_for
+from flask import Blueprint, render_template, request, jsonify, session, redirect, url_for, current_app
 from flask_login import login_user, logout_user, current_user
 from app import login_manager
 from app.models.user import User
+from app.services.metrics_service import MetricsService
 
 bp = Blueprint('auth', __name__, url_prefix='/auth')
 
 @login_manager.user_loader
 def load_user(user_id):
-    """Load user by ID for Flask-Login"""
-    return User.get_by_id(int(user_id))
+    """Load user by ID for Flask-Login without a users-table query when possible"""
+    user_id = int(user_id)
+
+    with MetricsService.timed('load_user'):
+        if current_app.config.get('USER_SESSION_CLAIMS'):
+            claims = session.get('user_claims')
+            if claims and claims.get('id') == user_id:
+                return User.from_claims(claims)
+
+        return User.get_cached(user_id)
+
+def remember_claims(user):
+    """Store identity claims in the signed session when enabled"""
+    if current_app.config.get('USER_SESSION_CLAIMS'):
+        session['user_claims'] = user.to_claims()
 
 @bp.route('/login', methods=['GET'])
 def login():
@@ -40,6 +54,7 @@ def login_post():
 
     # Log in user
     login_user(user, remember=remember)
+    remember_claims(user)
 
     return jsonify({
         'success': True,
@@ -80,6 +95,7 @@ def signup():
 
     # Log in user automatically
     login_user(user)
+    remember_claims(user)
 
     return jsonify({
         'success': True,
@@ -91,6 +107,7 @@ def signup():
 def logout():
     """Handle user logout"""
     logout_user()
+    session.pop('user_claims', None)
     return jsonify({'success': True, 'message': 'Logged out successfully'}), 200
 
 @bp.route('/profile', methods=['GET'])
@@ -0,0 +1,23 @@
+import hmac
+from flask import Blueprint, Response, current_app, abort, request
+from app.services.metrics_service import MetricsService
+
+bp = Blueprint('metrics', __name__)
+
+def scrape_allowed():
+    """Whether the request comes from an allowed address or carries the scrape token"""
+    token = current_app.config['METRICS_TOKEN']
+    if token:
+        supplied = request.headers.get('Authorization', '').encode('utf-8')
+        if hmac.compare_digest(supplied, f'Bearer {token}'.encode('utf-8')):
+            return True
+
+    return request.remote_addr in current_app.config['METRICS_ALLOWED_IPS']
+
+@bp.route('/metrics', methods=['GET'])
+def metrics():
+    """Expose instrumentation in the Prometheus text format to allowed scrapers"""
+    if not current_app.config.get('METRICS_ENABLED', True) or not scrape_allowed():
+        abort(404)
+
+    return Response(MetricsService.render(), mimetype='text/plain; version=0.0.4')
@@ -0,0 +1,790 @@
+import hashlib
+import json
+import os
+from datetime import datetime
+import numpy as np
+import pandas as pd
+from pandas.api.types import is_bool_dtype, is_numeric_dtype
+from app.services.rule_engine import RuleSet
+from app.services.date_parser import DateParser
+from app.services.storage_service import StorageService
+
+# Hash assigned to missing cells so NaN == NaN when comparing rows
+MISSING_HASH = np.uint64(0x9E3779B97F4A7C15)
+ROW_HASH_PRIME = np.uint64(0x100000001B3)
+
+# Value shapes: ASCII letters map to A/a and digits to 9, cut at SHAPE_LENGTH
+SHAPE_LENGTH = 24
+SHAPE_TABLE = str.maketrans(
+    'ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789',
+    'A' * 26 + 'a' * 26 + '9' * 10
+)
+
+
+class StateInvalidated(Exception):
+    """Raised when persisted state can no longer produce exact results"""
+
+
+def column_hashes(series):
+    """
+    Hash every cell of a column into uint64.
+
+    Numeric columns are hashed as float64 so that 1 and 1.0 collide across
+    chunks parsed with different dtypes; everything else is hashed as text.
+    """
+    if is_numeric_dtype(series) and not is_bool_dtype(series):
+        hashes = pd.util.hash_array(series.to_numpy(dtype='float64', na_value=np.nan))
+    else:
+        hashes = pd.util.hash_array(series.astype(str).to_numpy(dtype=object))
+
+    hashes = np.asarray(hashes, dtype=np.uint64).copy()
+    hashes[series.isna().to_numpy()] = MISSING_HASH
+    return hashes
+
+
+def row_hashes(df):
+    """Combine per-column hashes into one uint64 per row"""
+    combined = np.zeros(len(df), dtype=np.uint64)
+    with np.errstate(over='ignore'):
+        for column in df.columns:
+            combined = (combined * ROW_HASH_PRIME) ^ column_hashes(df[column])
+    return combined
+
+
+def sorted_contains(sorted_values, values):
+    """Vectorized membership test against a sorted unique array"""
+    if len(sorted_values) == 0:
+        return np.zeros(len(values), dtype=bool)
+    positions = np.searchsorted(sorted_values, values)
+    positions = np.minimum(positions, len(sorted_values) - 1)
+    return sorted_values[positions] == values
+
+
+class HyperLogLog:
+    """Mergeable distinct-count sketch with 2^P registers"""
+
+    P = 14
+
+    def __init__(self, registers=None):
+        m = 1 << self.P
+        self.registers = registers if registers is not None else np.zeros(m, dtype=np.uint8)
+
+    def add(self, hashes):
+        """Add a uint64 hash array"""
+        if len(hashes) == 0:
+            return
+        p = np.uint64(self.P)
+        index = (hashes >> np.uint64(64 - self.P)).astype(np.int64)
+        remainder = (hashes << p) | np.uint64(1 << (self.P - 1))
+        rank = (64 - np.floor(np.log2(remainder.astype(np.float64)))).astype(np.uint8)
+        np.maximum.at(self.registers, index, rank)
+
+    def merge(self, other):
+        """Merge another sketch into this one"""
+        np.maximum(self.registers, other.registers, out=self.registers)
+
+    def count(self):
+        """Estimated number of distinct hashes"""
+        m = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        estimate = alpha * m * m / np.sum(np.exp2(-self.registers.astype(np.float64)))
+
+        zeros = int(np.count_nonzero(self.registers == 0))
+        if estimate <= 2.5 * m and zeros > 0:
+            estimate = m * np.log(m / zeros)
+
+        return int(round(estimate))
+
+
+class UniqueCounter:
+    """Exact distinct count that degrades to a HyperLogLog past EXACT_LIMIT"""
+
+    EXACT_LIMIT = 200000
+
+    def __init__(self, values=None, sketch=None):
+        self.values = values if values is not None else np.empty(0, dtype=np.uint64)
+        self.sketch = sketch
+
+    def add(self, hashes):
+        """Add hashes of non-missing values"""
+        if self.sketch is not None:
+            self.sketch.add(hashes)
+            return
+
+        self.values = np.union1d(self.values, hashes).astype(np.uint64)
+
+        if len(self.values) > self.EXACT_LIMIT:
+            self.sketch = HyperLogLog()
+            self.sketch.add(self.values)
+            self.values = np.empty(0, dtype=np.uint64)
+
+    def count(self):
+        """Distinct count, exact until the sketch takes over"""
+        if self.sketch is not None:
+            return self.sketch.count()
+        return int(len(self.values))
+
+    @property
+    def exact(self):
+        return self.sketch is None
+
+
+class NumericAccumulator:
+    """
+    Mergeable moments plus the tail values needed for 3-sigma outliers.
+
+    After compact() only values outside the [low, high] band are kept. The
+    outlier count stays exact as long as the current 3-sigma interval still
+    contains that band; otherwise StateInvalidated is raised.
+    """
+
+    def __init__(self, n=0, mean=0.0, m2=0.0, band=None, tails=None):
+        self.n = n
+        self.mean = mean
+        self.m2 = m2
+        self.band = band
+        self.tails = tails if tails is not None else np.empty(0, dtype=np.float64)
+
+    def add(self, values):
+        """Add a float64 array of non-missing values"""
+        if len(values) == 0:
+            return
+
+        count = len(values)
+        batch_mean = float(values.mean())
+        batch_m2 = float(((values - batch_mean) ** 2).sum())
+
+        # Chan et al. parallel update of the running moments
+        total = self.n + count
+        delta = batch_mean - self.mean
+        self.mean += delta * count / total
+        self.m2 += batch_m2 + delta * delta * self.n * count / total
+        self.n = total
+
+        if self.band is not None:
+            values = values[(values < self.band[0]) | (values > self.band[1])]
+        self.tails = np.concatenate([self.tails, values])
+
+    @property
+    def std(self):
+        """Sample standard deviation, matching pandas' ddof=1"""
+        if self.n < 2:
+            return float('nan')
+        return float(np.sqrt(max(self.m2, 0.0) / (self.n - 1)))
+
+    def compact(self):
+        """Drop values that can never become outliers, keeping the 2-sigma tails"""
+        if self.band is not None or self.n == 0:
+            return
+        std = self.std if self.n > 1 else 0.0
+        self.band = (self.mean - 2 * std, self.mean + 2 * std)
+        self.tails = self.tails[(self.tails < self.band[0]) | (self.tails > self.band[1])]
+
+    def outlier_count(self):
+        """Number of values more than three standard deviations from the mean"""
+        std = self.std
+        if not std > 0:
+            return 0
+
+        low, high = self.mean - 3 * std, self.mean + 3 * std
+        if self.band is not None and (self.band[0] < low or self.band[1] > high):
+            raise StateInvalidated('Outlier band drifted outside the retained tails')
+
+        return int(((self.tails < low) | (self.tails > high)).sum())
+
+
+def value_key(value):
+    """Text form of a value; whole floats print as integers so 1 and 1.0 agree across chunks"""
+    if isinstance(value, (float, np.floating)) and float(value).is_integer():
+        return str(int(value))
+    return str(value)
+
+
+def value_shapes(series):
+    """
+    Shape signature of every value: 'John 42' -> 'Aaaa 99'.
+
+    ASCII letters become A/a and digits 9; other characters are kept.
+    Values are cut at SHAPE_LENGTH characters before mapping.
+    """
+    text = series.astype(str).str.slice(0, SHAPE_LENGTH)
+    return text.str.translate(SHAPE_TABLE)
+
+
+class SpaceSaving:
+    """
+    Mergeable top-k summary (SpaceSaving) of the most frequent values.
+
+    Keeps at most CAPACITY counters of value -> [count, error]. A count
+    overestimates the true count by at most its error, and a value without
+    a counter occurred at most `floor` times. Each chunk is counted exactly
+    and merged in, so the summary stays exact (error 0) until a column has
+    more than CAPACITY distinct values.
+    """
+
+    CAPACITY = 64
+    REPORTED = 10
+
+    def __init__(self, counters=None, floor=0):
+        self.counters = counters or {}
+        self.floor = floor
+
+    @classmethod
+    def from_counts(cls, counts):
+        """Summary of exact counts, a value_counts() Series sorted by count"""
+        top = counts.iloc[:cls.CAPACITY]
+        floor = int(counts.iloc[cls.CAPACITY]) if len(counts) > cls.CAPACITY else 0
+        return cls({value_key(value): [int(count), 0] for value, count in top.items()}, floor)
+
+    def add(self, series):
+        """Count a Series of non-missing values into the summary"""
+        if len(series):
+            self.merge(SpaceSaving.from_counts(series.value_counts()))
+
+    def merge(self, other):
+        """Merge another summary into this one"""
+        merged = {}
+        for value in self.counters.keys() | other.counters.keys():
+            # A value one side does not track may have occurred up to its floor
+            count, error = self.counters.get(value, (self.floor, self.floor))
+            other_count, other_error = other.counters.get(value, (other.floor, other.floor))
+            merged[value] = [count + other_count, error + other_error]
+
+        ranked = sorted(merged.items(), key=lambda item: (-item[1][0], item[0]))
+        dropped = ranked[self.CAPACITY][1][0] if len(ranked) > self.CAPACITY else 0
+        self.counters = dict(ranked[:self.CAPACITY])
+        self.floor = max(self.floor + other.floor, dropped)
+
+    def top(self, k=None):
+        """The k most frequent values as dictionaries with value, count and error"""
+        ranked = sorted(self.counters.items(), key=lambda item: (-item[1][0], item[0]))
+        return [
+            {'value': value, 'count': count, 'error': error}
+            for value, (count, error) in ranked[:k or self.REPORTED]
+        ]
+
+    def to_meta(self):
+        """JSON-serializable form for DatasetState.save"""
+        return {'counters': self.counters, 'floor': self.floor}
+
+    @classmethod
+    def from_meta(cls, meta):
+        return cls({value: list(entry) for value, entry in meta['counters'].items()}, meta['floor'])
+
+
+class ColumnAccumulator:
+    """Mergeable statistics for a single column"""
+
+    def __init__(self, name, data_type, date_format=None, type_stats=None, total=0, missing=0,
+                 unique=None, numeric=None, invalid_emails=0, future_dates=0,
+                 top_values=None, shapes=None):
+        self.name = name
+        self.type = data_type
+        self.date_format = date_format
+        self.type_stats = type_stats or {}
+        self.total = total
+        self.missing = missing
+        self.unique = unique or UniqueCounter()
+        self.numeric = numeric
+        self.invalid_emails = invalid_emails
+        self.future_dates = future_dates
+        self.top_values = top_values or SpaceSaving()
+        self.shapes = shapes
+
+        if self.numeric is None and self.type == 'numeric':
+            self.numeric = NumericAccumulator()
+        if self.shapes is None and self.type != 'numeric':
+            self.shapes = SpaceSaving()
+
+    def update(self, series):
+        """Fold a chunk of this column into the accumulator"""
+        from app.services.analysis_service import AnalysisService
+
+        missing_mask = series.isna().to_numpy()
+        self.total += len(series)
+        self.missing += int(missing_mask.sum())
+        self.unique.add(column_hashes(series)[~missing_mask])
+
+        non_empty = series[~missing_mask]
+        self.top_values.add(non_empty)
+        if self.shapes is not None:
+            self.shapes.add(value_shapes(non_empty))
+
+        if self.type == 'email':
+            matches = non_empty.astype(str).str.match(AnalysisService.EMAIL_PATTERN.pattern)
+            self.invalid_emails += int((~matches.astype(bool)).sum())
+
+        elif self.type == 'date':
+            dates = DateParser.parse(non_empty, self.date_format)
+            self.future_dates += int((dates > pd.Timestamp.now()).sum())
+
+        elif self.type == 'numeric':
+            values = pd.to_numeric(non_empty, errors='coerce').dropna().to_numpy(dtype=np.float64)
+            self.numeric.add(values)
+
+    def to_dict(self):
+        """Column summary in the same shape as AnalysisService.analyze_column"""
+        non_empty = self.total - self.missing
+        missing_percentage = round((self.missing / self.total * 100), 1) if self.total > 0 else 0
+        unique_count = self.unique.count()
+        unique_percentage = round((unique_count / non_empty * 100), 1) if non_empty > 0 else 0
+
+        column_analysis = {
+            'name': self.name,
+            'type': self.type,
+            'totalValues': self.total,
+            'nonEmptyValues': non_empty,
+            'missingCount': self.missing,
+            'missingPercentage': str(missing_percentage),
+            'uniqueCount': unique_count,
+            'uniquePercentage': str(unique_percentage)
+        }
+        if self.date_format:
+            column_analysis['dateFormat'] = self.date_format
+        column_analysis.update(self.type_stats)
+
+        column_analysis['topValues'] = self.top_values.top()
+        if self.shapes is not None:
+            column_analysis['valueShapes'] = self.shapes.top()
+
+        return column_analysis
+
+
+class CorrelationAccumulator:
+    """
+    Mergeable pairwise-complete co-moments of numeric columns.
+
+    Values are shifted by a per-column pivot (the first chunk's mean) and
+    downcast to float32 for the matrix products, in blocks of BLOCK_ROWS;
+    the sums are kept in float64 so chunks fold in without losing precision.
+    """
+
+    BLOCK_ROWS = 65536
+
+    def __init__(self, columns, pivots=None, moments=None):
+        self.columns = list(columns)
+        self.pivots = pivots
+        # Pair counts, sums, sums of squares and cross products; [i, j] is over rows with both present
+        size = len(self.columns)
+        self.moments = moments if moments is not None else np.zeros((4, size, size))
+
+    def add(self, df, cache=None):
+        """Fold a chunk of rows into the co-moments"""
+        if len(df) == 0:
+            return
+
+        values = np.column_stack([
+            (cache.numeric(column) if cache is not None else pd.to_numeric(df[column], errors='coerce'))
+            .to_numpy(dtype='float64', na_value=np.nan)
+            for column in self.columns
+        ])
+
+        if self.pivots is None:
+            present = ~np.isnan(values)
+            counts = present.sum(axis=0)
+            sums = np.where(present, values, 0.0).sum(axis=0)
+            self.pivots = np.divide(sums, counts, out=np.zeros(len(self.columns)), where=counts > 0)
+
+        for start in range(0, len(values), self.BLOCK_ROWS):
+            block = values[start:start + self.BLOCK_ROWS] - self.pivots
+            present = ~np.isnan(block)
+            mask = present.astype(np.float32)
+            shifted = np.where(present, block, 0.0).astype(np.float32)
+
+            self.moments[0] += mask.T @ mask
+            self.moments[1] += shifted.T @ mask
+            self.moments[2] += (shifted * shifted).T @ mask
+            self.moments[3] += shifted.T @ shifted
+
+    def matrix(self):
+        """
+        Pearson correlation matrix over pairwise-complete rows.
+
+        Returns:
+            Tuple of (correlations, pair row counts); NaN where undefined
+        """
+        counts, sums, squares, products = self.moments
+
+        with np.errstate(invalid='ignore', divide='ignore'):
+            covariance = counts * products - sums * sums.T
+            left = counts * squares - sums * sums
+            right = counts * squares.T - sums.T * sums.T
+            correlations = np.clip(covariance / np.sqrt(left * right), -1.0, 1.0)
+
+        correlations[(counts < 3) | ~(left > 0) | ~(right > 0)] = np.nan
+        return correlations, counts
+
+
+class DependencyAccumulator:
+    """
+    Exact counts of (determinant, dependent) value pairs for one candidate
+    functional dependency such as zip -> city.
+
+    Values are tracked by column_hashes, so the state grows with distinct
+    pairs rather than rows. Rows whose dependent value is not the most
+    common one for their determinant value violate the dependency.
+    """
+
+    def __init__(self, determinant, dependent, pairs=None, counts=None):
+        self.determinant = determinant
+        self.dependent = dependent
+        self.pairs = pairs if pairs is not None else np.empty((0, 2), dtype=np.uint64)
+        self.counts = counts if counts is not None else np.empty(0, dtype=np.int64)
+
+    def add(self, df):
+        """Fold a chunk of rows into the pair counts"""
+        present = (df[self.determinant].notna() & df[self.dependent].notna()).to_numpy()
+        if not present.any():
+            return
+
+        frame = pd.DataFrame({
+            'x': np.concatenate([self.pairs[:, 0], column_hashes(df[self.determinant])[present]]),
+            'y': np.concatenate([self.pairs[:, 1], column_hashes(df[self.dependent])[present]]),
+            'count': np.concatenate([self.counts, np.ones(int(present.sum()), dtype=np.int64)])
+        })
+        grouped = frame.groupby(['x', 'y'], sort=False)['count'].sum()
+
+        self.pairs = np.column_stack([
+            grouped.index.get_level_values(0).to_numpy(dtype=np.uint64),
+            grouped.index.get_level_values(1).to_numpy(dtype=np.uint64)
+        ])
+        self.counts = grouped.to_numpy(dtype=np.int64)
+
+    def summary(self):
+        """Dictionary with determinant, dependent, rows, violations and strength"""
+        rows = int(self.counts.sum())
+        if rows == 0:
+            return {'determinant': self.determinant, 'dependent': self.dependent,
+                    'rows': 0, 'violations': 0, 'strength': 1.0}
+
+        expected = int(pd.Series(self.counts).groupby(self.pairs[:, 0]).max().sum())
+        return {
+            'determinant': self.determinant,
+            'dependent': self.dependent,
+            'rows': rows,
+            'violations': rows - expected,
+            'strength': round(expected / rows, 4)
+        }
+
+
+class DatasetState:
+    """
+    Persisted, mergeable accumulators for a whole dataset.
+
+    Lets an appended version of a file be analyzed by folding in only the
+    new rows instead of re-reading the prefix.
+    """
+
+    VERSION = 4
+
+    def __init__(self, columns, row_hash_values=None, duplicates=0, rules=None,
+                 rule_counts=None, rule_keys=None, total_rows=0, dialect=None,
+                 correlation=None, dependencies=None):
+        self.columns = columns
+        self.row_hash_values = row_hash_values if row_hash_values is not None else np.empty(0, dtype=np.uint64)
+        self.duplicates = duplicates
+        self.rules = rules
+        self.rule_counts = rule_counts or {}
+        self.rule_keys = rule_keys or {}
+        self.total_rows = total_rows
+        self.dialect = dialect
+        self.correlation = correlation
+        self.dependencies = dependencies or []
+
+        column_types = {col.name: col.type for col in columns}
+        self.compiled_rules = RuleSet(rules).compile(self.column_names, column_types)
+
+    @property
+    def column_names(self):
+        return [col.name for col in self.columns]
+
+    @classmethod
+    def from_types(cls, column_types, rules=None):
+        """Empty state for (name, type[, date format[, type stats]]) tuples and rule definitions"""
+        return cls([ColumnAccumulator(*spec) for spec in column_types], rules=rules)
+
+    def check_rules(self, rules):
+        """Raise StateInvalidated if the state was built with different rules"""
+        if (rules or None) != (self.rules or None):
+            raise StateInvalidated('Rule definitions changed since the state was built')
+
+    def update(self, df):
+        """Fold a parsed chunk of rows into the state"""
+        if list(df.columns) != self.column_names:
+            raise StateInvalidated('Column layout does not match the persisted state')
+
+        for col in self.columns:
+            col.update(df[col.name])
+
+        masks = RuleSet.evaluate(self.compiled_rules, df)
+        for rule in self.compiled_rules:
+            if rule.type == 'unique':
+                # Uniqueness spans chunks, so track key hashes like row duplicates
+                keys = row_hashes(df[rule.columns])
+                present = df[rule.columns].notna().any(axis=1).to_numpy()
+                seen = self.rule_keys.get(rule.id, np.empty(0, dtype=np.uint64))
+                repeated = masks[rule.id].to_numpy() | (sorted_contains(seen, keys) & present)
+                self.rule_keys[rule.id] = np.union1d(seen, keys[present]).astype(np.uint64)
+                violations = int(repeated.sum())
+            else:
+                violations = int(masks[rule.id].sum())
+            self.rule_counts[rule.id] = self.rule_counts.get(rule.id, 0) + violations
+
+        if self.correlation is not None:
+            self.correlation.add(df)
+        for dependency in self.dependencies:
+            dependency.add(df)
+
+        hashes = row_hashes(df)
+        repeated = pd.Series(hashes).duplicated().to_numpy() | sorted_contains(self.row_hash_values, hashes)
+        self.duplicates += int(repeated.sum())
+        self.row_hash_values = np.union1d(self.row_hash_values, hashes).astype(np.uint64)
+
+        self.total_rows += len(df)
+
+    def compact(self):
+        """Shrink numeric columns to their tails before persisting"""
+        for col in self.columns:
+            if col.numeric is not None:
+                col.numeric.compact()
+
+    def build_analysis(self, file_path):
+        """Produce analysis results in the same shape as AnalysisService.analyze_csv"""
+        from app.services.analysis_service import AnalysisService
+        from app.services.cross_column_service import CrossColumnService
+
+        file_size = StorageService.size(file_path)
+
+        analysis = {
+            'filename': os.path.basename(file_path),
+            'fileSize': AnalysisService.format_file_size(file_size),
+            'fileSizeBytes': file_size,
+            'timestamp': datetime.utcnow().isoformat(),
+            'totalRows': self.total_rows,
+            'totalColumns': len(self.columns),
+            'columns': [col.to_dict() for col in self.columns],
+            'issues': [],
+            'qualityScore': 0
+        }
+
+        AnalysisService.detect_missing_values(analysis, None)
+
+        issues = analysis['issues']
+
+        for col in self.columns:
+            if col.invalid_emails > 0:
+                issues.append(AnalysisService.build_issue('invalid_email', col.invalid_emails, col.name))
+            if col.future_dates > 0:
+                issues.append(AnalysisService.build_issue('future_date', col.future_dates, col.name))
+
+        for col in self.columns:
+            if col.numeric is not None:
+                outliers = col.numeric.outlier_count()
+                if outliers > 0:
+                    issues.append(AnalysisService.build_issue('outlier', outliers, col.name))
+
+        for rule in self.compiled_rules:
+            if self.rule_counts.get(rule.id, 0) > 0:
+                issues.append(rule.build_issue(self.rule_counts[rule.id]))
+
+        if self.duplicates > 0:
+            issues.append(AnalysisService.build_issue('duplicate_rows', self.duplicates))
+
+        analysis['crossColumn'], cross_issues = CrossColumnService.report(self.correlation, self.dependencies)
+        issues.extend(cross_issues)
+
+        analysis['qualityScore'] = AnalysisService.calculate_quality_score(analysis)
+
+        return analysis
+
+    def save(self, path):
+        """Persist the state as a compressed .npz next to the upload"""
+        self.compact()
+
+        meta = {
+            'version': self.VERSION,
+            'total_rows': self.total_rows,
+            'duplicates': self.duplicates,
+            'rules': self.rules,
+            'rule_counts': self.rule_counts,
+            'rule_keys': list(self.rule_keys),
+            'dialect': self.dialect,
+            'correlation': None,
+            'dependencies': [],
+            'columns': []
+        }
+        arrays = {'row_hashes': self.row_hash_values}
+
+        for i, rule_id in enumerate(self.rule_keys):
+            arrays[f'rule_keys_{i}'] = self.rule_keys[rule_id]
+
+        if self.correlation is not None:
+            pivots = self.correlation.pivots
+            meta['correlation'] = {
+                'columns': self.correlation.columns,
+                'pivots': pivots.tolist() if pivots is not None else None
+            }
+            arrays['correlation'] = self.correlation.moments
+
+        for i, dependency in enumerate(self.dependencies):
+            meta['dependencies'].append({'determinant': dependency.determinant, 'dependent': dependency.dependent})
+            arrays[f'dependency_pairs_{i}'] = dependency.pairs
+            arrays[f'dependency_counts_{i}'] = dependency.counts
+
+        for i, col in enumerate(self.columns):
+            col_meta = {
+                'name': col.name,
+                'type': col.type,
+                'date_format': col.date_format,
+                'type_stats': col.type_stats,
+                'total': col.total,
+                'missing': col.missing,
+                'invalid_emails': col.invalid_emails,
+                'future_dates': col.future_dates,
+                'unique_exact': col.unique.exact,
+                'top_values': col.top_values.to_meta(),
+                'shapes': col.shapes.to_meta() if col.shapes is not None else None
+            }
+            if col.unique.exact:
+                arrays[f'unique_{i}'] = col.unique.values
+            else:
+                arrays[f'unique_{i}'] = col.unique.sketch.registers
+
+            if col.numeric is not None:
+                col_meta['numeric'] = {
+                    'n': col.numeric.n,
+                    'mean': col.numeric.mean,
+                    'm2': col.numeric.m2,
+                    'band': list(col.numeric.band) if col.numeric.band is not None else None
+                }
+                arrays[f'tails_{i}'] = col.numeric.tails
+
+            meta['columns'].append(col_meta)
+
+        arrays['meta'] = np.array(json.dumps(meta))
+
+        # np.savez appends .npz unless the handle is opened explicitly
+        tmp_path = f'{path}.tmp'
+        with open(tmp_path, 'wb') as handle:
+            np.savez_compressed(handle, **arrays)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        """Load a state persisted by save()"""
+        with np.load(path, allow_pickle=False) as data:
+            meta = json.loads(str(data['meta']))
+
+            if meta.get('version') != cls.VERSION:
+                raise StateInvalidated('Unsupported state version')
+
+            columns = []
+            for i, col_meta in enumerate(meta['columns']):
+                if col_meta['unique_exact']:
+                    unique = UniqueCounter(values=data[f'unique_{i}'])
+                else:
+                    unique = UniqueCounter(sketch=HyperLogLog(registers=data[f'unique_{i}']))
+
+                numeric = None
+                if 'numeric' in col_meta:
+                    numeric_meta = col_meta['numeric']
+                    numeric = NumericAccumulator(
+                        n=numeric_meta['n'],
+                        mean=numeric_meta['mean'],
+                        m2=numeric_meta['m2'],
+                        band=tuple(numeric_meta['band']) if numeric_meta['band'] is not None else None,
+                        tails=data[f'tails_{i}']
+                    )
+
+                columns.append(ColumnAccumulator(
+                    col_meta['name'],
+                    col_meta['type'],
+                    date_format=col_meta.get('date_format'),
+                    type_stats=col_meta.get('type_stats'),
+                    total=col_meta['total'],
+                    missing=col_meta['missing'],
+                    unique=unique,
+                    numeric=numeric,
+                    invalid_emails=col_meta['invalid_emails'],
+                    future_dates=col_meta['future_dates'],
+                    top_values=SpaceSaving.from_meta(col_meta['top_values']),
+                    shapes=SpaceSaving.from_meta(col_meta['shapes']) if col_meta['shapes'] is not None else None
+                ))
+
+            correlation = None
+            if meta['correlation'] is not None:
+                pivots = meta['correlation']['pivots']
+                correlation = CorrelationAccumulator(
+                    meta['correlation']['columns'],
+                    pivots=np.array(pivots, dtype=np.float64) if pivots is not None else None,
+                    moments=data['correlation']
+                )
+
+            dependencies = [
+                DependencyAccumulator(
+                    dependency['determinant'],
+                    dependency['dependent'],
+                    pairs=data[f'dependency_pairs_{i}'],
+                    counts=data[f'dependency_counts_{i}']
+                )
+                for i, dependency in enumerate(meta['dependencies'])
+            ]
+
+            return cls(
+                columns,
+                row_hash_values=data['row_hashes'],
+                duplicates=meta['duplicates'],
+                rules=meta['rules'],
+                rule_counts=meta['rule_counts'],
+                rule_keys={rule_id: data[f'rule_keys_{i}'] for i, rule_id in enumerate(meta['rule_keys'])},
+                total_rows=meta['total_rows'],
+                dialect=meta.get('dialect'),
+                correlation=correlation,
+                dependencies=dependencies
+            )
+
+
+class AccumulatorService:
+    """Dataset lineage helpers: content hashing, prefix checks and state files"""
+
+    HASH_BLOCK_SIZE = 1024 * 1024
+
+    @staticmethod
+    def state_path(file_path):
+        """Sidecar path holding the persisted accumulators of an upload"""
+        return f'{file_path}.state.npz'
+
+    @staticmethod
+    def file_hash(file_path, length=None):
+        """SHA-256 of the first `length` original bytes of an upload (whole file by default)"""
+        digest = hashlib.sha256()
+        remaining = length
+
+        with StorageService.open(file_path) as handle:
+            while remaining is None or remaining > 0:
+                size = AccumulatorService.HASH_BLOCK_SIZE if remaining is None else min(remaining, AccumulatorService.HASH_BLOCK_SIZE)
+                block = handle.read(size)
+                if not block:
+                    break
+                digest.update(block)
+                if remaining is not None:
+                    remaining -= len(block)
+
+        return digest.hexdigest()
+
+    @staticmethod
+    def prefix_matches(file_path, prefix_bytes, prefix_hash):
+        """Check whether a file starts with the exact bytes a previous analysis saw"""
+        if not prefix_bytes or not prefix_hash:
+            return False
+
+        if StorageService.size(file_path) < prefix_bytes:
+            return False
+
+        # The appended rows must start on a fresh line
+        with StorageService.open(file_path) as handle:
+            handle.seek(prefix_bytes - 1)
+            if handle.read(1) != b'\n':
+                return False
+
+        return AccumulatorService.file_hash(file_path, prefix_bytes) == prefix_hash
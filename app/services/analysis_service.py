@@ -1,19 +1,292 @@
 import os
 import pandas as pd
 import numpy as np
+from pandas.api.types import is_bool_dtype, is_datetime64_any_dtype, is_numeric_dtype
 from datetime import datetime
 import re
+import time
+from functools import partial
+from app.services.metrics_service import MetricsService, StageTimer
+from app.services.sampling_service import SamplingService
+from app.services.storage_service import StorageService
+from app.services.accumulator_service import DatasetState, StateInvalidated, SpaceSaving, value_shapes
+from app.services.rule_engine import RuleSet, ChunkCache, DETECTOR_ISSUE_TYPES
+from app.services.date_parser import DateParser
+from app.services.csv_reader import CsvReader, DIALECT_KEYS
+from app.services.dataset_reader import DatasetReader
+from app.services.dataset_cache import DatasetCache
+from app.services.memory_service import MemoryService
+from app.services.cross_column_service import CrossColumnService
 
 class AnalysisService:
     """Service for analyzing CSV data quality"""
 
+    # Issue kind -> (type, severity, description template)
+    ISSUE_TEMPLATES = {
+        'invalid_email': ('Invalid Format', 'error', '{count} invalid email formats in column "{column}"'),
+        'future_date': ('Invalid Date', 'warning', '{count} future dates detected in column "{column}"'),
+        'outlier': ('Statistical Outlier', 'info', '{count} statistical outliers detected in column "{column}"'),
+        'negative_value': ('Logical Inconsistency', 'error', '{count} negative values in column "{column}" where positive expected'),
+        'price_below_cost': ('Logical Inconsistency', 'error', '{count} products with selling price below cost price'),
+        'stock_below_reorder': ('Business Rule Violation', 'warning', '{count} products with stock level below reorder threshold'),
+        'duplicate_rows': ('Duplicate Records', 'warning', '{count} duplicate records detected in dataset'),
+        'dependency_violation': ('Dependency Violation', 'warning',
+                                 '{count} rows where "{column}" maps to a different "{dependent}" than usual')
+    }
+
+    @staticmethod
+    def analyze_csv(file_path, include_timings=False, state_path=None, rules=None, job=None):
+        """Main analysis function - analyzes CSV file and returns comprehensive results
+
+        When include_timings is set, a per-stage timing breakdown is attached
+        to the results under 'timings'. When state_path is given, mergeable
+        accumulators are persisted there so appended versions of the file can
+        be analyzed incrementally. rules is a list of rule definitions for the
+        rule engine; None applies the built-in rules. job (an AnalysisJob)
+        receives progress and can cancel the analysis between stages; the
+        file is parsed in one call, so a cancel during the parse is only
+        seen once it returns (analyze_chunked checks between chunks).
+        """
+        timer = StageTimer(job)
+
+        with timer.stage('parse'):
+            df, parser = DatasetReader.read(file_path)
+        if job is not None:
+            job.read_all(len(df))
+
+        analysis = AnalysisService.build_analysis(df, file_path, timer, rules=rules)
+        analysis['parser'] = parser
+
+        if state_path:
+            with timer.stage('state_build'):
+                state = DatasetState.from_types(
+                    [(col['name'], col['type'], col.get('dateFormat'),
+                      {key: col[key] for key in AnalysisService.TYPE_STAT_KEYS if key in col})
+                     for col in analysis['columns']],
+                    rules=rules
+                )
+                if parser['format'] == 'csv':
+                    state.dialect = {key: parser[key] for key in DIALECT_KEYS}
+                cross_column = analysis['crossColumn']
+                state.correlation, state.dependencies = CrossColumnService.accumulators(
+                    cross_column['correlationColumns'],
+                    [(dep['determinant'], dep['dependent']) for dep in cross_column['dependencies']]
+                )
+                state.update(df)
+                state.save(state_path)
+
+        MetricsService.observe_analysis(len(df), time.perf_counter() - timer.started)
+
+        if include_timings:
+            analysis['timings'] = timer.breakdown(rows=len(df))
+
+        return analysis
+
+    @staticmethod
+    def analyze_file(file_path, include_timings=False, state_path=None, rules=None, job=None):
+        """
+        Analyze an upload with the engine its estimated memory calls for.
+
+        Small jobs run analyze_csv; jobs over the in-memory limit stream in
+        chunks through analyze_chunked. Either way the job first reserves its
+        estimate against the shared memory budget, queueing until it fits.
+
+        Raises:
+            AdmissionTimeout: the memory budget stayed full for too long
+            AnalysisCancelled: job was cancelled while queued or running
+        """
+        plan = MemoryService.plan(file_path)
+        if job is not None:
+            job.advance(engine=plan['engine'])
+
+        with MemoryService.admit(plan['reserveBytes'], check=job.check if job is not None else None):
+            if plan['engine'] == 'chunked':
+                analysis = AnalysisService.analyze_chunked(
+                    file_path, plan['chunkRows'],
+                    include_timings=include_timings, state_path=state_path, rules=rules, job=job
+                )
+            else:
+                analysis = AnalysisService.analyze_csv(
+                    file_path, include_timings=include_timings, state_path=state_path, rules=rules, job=job
+                )
+
+        analysis['memoryPlan'] = plan
+        return analysis
+
+    @staticmethod
+    def analyze_chunked(file_path, chunk_rows, include_timings=False, state_path=None, rules=None, job=None):
+        """
+        Analyze a file in bounded memory by streaming it in chunks.
+
+        Types come from a stratified sample up front; every chunk is then
+        folded into the same mergeable accumulators incremental analysis
+        uses, so only one chunk is ever held as a DataFrame. A job is
+        checked for cancellation before every chunk.
+        """
+        timer = StageTimer(job)
+
+        with timer.stage('infer_types'):
+            probe = DatasetReader.probe(file_path)
+            details = AnalysisService.infer_types_from_file(file_path)
+            state = DatasetState.from_types(
+                [(name, info['type'], info.get('dateFormat'),
+                  {key: info[key] for key in AnalysisService.TYPE_STAT_KEYS})
+                 for name, info in details.items()],
+                rules=rules
+            )
+            if probe['format'] == 'csv':
+                state.dialect = {key: probe[key] for key in DIALECT_KEYS}
+
+        with timer.stage('plan_cross_column'):
+            sample, _ = SamplingService.sample_file(
+                file_path,
+                sample_size=CrossColumnService.SAMPLE_ROWS,
+                strata=CrossColumnService.SAMPLE_STRATA,
+                seed=CrossColumnService.SAMPLE_SEED
+            )
+            state.correlation, state.dependencies = CrossColumnService.accumulators(
+                *CrossColumnService.plan(sample, {name: info['type'] for name, info in details.items()})
+            )
+
+        rows = 0
+        progress = (lambda bytes_read: job.advance(bytes_read=bytes_read)) if job is not None else None
+        chunks = DatasetReader.iter_chunks(file_path, chunk_rows, probe=probe, progress=progress)
+        while True:
+            with timer.stage('parse'):
+                df = next(chunks, None)
+            if df is None:
+                break
+
+            with timer.stage('accumulate'):
+                # NDJSON chunks only carry the keys present in their records
+                if list(df.columns) != state.column_names:
+                    df = df.reindex(columns=state.column_names)
+                state.update(df)
+            rows += len(df)
+            if job is not None:
+                job.advance(rows=rows)
+
+        with timer.stage('build_results'):
+            analysis = state.build_analysis(file_path)
+
+        analysis['parser'] = dict(state.dialect or {}, format=probe['format'], engine='chunked')
+
+        if state_path:
+            with timer.stage('state_save'):
+                state.save(state_path)
+
+        MetricsService.observe_analysis(rows, time.perf_counter() - timer.started)
+
+        if include_timings:
+            analysis['timings'] = timer.breakdown(rows=rows)
+
+        return analysis
+
+    @staticmethod
+    def analyze_incremental(file_path, prefix_bytes, parent_state_path, state_path=None,
+                            include_timings=False, rules=None, job=None):
+        """
+        Analyze a file that extends a previously analyzed file by appended rows.
+
+        Only the bytes after prefix_bytes are parsed; they are folded into the
+        parent's persisted accumulators and the results are rebuilt from them.
+        Raises StateInvalidated when the state cannot produce exact results,
+        in which case callers should fall back to analyze_csv.
+        """
+        if DatasetReader.format(file_path) != 'csv':
+            raise StateInvalidated('Only CSV uploads can be extended by appended rows')
+
+        timer = StageTimer(job)
+
+        with timer.stage('state_load'):
+            state = DatasetState.load(parent_state_path)
+            state.check_rules(rules)
+
+        with timer.stage('parse'):
+            with StorageService.open(file_path) as handle:
+                handle.seek(prefix_bytes)
+                delta = handle.read()
+
+            # The delta has no header; parse it with the dialect of the original
+            dialect = state.dialect or CsvReader.sniff(file_path)
+            if delta.strip():
+                df, parser = CsvReader.read_bytes(delta, dialect, names=state.column_names)
+            else:
+                df = pd.DataFrame(columns=state.column_names)
+                parser = dict(dialect, engine=None)
+        if job is not None:
+            job.read_all(len(df))
+
+        with timer.stage('accumulate'):
+            state.update(df)
+
+        with timer.stage('build_results'):
+            analysis = state.build_analysis(file_path)
+
+        if state_path:
+            with timer.stage('state_save'):
+                state.save(state_path)
+
+        MetricsService.observe_analysis(len(df), time.perf_counter() - timer.started)
+
+        analysis['parser'] = dict({key: parser[key] for key in DIALECT_KEYS + ('engine',)}, format='csv')
+        analysis['incremental'] = {
+            'deltaRows': len(df),
+            'prefixBytes': prefix_bytes
+        }
+
+        if include_timings:
+            analysis['timings'] = timer.breakdown(rows=len(df))
+
+        return analysis
+
     @staticmethod
-    def analyze_csv(file_path):
-        """Main analysis function - analyzes CSV file and returns comprehensive results"""
-        df = pd.read_csv(file_path)
+    def analyze_preview(file_path, sample_size=2000, strata=20, rules=None):
+        """
+        Quick estimate of analyze_csv from a stratified row sample.
+
+        Issue and missing-value counts are extrapolated to the estimated row
+        count with 95% confidence bounds. The result is marked with
+        'preview': True and is meant to be replaced by the full analysis.
+        """
+        timer = StageTimer()
+
+        with timer.stage('preview_sample'):
+            df, sample_info = SamplingService.sample_file(file_path, sample_size=sample_size, strata=strata)
 
+        analysis = AnalysisService.build_analysis(df, file_path, timer, rules=rules)
+
+        sample_rows = sample_info['sampledRows']
+        total_rows = sample_info['estimatedTotalRows']
+
+        analysis['preview'] = True
+        analysis['parser'] = sample_info['parser']
+        analysis['sampledRows'] = sample_rows
+        analysis['totalRows'] = total_rows
+
+        if not sample_info['exhaustive']:
+            for col_analysis in analysis['columns']:
+                missing = SamplingService.extrapolate_count(col_analysis['missingCount'], sample_rows, total_rows)
+                col_analysis['totalValues'] = total_rows
+                col_analysis['missingCount'] = missing['estimate']
+                col_analysis['nonEmptyValues'] = total_rows - missing['estimate']
+
+            for issue in analysis['issues']:
+                bounds = SamplingService.extrapolate_count(issue['count'], sample_rows, total_rows)
+                issue['sampleCount'] = issue['count']
+                issue['count'] = bounds['estimate']
+                issue['countLower'] = bounds['lower']
+                issue['countUpper'] = bounds['upper']
+
+        analysis['timings'] = timer.breakdown(rows=sample_rows)
+
+        return analysis
+
+    @staticmethod
+    def build_analysis(df, file_path, timer, rules=None):
+        """Run column profiling and every detector over an already parsed frame"""
         filename = os.path.basename(file_path)
-        file_size = os.path.getsize(file_path)
+        file_size = StorageService.size(file_path)
 
         analysis = {
             'filename': filename,
@@ -27,38 +300,88 @@ class AnalysisService:
             'qualityScore': 0
         }
 
+        type_sample = AnalysisService.type_sample(df)
+
         for column in df.columns:
-            column_analysis = AnalysisService.analyze_column(df, column)
+            with timer.stage('column_stats'):
+                column_analysis = AnalysisService.analyze_column(df, column, timer=timer, sample=type_sample)
             analysis['columns'].append(column_analysis)
 
-        AnalysisService.detect_missing_values(analysis, df)
-        AnalysisService.detect_invalid_formats(analysis, df)
-        AnalysisService.detect_outliers(analysis, df)
-        AnalysisService.detect_logical_issues(analysis, df)
-        AnalysisService.detect_duplicates(analysis, df)
+        # Parsed dates and numeric conversions are shared by every detector
+        cache = ChunkCache(df)
+
+        detectors = [
+            ('detect_missing_values', AnalysisService.detect_missing_values),
+            ('detect_invalid_formats', partial(AnalysisService.detect_invalid_formats, cache=cache)),
+            ('detect_outliers', partial(AnalysisService.detect_outliers, cache=cache)),
+            ('detect_rule_violations', partial(AnalysisService.detect_rule_violations, rules=rules, cache=cache)),
+            ('detect_duplicates', AnalysisService.detect_duplicates),
+            ('detect_cross_column', partial(AnalysisService.detect_cross_column, cache=cache))
+        ]
+
+        for stage, detector in detectors:
+            with timer.stage(stage):
+                detector(analysis, df)
 
         analysis['qualityScore'] = AnalysisService.calculate_quality_score(analysis)
 
         return analysis
 
     @staticmethod
-    def analyze_column(df, column_name):
-        """Analyze individual column"""
+    def type_sample(df):
+        """Rows used for type inference: a stratified sample over the whole frame"""
+        positions = SamplingService.stratified_positions(
+            len(df),
+            AnalysisService.TYPE_SAMPLE_ROWS,
+            AnalysisService.TYPE_SAMPLE_STRATA,
+            seed=AnalysisService.TYPE_SAMPLE_SEED
+        )
+        return df if len(positions) == len(df) else df.iloc[positions]
+
+    @staticmethod
+    def infer_types_from_file(file_path):
+        """
+        Type details per column without parsing the whole file.
+
+        CSV rows come from SamplingService.sample_csv, which seeks to byte
+        offsets in equal strata: on raw files only the sampled lines are
+        read, while compressed uploads are decompressed up to the last
+        offset (see SamplingService.sample_lines). Either way only the
+        sampled rows are parsed.
+        """
+        sample, _ = SamplingService.sample_file(
+            file_path,
+            sample_size=AnalysisService.TYPE_SAMPLE_ROWS,
+            strata=AnalysisService.TYPE_SAMPLE_STRATA,
+            seed=AnalysisService.TYPE_SAMPLE_SEED
+        )
+        return {column: AnalysisService.infer_type_details(sample[column].dropna()) for column in sample.columns}
+
+    @staticmethod
+    def analyze_column(df, column_name, timer=None, sample=None):
+        """Analyze individual column; types are inferred from `sample` (default: type_sample(df))"""
         series = df[column_name]
+        sample = sample if sample is not None else AnalysisService.type_sample(df)
 
         non_empty = series.dropna()
         total = len(series)
         missing_count = total - len(non_empty)
         missing_percentage = round((missing_count / total * 100), 1) if total > 0 else 0
 
-        unique_count = series.nunique()
+        # One exact count serves both the distinct count and the top-k profile
+        value_counts = non_empty.value_counts()
+        unique_count = len(value_counts)
         unique_percentage = round((unique_count / len(non_empty) * 100), 1) if len(non_empty) > 0 else 0
 
-        data_type = AnalysisService.infer_data_type(non_empty)
+        if timer is not None:
+            with timer.stage('infer_types'):
+                details = AnalysisService.infer_type_details(sample[column_name].dropna())
+        else:
+            details = AnalysisService.infer_type_details(sample[column_name].dropna())
 
-        return {
+        column_analysis = {
             'name': column_name,
-            'type': data_type,
+            'type': details['type'],
             'totalValues': total,
             'nonEmptyValues': len(non_empty),
             'missingCount': missing_count,
@@ -66,34 +389,96 @@ class AnalysisService:
             'uniqueCount': unique_count,
             'uniquePercentage': str(unique_percentage)
         }
+        for key in ('dateFormat',) + AnalysisService.TYPE_STAT_KEYS:
+            if key in details:
+                column_analysis[key] = details[key]
+
+        column_analysis['topValues'] = SpaceSaving.from_counts(value_counts).top()
+        if details['type'] != 'numeric':
+            shape_counts = value_shapes(non_empty).value_counts()
+            column_analysis['valueShapes'] = SpaceSaving.from_counts(shape_counts).top()
+
+        return column_analysis
 
     @staticmethod
     def infer_data_type(series):
         """Infer the data type of a column"""
-        if len(series) == 0:
-            return 'unknown'
+        return AnalysisService.infer_type_details(series)['type']
+
+    @staticmethod
+    def infer_type_details(sample):
+        """
+        Infer the data type of a column from a sample of its non-empty values.
+
+        Returns:
+            Dictionary with type, dateFormat (date columns), typeConfidence
+            (Wilson lower bound of the share of values fitting the type),
+            mixedTypeRatio (share that does not fit) and typeSampleSize
+        """
+        size = len(sample)
+        if size == 0:
+            return {'type': 'unknown', 'typeConfidence': 0.0, 'mixedTypeRatio': 0.0, 'typeSampleSize': 0}
+
+        # Typed columns (Parquet, NDJSON, numeric CSV columns) need no inference
+        if is_datetime64_any_dtype(sample):
+            details, share = {'type': 'date'}, 1.0
+        elif is_numeric_dtype(sample) and not is_bool_dtype(sample):
+            details, share = {'type': 'numeric'}, 1.0
+        else:
+            details, share = AnalysisService.infer_text_type(sample)
+
+        details['typeConfidence'] = round(float(SamplingService.wilson_lower(share * size, size)), 3)
+        details['mixedTypeRatio'] = round(float(1 - share), 3)
+        details['typeSampleSize'] = size
+        return details
 
-        sample = series.head(100)
+    @staticmethod
+    def infer_text_type(sample):
+        """
+        Infer the type of values held as text.
 
-        email_pattern = re.compile(r'^[^\s@]+@[^\s@]+\.[^\s@]+$')
-        email_count = sum(1 for val in sample.astype(str) if email_pattern.match(str(val)))
+        Returns:
+            Tuple of (details dict with type and optional dateFormat, share of the sample fitting it)
+        """
+        email_ratio = sample.astype(str).str.match(AnalysisService.EMAIL_PATTERN.pattern).mean()
+        if email_ratio > 0.5:
+            return {'type': 'email'}, email_ratio
 
-        if email_count > len(sample) * 0.5:
-            return 'email'
+        date_format, date_ratio = DateParser.infer_format(sample)
+        if date_format is not None:
+            return {'type': 'date', 'dateFormat': date_format}, date_ratio
 
-        try:
-            pd.to_datetime(sample, errors='coerce')
-            date_count = sample.astype(str).str.contains('-').sum()
-            if date_count > len(sample) * 0.5:
-                return 'date'
-        except:
-            pass
+        numeric_ratio = pd.to_numeric(sample, errors='coerce').notna().mean()
+        if numeric_ratio > 0.8:
+            return {'type': 'numeric'}, numeric_ratio
 
-        numeric_count = pd.to_numeric(sample, errors='coerce').notna().sum()
-        if numeric_count > len(sample) * 0.8:
-            return 'numeric'
+        return {'type': 'text'}, 1 - max(email_ratio, date_ratio, numeric_ratio)
+
+    EMAIL_PATTERN = re.compile(r'^[^\s@]+@[^\s@]+\.[^\s@]+$')
+
+    # Type inference looks at a stratified sample of rows from the whole file
+    TYPE_SAMPLE_ROWS = 1000
+    TYPE_SAMPLE_STRATA = 20
+    TYPE_SAMPLE_SEED = 0
+    TYPE_STAT_KEYS = ('typeConfidence', 'mixedTypeRatio', 'typeSampleSize')
+
+    @staticmethod
+    def build_issue(kind, count, column=None, **fields):
+        """Build an issue entry from ISSUE_TEMPLATES; fields fill extra template placeholders"""
+        issue_type, severity, template = AnalysisService.ISSUE_TEMPLATES[kind]
+        # Counts often arrive as NumPy scalars from .sum(); results must stay plain-JSON serializable
+        count = int(count)
+
+        issue = {
+            'type': issue_type,
+            'severity': severity,
+            'count': count
+        }
+        if column is not None:
+            issue['column'] = column
+        issue['description'] = template.format(count=count, column=column, **fields)
 
-        return 'text'
+        return issue
 
     @staticmethod
     def detect_missing_values(analysis, df):
@@ -112,48 +497,36 @@ class AnalysisService:
                 })
 
     @staticmethod
-    def detect_invalid_formats(analysis, df):
+    def detect_invalid_formats(analysis, df, cache=None):
         """Detect invalid formats (email, dates, etc.)"""
+        cache = cache or ChunkCache(df)
+
         for col_analysis in analysis['columns']:
             column_name = col_analysis['name']
             series = df[column_name].dropna()
 
             if col_analysis['type'] == 'email':
-                email_pattern = re.compile(r'^[^\s@]+@[^\s@]+\.[^\s@]+$')
-                invalid_count = sum(1 for val in series if not email_pattern.match(str(val)))
+                invalid_count = sum(1 for val in series if not AnalysisService.EMAIL_PATTERN.match(str(val)))
 
                 if invalid_count > 0:
-                    analysis['issues'].append({
-                        'type': 'Invalid Format',
-                        'severity': 'error',
-                        'count': invalid_count,
-                        'column': column_name,
-                        'description': f"{invalid_count} invalid email formats in column \"{column_name}\""
-                    })
+                    analysis['issues'].append(AnalysisService.build_issue('invalid_email', invalid_count, column_name))
 
             if col_analysis['type'] == 'date':
-                try:
-                    dates = pd.to_datetime(series, errors='coerce')
-                    future_dates = (dates > pd.Timestamp.now()).sum()
-
-                    if future_dates > 0:
-                        analysis['issues'].append({
-                            'type': 'Invalid Date',
-                            'severity': 'warning',
-                            'count': int(future_dates),
-                            'column': column_name,
-                            'description': f"{future_dates} future dates detected in column \"{column_name}\""
-                        })
-                except:
-                    pass
+                dates = cache.dates(column_name, col_analysis.get('dateFormat'))
+                future_dates = (dates > pd.Timestamp.now()).sum()
+
+                if future_dates > 0:
+                    analysis['issues'].append(AnalysisService.build_issue('future_date', future_dates, column_name))
 
     @staticmethod
-    def detect_outliers(analysis, df):
+    def detect_outliers(analysis, df, cache=None):
         """Detect statistical outliers in numeric columns"""
+        cache = cache or ChunkCache(df)
+
         for col_analysis in analysis['columns']:
             if col_analysis['type'] == 'numeric':
                 column_name = col_analysis['name']
-                series = pd.to_numeric(df[column_name], errors='coerce').dropna()
+                series = cache.numeric(column_name).dropna()
 
                 if len(series) > 0:
                     mean = series.mean()
@@ -163,75 +536,19 @@ class AnalysisService:
                         outliers = ((series - mean).abs() > 3 * std).sum()
 
                         if outliers > 0:
-                            analysis['issues'].append({
-                                'type': 'Statistical Outlier',
-                                'severity': 'info',
-                                'count': int(outliers),
-                                'column': column_name,
-                                'description': f"{outliers} statistical outliers detected in column \"{column_name}\""
-                            })
+                            analysis['issues'].append(AnalysisService.build_issue('outlier', outliers, column_name))
 
     @staticmethod
-    def detect_logical_issues(analysis, df):
-        """Detect logical inconsistencies"""
-        positive_keywords = ['age', 'price', 'quantity', 'stock', 'amount', 'cost', 'selling']
-
-        for col_analysis in analysis['columns']:
-            if col_analysis['type'] == 'numeric':
-                column_name = col_analysis['name']
-
-                if any(keyword in column_name.lower() for keyword in positive_keywords):
-                    series = pd.to_numeric(df[column_name], errors='coerce').dropna()
-                    negative_count = (series < 0).sum()
+    def detect_rule_violations(analysis, df, rules=None, cache=None):
+        """Evaluate declarative rules (defaults plus any custom rules) in one pass"""
+        column_types = {col['name']: col['type'] for col in analysis['columns']}
+        compiled = RuleSet(rules).compile(df.columns, column_types)
 
-                    if negative_count > 0:
-                        analysis['issues'].append({
-                            'type': 'Logical Inconsistency',
-                            'severity': 'error',
-                            'count': int(negative_count),
-                            'column': column_name,
-                            'description': f"{negative_count} negative values in column \"{column_name}\" where positive expected"
-                        })
-
-        cost_cols = [col for col in df.columns if 'cost' in col.lower() and 'price' in col.lower()]
-        selling_cols = [col for col in df.columns if 'selling' in col.lower() and 'price' in col.lower()]
-
-        if cost_cols and selling_cols:
-            cost_col = cost_cols[0]
-            selling_col = selling_cols[0]
-
-            cost_series = pd.to_numeric(df[cost_col], errors='coerce')
-            selling_series = pd.to_numeric(df[selling_col], errors='coerce')
-
-            price_issues = ((selling_series < cost_series) & cost_series.notna() & selling_series.notna()).sum()
-
-            if price_issues > 0:
-                analysis['issues'].append({
-                    'type': 'Logical Inconsistency',
-                    'severity': 'error',
-                    'count': int(price_issues),
-                    'description': f"{price_issues} products with selling price below cost price"
-                })
-
-        stock_cols = [col for col in df.columns if 'stock' in col.lower() and 'current' in col.lower()]
-        reorder_cols = [col for col in df.columns if 'reorder' in col.lower()]
-
-        if stock_cols and reorder_cols:
-            stock_col = stock_cols[0]
-            reorder_col = reorder_cols[0]
-
-            stock_series = pd.to_numeric(df[stock_col], errors='coerce')
-            reorder_series = pd.to_numeric(df[reorder_col], errors='coerce')
-
-            stock_issues = ((stock_series < reorder_series) & stock_series.notna() & reorder_series.notna()).sum()
-
-            if stock_issues > 0:
-                analysis['issues'].append({
-                    'type': 'Business Rule Violation',
-                    'severity': 'warning',
-                    'count': int(stock_issues),
-                    'description': f"{stock_issues} products with stock level below reorder threshold"
-                })
+        for rule_id, mask in RuleSet.evaluate(compiled, df, cache).items():
+            violations = mask.sum()
+            if violations > 0:
+                rule = next(r for r in compiled if r.id == rule_id)
+                analysis['issues'].append(rule.build_issue(violations))
 
     @staticmethod
     def detect_duplicates(analysis, df):
@@ -239,12 +556,23 @@ class AnalysisService:
         duplicate_count = df.duplicated().sum()
 
         if duplicate_count > 0:
-            analysis['issues'].append({
-                'type': 'Duplicate Records',
-                'severity': 'warning',
-                'count': int(duplicate_count),
-                'description': f"{duplicate_count} duplicate records detected in dataset"
-            })
+            analysis['issues'].append(AnalysisService.build_issue('duplicate_rows', duplicate_count))
+
+    @staticmethod
+    def detect_cross_column(analysis, df, cache=None):
+        """Profile correlations between numeric columns and detect functional dependency violations"""
+        column_types = {col['name']: col['type'] for col in analysis['columns']}
+        correlation, dependencies = CrossColumnService.accumulators(
+            *CrossColumnService.plan(CrossColumnService.sample(df), column_types)
+        )
+
+        if correlation is not None:
+            correlation.add(df, cache)
+        for dependency in dependencies:
+            dependency.add(df)
+
+        analysis['crossColumn'], issues = CrossColumnService.report(correlation, dependencies)
+        analysis['issues'].extend(issues)
 
     @staticmethod
     def calculate_quality_score(analysis):
@@ -280,7 +608,79 @@ class AnalysisService:
         return f"{round(size, 2)} {sizes[i]}"
 
     @staticmethod
-    def get_affected_rows(file_path, issue_type, column_name=None, limit=50, offset=0):
+    def columnar_values(page_df, columns):
+        """
+        Convert a page of rows to one list per column, row_index first.
+
+        Conversion is vectorized per column; missing values become None.
+        """
+        if page_df.empty:
+            return [[] for _ in range(len(columns) + 1)]
+
+        values = [(page_df.index + 1).tolist()]
+        for column in columns:
+            series = page_df[column]
+            values.append(series.astype(object).where(series.notna(), None).tolist())
+        return values
+
+    FILTER_OPERATORS = ('eq', 'ne', 'lt', 'le', 'gt', 'ge', 'contains', 'isnull', 'notnull')
+
+    @staticmethod
+    def parse_row_filter(column, spec):
+        """
+        Parse one affected-rows filter given as "<op>:<value>" (or just "isnull"/"notnull").
+
+        Returns:
+            Tuple of (column, op, value)
+
+        Raises:
+            ValueError: Unknown operator or missing value
+        """
+        op, separator, value = spec.partition(':')
+        if op not in AnalysisService.FILTER_OPERATORS:
+            raise ValueError(f'Unknown filter operator: {op}')
+        if op not in ('isnull', 'notnull') and not separator:
+            raise ValueError(f'Filter on "{column}" requires a value')
+        return column, op, value
+
+    @staticmethod
+    def apply_row_filters(df, filters):
+        """Boolean mask of rows matching every (column, op, value) filter"""
+        mask = pd.Series(True, index=df.index)
+
+        for column, op, value in filters:
+            series = df[column]
+            if op == 'isnull':
+                mask &= series.isna()
+                continue
+            if op == 'notnull':
+                mask &= series.notna()
+                continue
+            if op == 'contains':
+                mask &= series.astype(str).str.contains(value, case=False, regex=False) & series.notna()
+                continue
+
+            # Numeric comparison when the value is a number, text comparison otherwise
+            number = pd.to_numeric(pd.Series([value]), errors='coerce').iloc[0]
+            if pd.notna(number):
+                left, right = pd.to_numeric(series, errors='coerce'), number
+            else:
+                left, right = series.astype(str), value
+
+            compare = {
+                'eq': left == right, 'ne': left != right,
+                'lt': left < right, 'le': left <= right,
+                'gt': left > right, 'ge': left >= right
+            }[op]
+            mask &= compare & series.notna()
+
+        return mask
+
+    @staticmethod
+    def get_affected_rows(file_path, issue_type, column_name=None, limit=50, offset=0,
+                          rules=None, rule_id=None, response_format='rows',
+                          columns=None, sort_by=None, descending=False, filters=None,
+                          dependent_column=None):
         """
         Get rows affected by a specific issue
 
@@ -290,26 +690,65 @@ class AnalysisService:
             column_name: Column affected by issue (optional)
             limit: Maximum rows to return
             offset: Offset for pagination
+            rules: Rule definitions used for the analysis (None for built-in rules)
+            rule_id: Id of the rule behind a rule-engine issue (optional)
+            response_format: 'rows' (one object per row) or 'columnar'
+                (column names once, one value array per column, nulls as null)
+            columns: Optional list of columns to return (projection)
+            sort_by: Optional column to sort the affected rows by
+            descending: Sort direction for sort_by
+            filters: Optional list of (column, op, value) from parse_row_filter
+            dependent_column: Dependent column of a Dependency Violation issue
 
         Returns:
-            Dictionary with rows, columns, total_count, has_more
+            Dictionary with rows (or values), columns, total_count, has_more
+
+        Raises:
+            ValueError: columns, sort_by or filters reference unknown columns
         """
+        filters = filters or []
+        probe = DatasetCache.probe(file_path)
+        header = probe['header']
+
+        requested = list(columns or []) + ([sort_by] if sort_by else []) + [f[0] for f in filters]
+        unknown = [col for col in requested if col not in header]
+        if unknown:
+            raise ValueError(f'Unknown column(s): {", ".join(unknown)}')
+
         try:
-            df = pd.read_csv(file_path)
+            # A rule id names the rule even when its issue type matches a built-in check
+            rule = None
+            if rule_id is not None or issue_type not in DETECTOR_ISSUE_TYPES:
+                compiled = RuleSet(rules).compile(header)
+                rule = RuleSet.find(compiled, rule_id=rule_id, issue_type=issue_type, column=column_name)
+
+            # Only materialize the columns the mask, filters, sort and projection need
+            output_columns = [col for col in header if col in columns] if columns else header
+            if (rule is None and issue_type == 'Duplicate Records') or not columns:
+                usecols = None
+            else:
+                needed = set(requested) | set(rule.columns if rule is not None else [])
+                needed.update(col for col in (column_name, dependent_column) if col in header)
+                usecols = [col for col in header if col in needed]
+
+            with MetricsService.timed('affected_rows_parse'):
+                df, _ = DatasetCache.read(file_path, usecols=usecols, probe=probe)
             total_rows = len(df)
 
-            if issue_type == 'Missing Values' and column_name:
+            if rule is not None:
+                filtered_df = df[rule.mask(df, all_occurrences=True)]
+
+            elif issue_type == 'Missing Values' and column_name:
                 mask = df[column_name].isna() | (df[column_name].astype(str).str.strip() == '')
                 filtered_df = df[mask]
 
             elif issue_type == 'Invalid Format' and column_name:
-                email_pattern = re.compile(r'^[^\s@]+@[^\s@]+\.[^\s@]+$')
-                mask = ~df[column_name].dropna().astype(str).apply(lambda x: bool(email_pattern.match(x)))
+                mask = ~df[column_name].dropna().astype(str).apply(lambda x: bool(AnalysisService.EMAIL_PATTERN.match(x)))
                 filtered_df = df[df[column_name].notna()][mask]
 
             elif issue_type == 'Invalid Date' and column_name:
-                dates = pd.to_datetime(df[column_name], errors='coerce')
-                future_mask = dates > pd.Timestamp.now()
+                date_format, _ = DateParser.infer_format(AnalysisService.type_sample(df)[column_name].dropna())
+                future_mask = DateParser.parse(df[column_name], date_format) > pd.Timestamp.now()
                 filtered_df = df[future_mask]
 
             elif issue_type == 'Statistical Outlier' and column_name:
@@ -322,76 +761,57 @@ class AnalysisService:
                     mask = ((series - mean).abs() > 3 * std) & series.notna()
                     filtered_df = df[mask]
                 else:
-                    filtered_df = pd.DataFrame()
-
-            elif issue_type == 'Logical Inconsistency':
-                if column_name:
-                    positive_keywords = ['age', 'price', 'quantity', 'stock', 'amount', 'cost', 'selling']
-                    if any(keyword in column_name.lower() for keyword in positive_keywords):
-                        series = pd.to_numeric(df[column_name], errors='coerce')
-                        mask = (series < 0) & series.notna()
-                        filtered_df = df[mask]
-                    else:
-                        filtered_df = pd.DataFrame()
-                else:
-                    cost_cols = [col for col in df.columns if 'cost' in col.lower() and 'price' in col.lower()]
-                    selling_cols = [col for col in df.columns if 'selling' in col.lower() and 'price' in col.lower()]
-
-                    if cost_cols and selling_cols:
-                        cost_col = cost_cols[0]
-                        selling_col = selling_cols[0]
-                        cost_series = pd.to_numeric(df[cost_col], errors='coerce')
-                        selling_series = pd.to_numeric(df[selling_col], errors='coerce')
-                        mask = (selling_series < cost_series) & cost_series.notna() & selling_series.notna()
-                        filtered_df = df[mask]
-                    else:
-                        filtered_df = pd.DataFrame()
-
-            elif issue_type == 'Business Rule Violation':
-                stock_cols = [col for col in df.columns if 'stock' in col.lower() and 'current' in col.lower()]
-                reorder_cols = [col for col in df.columns if 'reorder' in col.lower()]
-
-                if stock_cols and reorder_cols:
-                    stock_col = stock_cols[0]
-                    reorder_col = reorder_cols[0]
-                    stock_series = pd.to_numeric(df[stock_col], errors='coerce')
-                    reorder_series = pd.to_numeric(df[reorder_col], errors='coerce')
-                    mask = (stock_series < reorder_series) & stock_series.notna() & reorder_series.notna()
-                    filtered_df = df[mask]
-                else:
-                    filtered_df = pd.DataFrame()
+                    filtered_df = pd.DataFrame(columns=df.columns)
+
+            elif issue_type == 'Dependency Violation' and column_name and dependent_column:
+                filtered_df = df[CrossColumnService.violation_mask(df, column_name, dependent_column)]
 
             elif issue_type == 'Duplicate Records':
                 mask = df.duplicated(keep=False)
                 filtered_df = df[mask]
 
             else:
-                filtered_df = pd.DataFrame()
+                # A rule issue whose rule no longer compiles against this file
+                filtered_df = pd.DataFrame(columns=df.columns)
+
+            if filters and not filtered_df.empty:
+                filtered_df = filtered_df[AnalysisService.apply_row_filters(filtered_df, filters)]
+
+            if sort_by and not filtered_df.empty:
+                sort_key = pd.to_numeric(filtered_df[sort_by], errors='coerce')
+                if sort_key.notna().sum() < filtered_df[sort_by].notna().sum():
+                    sort_key = filtered_df[sort_by].astype(str).where(filtered_df[sort_by].notna())
+                order = sort_key.sort_values(ascending=not descending, kind='stable', na_position='last').index
+                filtered_df = filtered_df.loc[order]
 
             total_affected = len(filtered_df)
 
             paginated_df = filtered_df.iloc[offset:offset + limit]
 
-            rows = []
-            for idx, row in paginated_df.iterrows():
-                row_dict = {'row_index': int(idx) + 1}
-                row_dict.update({k: None if pd.isna(v) else v for k, v in row.to_dict().items()})
-                rows.append(row_dict)
-
-            columns = ['row_index'] + list(df.columns)
+            result_columns = ['row_index'] + output_columns
+            values = AnalysisService.columnar_values(paginated_df, output_columns)
 
-            return {
-                'rows': rows,
-                'columns': columns,
+            result = {
+                'columns': result_columns,
+                'row_count': len(paginated_df),
                 'total_count': total_affected,
                 'has_more': (offset + limit) < total_affected,
                 'affected_column': column_name
             }
 
+            if response_format == 'columnar':
+                result['format'] = 'columnar'
+                result['values'] = values
+            else:
+                result['rows'] = [dict(zip(result_columns, row)) for row in zip(*values)]
+
+            return result
+
         except Exception as e:
             return {
                 'rows': [],
                 'columns': [],
+                'row_count': 0,
                 'total_count': 0,
                 'has_more': False,
                 'error': str(e)
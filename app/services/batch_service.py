@@ -0,0 +1,92 @@
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from app.services.analysis_service import AnalysisService
+from app.services.accumulator_service import AccumulatorService
+from app.services.csv_reader import CsvReader
+from app.services.cross_column_service import CrossColumnService
+from app.services.memory_service import MemoryService
+from app.services.trace_service import TraceService
+
+
+def _pool_context():
+    """
+    Start method for worker processes.
+
+    Web workers run background threads (retention, reaper, sweeper, trace
+    export); a fork taken while one of them holds a lock copies the held
+    lock into the child, which then deadlocks. forkserver and spawn start
+    workers from a fresh interpreter instead.
+    """
+    if 'forkserver' in multiprocessing.get_all_start_methods():
+        context = multiprocessing.get_context('forkserver')
+        # Loaded once in the server, so each worker forks with the analysis code already imported
+        context.set_forkserver_preload([__name__])
+        return context
+    return multiprocessing.get_context('spawn')
+
+
+def _init_worker(memory_settings, csv_settings, cross_column_settings):
+    """Pool initializer: apply the parent's settings in a worker that did not run configure()"""
+    MemoryService.restore(memory_settings)
+    CsvReader.restore(csv_settings)
+    CrossColumnService.restore(cross_column_settings)
+
+
+def _analyze_file(file_path, rules, persist_state, trace_context):
+    """Worker entry point: full analysis plus the lineage fields saved with it, and its spans"""
+    with TraceService.remote(trace_context, 'batch_file', file=os.path.basename(file_path)) as spans:
+        results = AnalysisService.analyze_file(
+            file_path,
+            state_path=AccumulatorService.state_path(file_path) if persist_state else None,
+            rules=rules
+        )
+        content_hash = AccumulatorService.file_hash(file_path)
+    return results, content_hash, spans
+
+
+class BatchService:
+    """Fan many uploaded files out across a bounded process pool"""
+
+    @staticmethod
+    def analyze_many(file_infos, max_workers, rules=None, persist_state=True):
+        """
+        Analyze files in parallel and yield each one as soon as it finishes.
+
+        Wall time is roughly that of the slowest file rather than the sum,
+        up to max_workers files at a time (workers are started fresh, never
+        forked from the caller). Each file still waits for its
+        share of the shared memory budget before it is parsed. Spans the
+        workers record are added to the caller's trace.
+
+        Args:
+            file_infos: List of dicts from FileService (file_id, filename, file_path, file_size)
+            max_workers: Upper bound on concurrent worker processes
+            rules: Rule definitions passed to AnalysisService.analyze_file
+            persist_state: Save accumulators next to each file for incremental re-analysis
+
+        Yields:
+            Tuples of (file_info, results, content_hash, error) in completion order
+        """
+        if not file_infos:
+            return
+
+        workers = max(1, min(max_workers, len(file_infos)))
+        trace_context = TraceService.context()
+
+        with ProcessPoolExecutor(max_workers=workers, mp_context=_pool_context(), initializer=_init_worker,
+                                 initargs=(MemoryService.snapshot(), CsvReader.snapshot(),
+                                           CrossColumnService.snapshot())) as executor:
+            futures = {
+                executor.submit(_analyze_file, info['file_path'], rules, persist_state, trace_context): info
+                for info in file_infos
+            }
+
+            for future in as_completed(futures):
+                info = futures[future]
+                try:
+                    results, content_hash, spans = future.result()
+                    TraceService.adopt(spans)
+                    yield info, results, content_hash, None
+                except Exception as exc:
+                    yield info, None, None, str(exc)
@@ -0,0 +1,207 @@
+import numpy as np
+import pandas as pd
+from app.services.sampling_service import SamplingService
+from app.services.accumulator_service import CorrelationAccumulator, DependencyAccumulator, column_hashes
+
+
+class CrossColumnService:
+    """
+    Relationships between columns: correlations and functional dependencies.
+
+    Correlations come from co-moment matrices over the numeric columns.
+    Candidate dependencies (e.g. zip -> city) are discovered on a stratified
+    sample; their violations are then counted exactly over every row by
+    grouping hashed value pairs, so the stage stays near-linear in rows.
+    """
+
+    SAMPLE_ROWS = 10000
+    SAMPLE_STRATA = 20
+    SAMPLE_SEED = 0
+
+    MAX_CORRELATION_COLUMNS = 50
+    MAX_DEPENDENCY_COLUMNS = 20
+    MIN_ROWS = 50
+
+    CORRELATION_THRESHOLD = 0.8
+    MAX_CORRELATIONS = 20
+
+    # Determinants must repeat: at most this many distinct values per row
+    MAX_DETERMINANT_RATIO = 0.2
+    MIN_STRENGTH = 0.95
+    # Largest share of the dependent's variation (beyond its most common
+    # value) a dependency may leave unexplained
+    MAX_RESIDUAL = 0.1
+    MAX_DEPENDENCIES = 10
+
+    @classmethod
+    def configure(cls, config):
+        """Take column and reported pair limits from the app config"""
+        cls.MAX_CORRELATION_COLUMNS = config['CROSS_COLUMN_MAX_CORRELATION_COLUMNS']
+        cls.MAX_DEPENDENCY_COLUMNS = config['CROSS_COLUMN_MAX_DEPENDENCY_COLUMNS']
+        cls.MAX_CORRELATIONS = config['CROSS_COLUMN_MAX_CORRELATIONS']
+        cls.MAX_DEPENDENCIES = config['CROSS_COLUMN_MAX_DEPENDENCIES']
+
+    @classmethod
+    def snapshot(cls):
+        """Current settings, to hand to worker processes that did not run configure()"""
+        return {name: getattr(cls, name) for name in
+                ('MAX_CORRELATION_COLUMNS', 'MAX_DEPENDENCY_COLUMNS', 'MAX_CORRELATIONS', 'MAX_DEPENDENCIES')}
+
+    @classmethod
+    def restore(cls, settings):
+        """Apply settings from snapshot()"""
+        for name, value in settings.items():
+            setattr(cls, name, value)
+
+    @staticmethod
+    def sample(df):
+        """Rows used for dependency discovery: a stratified sample over the whole frame"""
+        positions = SamplingService.stratified_positions(
+            len(df),
+            CrossColumnService.SAMPLE_ROWS,
+            CrossColumnService.SAMPLE_STRATA,
+            seed=CrossColumnService.SAMPLE_SEED
+        )
+        return df if len(positions) == len(df) else df.iloc[positions]
+
+    @staticmethod
+    def plan(sample, column_types):
+        """
+        Decide which relationships to track for a dataset.
+
+        Args:
+            sample: Sample of rows from sample() or SamplingService.sample_file
+            column_types: Dictionary of column name -> inferred type
+
+        Returns:
+            Tuple of (numeric columns to correlate, list of (determinant, dependent))
+        """
+        numeric = [name for name, data_type in column_types.items() if data_type == 'numeric']
+        return numeric[:CrossColumnService.MAX_CORRELATION_COLUMNS], \
+            CrossColumnService.discover_dependencies(sample)
+
+    @staticmethod
+    def accumulators(correlation_columns, dependencies):
+        """Empty accumulators for a plan(); no correlation accumulator for fewer than two columns"""
+        correlation = CorrelationAccumulator(correlation_columns) if len(correlation_columns) >= 2 else None
+        return correlation, [DependencyAccumulator(determinant, dependent) for determinant, dependent in dependencies]
+
+    @staticmethod
+    def discover_dependencies(sample):
+        """
+        Candidate functional dependencies that nearly hold on a sample.
+
+        A determinant must repeat, and must explain most of the dependent's
+        variation beyond its most common value. The second condition keeps
+        skewed dependents from looking determined by anything.
+
+        Returns:
+            List of (determinant, dependent) column pairs, strongest first
+        """
+        codes = {}
+        for column in sample.columns:
+            values, uniques = pd.factorize(sample[column])
+            if len(uniques) >= 2:
+                codes[column] = (values, len(uniques))
+            if len(codes) == CrossColumnService.MAX_DEPENDENCY_COLUMNS:
+                break
+
+        found, accepted = [], set()
+        for determinant, (x, x_size) in codes.items():
+            if x_size > CrossColumnService.MAX_DETERMINANT_RATIO * len(sample):
+                continue
+
+            for dependent, (y, y_size) in codes.items():
+                # One-to-one columns are reported in one direction only
+                if dependent == determinant or (dependent, determinant) in accepted:
+                    continue
+
+                present = (x >= 0) & (y >= 0)
+                rows = int(present.sum())
+                if rows < CrossColumnService.MIN_ROWS:
+                    continue
+
+                xs, ys = x[present].astype(np.int64), y[present].astype(np.int64)
+                pairs, counts = np.unique(xs * y_size + ys, return_counts=True)
+                expected = np.zeros(x_size, dtype=np.int64)
+                np.maximum.at(expected, pairs // y_size, counts)
+
+                strength = expected.sum() / rows
+                baseline = np.bincount(ys, minlength=y_size).max() / rows
+                if baseline < 1 and strength >= CrossColumnService.MIN_STRENGTH and \
+                        1 - strength <= (1 - baseline) * CrossColumnService.MAX_RESIDUAL:
+                    found.append((-strength, -rows, (determinant, dependent)))
+                    accepted.add((determinant, dependent))
+
+        found.sort(key=lambda item: item[:2])
+        return [pair for *_, pair in found[:CrossColumnService.MAX_DEPENDENCIES]]
+
+    @staticmethod
+    def report(correlation, dependencies):
+        """
+        Cross-column profile and issues from filled accumulators.
+
+        At most MAX_CORRELATIONS correlations (strongest first) and
+        MAX_DEPENDENCIES dependencies are reported, including for states
+        persisted before the limits were lowered.
+
+        Returns:
+            Tuple of (profile with correlationColumns, correlations and
+            dependencies, list of dependency violation issues)
+        """
+        from app.services.analysis_service import AnalysisService
+
+        profile = {'correlationColumns': [], 'correlations': [], 'dependencies': []}
+
+        if correlation is not None:
+            profile['correlationColumns'] = correlation.columns
+            matrix, counts = correlation.matrix()
+            left, right = np.triu_indices(len(correlation.columns), k=1)
+            values, rows = matrix[left, right], counts[left, right]
+
+            strong = np.flatnonzero((np.abs(np.nan_to_num(values)) >= CrossColumnService.CORRELATION_THRESHOLD) &
+                                    (rows >= CrossColumnService.MIN_ROWS))
+            strong = strong[np.argsort(-np.abs(values[strong]), kind='stable')][:CrossColumnService.MAX_CORRELATIONS]
+
+            for index in strong:
+                profile['correlations'].append({
+                    'columns': [correlation.columns[left[index]], correlation.columns[right[index]]],
+                    'r': round(float(values[index]), 3),
+                    'rows': int(rows[index])
+                })
+
+        issues = []
+        for dependency in dependencies[:CrossColumnService.MAX_DEPENDENCIES]:
+            summary = dependency.summary()
+            profile['dependencies'].append(summary)
+
+            if summary['violations'] > 0:
+                issue = AnalysisService.build_issue('dependency_violation', summary['violations'],
+                                                    dependency.determinant, dependent=dependency.dependent)
+                issue['dependentColumn'] = dependency.dependent
+                issue['strength'] = summary['strength']
+                issues.append(issue)
+
+        return profile, issues
+
+    @staticmethod
+    def violation_mask(df, determinant, dependent):
+        """
+        Rows whose dependent value differs from the most common one for their determinant value.
+
+        Ties go to the value with the smaller hash, so the mask flags exactly
+        as many rows as DependencyAccumulator counts as violations.
+        """
+        present = (df[determinant].notna() & df[dependent].notna()).to_numpy()
+        pairs = pd.DataFrame({
+            'x': column_hashes(df[determinant])[present],
+            'y': column_hashes(df[dependent])[present]
+        })
+
+        counts = pairs.value_counts().rename('count').reset_index()
+        expected = counts.sort_values(['x', 'count', 'y'], ascending=[True, False, True]) \
+            .drop_duplicates('x').set_index('x')['y']
+
+        mask = np.zeros(len(df), dtype=bool)
+        mask[present] = pairs['y'].to_numpy() != pairs['x'].map(expected).to_numpy()
+        return pd.Series(mask, index=df.index)
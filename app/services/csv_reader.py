@@ -0,0 +1,254 @@
+import codecs
+import csv
+import io
+import pandas as pd
+from app.services.storage_service import StorageService
+
+try:
+    import pyarrow
+    import pyarrow.csv as arrow_csv
+except ImportError:
+    pyarrow = None
+    arrow_csv = None
+
+# pandas' default markers, so both engines agree on what counts as missing
+NULL_VALUES = [
+    '', '#N/A', '#N/A N/A', '#NA', '-1.#IND', '-1.#QNAN', '-NaN', '-nan', '1.#IND', '1.#QNAN',
+    '<NA>', 'N/A', 'NA', 'NULL', 'NaN', 'None', 'n/a', 'nan', 'null'
+]
+TRUE_VALUES = ['True', 'TRUE', 'true']
+FALSE_VALUES = ['False', 'FALSE', 'false']
+
+SNIFF_DELIMITERS = ',;\t|'
+SNIFF_LINES = 50
+
+# Dialect fields reported with every read and persisted for incremental parses
+DIALECT_KEYS = ('delimiter', 'quotechar', 'encoding')
+
+
+class CsvReader:
+    """
+    Dialect-sniffing CSV parsing.
+
+    The delimiter, quote character and encoding are sniffed from the first
+    block of a file. Files are then parsed with Arrow's multithreaded reader
+    when pyarrow is installed, and with pandas' C parser when it is not or
+    when Arrow rejects the file. Every read reports the engine and dialect.
+    """
+
+    ENGINE = 'auto'  # 'auto' (pyarrow when installed) or 'c'
+    SNIFF_BYTES = 1024 * 1024
+
+    @classmethod
+    def configure(cls, config):
+        """Take engine and sniffing settings from the app config"""
+        cls.ENGINE = config['CSV_ENGINE']
+        cls.SNIFF_BYTES = config['CSV_SNIFF_BYTES']
+
+    @classmethod
+    def snapshot(cls):
+        """Current settings, to hand to worker processes that did not run configure()"""
+        return {'ENGINE': cls.ENGINE, 'SNIFF_BYTES': cls.SNIFF_BYTES}
+
+    @classmethod
+    def restore(cls, settings):
+        """Apply settings from snapshot()"""
+        for name, value in settings.items():
+            setattr(cls, name, value)
+
+    @staticmethod
+    def detect_encoding(block):
+        """'utf-8-sig', 'utf-8' or 'cp1252' if the block decodes as such, else 'latin-1'"""
+        if block.startswith(codecs.BOM_UTF8):
+            return 'utf-8-sig'
+
+        for encoding in ('utf-8', 'cp1252'):
+            try:
+                # Incremental so a character cut off at the block end is not an error
+                codecs.getincrementaldecoder(encoding)().decode(block, final=False)
+                return encoding
+            except UnicodeDecodeError:
+                continue
+
+        return 'latin-1'
+
+    @staticmethod
+    def sniff(file_path):
+        """Sniff the dialect of a stored upload from its first block"""
+        with StorageService.open(file_path) as handle:
+            block = handle.read(CsvReader.SNIFF_BYTES)
+        return CsvReader.sniff_bytes(block)
+
+    @staticmethod
+    def sniff_bytes(block):
+        """
+        Sniff the dialect of a block of CSV bytes.
+
+        Returns:
+            Dictionary with delimiter, quotechar, encoding, header (column
+            names as pandas reads them) and rawHeader (names as written)
+        """
+        encoding = CsvReader.detect_encoding(block)
+        text = codecs.getincrementaldecoder(encoding)(errors='replace').decode(block, final=False)
+        sample = ''.join(text.splitlines(keepends=True)[:SNIFF_LINES])
+
+        try:
+            sniffed = csv.Sniffer().sniff(sample, delimiters=SNIFF_DELIMITERS)
+            delimiter, quotechar = sniffed.delimiter, sniffed.quotechar or '"'
+        except csv.Error:
+            delimiter, quotechar = ',', '"'
+
+        raw_header = next(csv.reader(io.StringIO(sample), delimiter=delimiter, quotechar=quotechar), [])
+        try:
+            header = list(pd.read_csv(io.StringIO(sample), sep=delimiter, quotechar=quotechar, nrows=0).columns)
+        except pd.errors.EmptyDataError:
+            header = []
+
+        return {
+            'delimiter': delimiter,
+            'quotechar': quotechar,
+            'encoding': encoding,
+            'header': header,
+            'rawHeader': raw_header
+        }
+
+    @staticmethod
+    def read(file_path, usecols=None, dialect=None):
+        """
+        Parse a stored upload.
+
+        Args:
+            file_path: Upload path (raw or compressed)
+            usecols: Optional list of columns to load
+            dialect: Dialect from sniff(); sniffed when omitted
+
+        Returns:
+            Tuple of (DataFrame, parser info with engine, delimiter, quotechar, encoding)
+        """
+        dialect = dialect or CsvReader.sniff(file_path)
+        return CsvReader._read(lambda: StorageService.open(file_path), dialect, usecols=usecols)
+
+    @staticmethod
+    def read_bytes(data, dialect=None, names=None, on_bad_lines='error'):
+        """
+        Parse CSV held in memory, such as an appended delta or sampled rows.
+
+        When names is given the data has no header row.
+        """
+        dialect = dialect or CsvReader.sniff_bytes(data)
+        return CsvReader._read(lambda: io.BytesIO(data), dialect, names=names, on_bad_lines=on_bad_lines)
+
+    @staticmethod
+    def iter_chunks(file_path, chunk_rows, dialect=None, progress=None):
+        """
+        Yield a stored upload as DataFrames of at most chunk_rows rows.
+
+        Streaming always uses pandas' C parser: unlike a whole-file read it
+        cannot restart with another engine half way through the file.
+        progress, if given, is called with the bytes read before each chunk.
+        """
+        dialect = dialect or CsvReader.sniff(file_path)
+        with StorageService.open(file_path) as source:
+            reader = pd.read_csv(
+                source,
+                sep=dialect['delimiter'],
+                quotechar=dialect['quotechar'],
+                encoding=dialect['encoding'],
+                encoding_errors='replace',
+                chunksize=chunk_rows
+            )
+            with reader:
+                for chunk in reader:
+                    if progress is not None:
+                        progress(StorageService.tell(source))
+                    yield chunk
+
+    @staticmethod
+    def _read(opener, dialect, names=None, usecols=None, on_bad_lines='error'):
+        info = {key: dialect[key] for key in DIALECT_KEYS}
+
+        if CsvReader._arrow_eligible(dialect, names):
+            try:
+                df = CsvReader._read_arrow(opener, dialect, names, usecols, on_bad_lines)
+                return df, dict(info, engine='pyarrow')
+            except (pyarrow.ArrowInvalid, pyarrow.ArrowNotImplementedError, UnicodeDecodeError) as exc:
+                # Ragged rows, type changes after the first block, bad bytes...
+                info['fallbackReason'] = str(exc).splitlines()[0][:200]
+
+        with opener() as source:
+            df = pd.read_csv(
+                source,
+                sep=dialect['delimiter'],
+                quotechar=dialect['quotechar'],
+                encoding=dialect['encoding'],
+                encoding_errors='replace',
+                header=None if names is not None else 'infer',
+                names=names,
+                usecols=usecols,
+                on_bad_lines=on_bad_lines
+            )
+        return df, dict(info, engine='c')
+
+    @staticmethod
+    def _arrow_eligible(dialect, names):
+        if arrow_csv is None or CsvReader.ENGINE != 'auto':
+            return False
+        # Blank or repeated header names are renamed by pandas; leave those files to it
+        return names is not None or (dialect['header'] and dialect['header'] == dialect['rawHeader'])
+
+    @staticmethod
+    def _read_arrow(opener, dialect, names, usecols, on_bad_lines):
+        encoding = dialect['encoding']
+        read_options = arrow_csv.ReadOptions(
+            # Arrow skips a UTF-8 BOM itself and only transcodes other encodings
+            encoding='utf8' if encoding in ('utf-8', 'utf-8-sig') else encoding,
+            column_names=names,
+            block_size=CsvReader.SNIFF_BYTES,
+            use_threads=True
+        )
+        parse_options = arrow_csv.ParseOptions(
+            delimiter=dialect['delimiter'],
+            quote_char=dialect['quotechar'],
+            newlines_in_values=True,
+            invalid_row_handler=(lambda row: 'skip') if on_bad_lines == 'skip' else None
+        )
+        header = names if names is not None else dialect['header']
+        convert_options = dict(
+            null_values=NULL_VALUES,
+            strings_can_be_null=True,
+            true_values=TRUE_VALUES,
+            false_values=FALSE_VALUES,
+            include_columns=[col for col in header if col in usecols] if usecols is not None else None
+        )
+
+        # Arrow turns ISO-looking strings into timestamps; keep them as text
+        # like pandas does so date format inference sees the original values
+        with opener() as source:
+            schema = arrow_csv.open_csv(
+                source,
+                read_options=read_options,
+                parse_options=parse_options,
+                convert_options=arrow_csv.ConvertOptions(**convert_options)
+            ).schema
+        temporal = {field.name: pyarrow.string() for field in schema if pyarrow.types.is_temporal(field.type)}
+
+        with opener() as source:
+            table = arrow_csv.read_csv(
+                source,
+                read_options=read_options,
+                parse_options=parse_options,
+                convert_options=arrow_csv.ConvertOptions(column_types=temporal, **convert_options)
+            )
+
+        # Arrow keeps text that is not valid in the encoding as binary; pandas replaces the bad bytes
+        binary = [field.name for field in table.schema
+                  if pyarrow.types.is_binary(field.type) or pyarrow.types.is_large_binary(field.type)]
+        if binary:
+            raise pyarrow.ArrowInvalid(f'Invalid {encoding} text in column(s): {", ".join(binary)}')
+
+        # All-empty columns come back as null type; pandas reads them as float NaN
+        for i, field in enumerate(table.schema):
+            if pyarrow.types.is_null(field.type):
+                table = table.set_column(i, field.name, table.column(i).cast(pyarrow.float64()))
+
+        return table.to_pandas()
@@ -0,0 +1,203 @@
+import os
+import threading
+from collections import OrderedDict
+import pandas as pd
+from app.services.dataset_reader import DatasetReader
+from app.services.metrics_service import MetricsService
+
+
+class _Entry:
+    """Parsed columns of one version of an upload"""
+
+    def __init__(self, version, probe):
+        self.version = version
+        self.probe = probe
+        self.parser = None
+        self.index = None
+        self.columns = {}
+        # Column order of a full read; set once every column is cached
+        self.order = None
+        self.nbytes = 0
+
+
+class DatasetCache:
+    """
+    Per-worker LRU cache of parsed uploads.
+
+    Opening a report fires many affected-rows and AI requests against the
+    same upload within a minute. Each used to parse the file again; now the
+    parsed columns are kept, keyed by path plus mtime and size so a
+    replaced file is never served stale. Columns are cached individually:
+    a request for columns not yet cached parses only those. Whole uploads
+    are evicted least recently used first once BUDGET_BYTES is exceeded.
+    Frames handed out share the cached columns; pandas' copy-on-write keeps
+    callers from modifying them.
+    """
+
+    BUDGET_BYTES = 256 * 1024 ** 2
+
+    _entries = OrderedDict()
+    _bytes = 0
+    _lock = threading.Lock()
+
+    @classmethod
+    def configure(cls, config):
+        """Take the memory budget from the app config; 0 disables caching"""
+        cls.BUDGET_BYTES = config['DATASET_CACHE_BYTES']
+        cls.clear()
+
+    @classmethod
+    def probe(cls, file_path):
+        """DatasetReader.probe() of an upload, cached with its parsed columns"""
+        version = cls._version(file_path)
+        with cls._lock:
+            entry = cls._current(file_path, version)
+            if entry is not None:
+                return entry.probe
+
+        probe = DatasetReader.probe(file_path)
+        if cls.BUDGET_BYTES > 0:
+            with cls._lock:
+                if cls._current(file_path, version) is None:
+                    cls._entries[file_path] = _Entry(version, probe)
+                    cls._update_gauges()
+        return probe
+
+    @classmethod
+    def read(cls, file_path, usecols=None, probe=None):
+        """
+        DatasetReader.read() through the cache.
+
+        Args:
+            file_path: Upload path (raw or compressed)
+            usecols: Optional list of columns to load
+            probe: Result of probe() for this file
+
+        Returns:
+            Tuple of (DataFrame, parser info)
+        """
+        if cls.BUDGET_BYTES <= 0 or (usecols is not None and not usecols):
+            return DatasetReader.read(file_path, usecols=usecols, probe=probe)
+
+        version = cls._version(file_path)
+        missing = usecols
+        with cls._lock:
+            entry = cls._current(file_path, version)
+            if entry is not None:
+                cls._entries.move_to_end(file_path)
+                if cls._covers(entry, usecols):
+                    MetricsService.DATASET_CACHE_REQUESTS.inc(result='hit')
+                    return cls._frame(entry, usecols), entry.parser
+                probe = probe or entry.probe
+                if usecols is not None:
+                    missing = [col for col in usecols if col not in entry.columns]
+
+        # Parse outside the lock so other requests are not held up
+        df, parser = DatasetReader.read(file_path, usecols=missing, probe=probe)
+        MetricsService.DATASET_CACHE_REQUESTS.inc(result='miss' if missing == usecols else 'partial')
+
+        with cls._lock:
+            entry = cls._current(file_path, version)
+            if entry is None:
+                entry = cls._entries[file_path] = _Entry(version, probe)
+            entry.probe = entry.probe or probe
+            cls._store(entry, df, parser, full=usecols is None)
+            cls._entries.move_to_end(file_path)
+
+            # Built before eviction: an upload over the budget on its own is still served once
+            result = (cls._frame(entry, usecols), entry.parser) if cls._covers(entry, usecols) else None
+            cls._evict()
+
+        if result is not None:
+            return result
+        # Columns cached earlier were evicted by another request meanwhile
+        return DatasetReader.read(file_path, usecols=usecols, probe=probe)
+
+    @classmethod
+    def invalidate(cls, file_path):
+        """Forget an upload, e.g. when it is being deleted"""
+        with cls._lock:
+            if cls._drop(file_path):
+                MetricsService.DATASET_CACHE_EVICTIONS.inc(reason='deleted')
+            cls._update_gauges()
+
+    @classmethod
+    def clear(cls):
+        """Forget every upload"""
+        with cls._lock:
+            cls._entries.clear()
+            cls._bytes = 0
+            cls._update_gauges()
+
+    @classmethod
+    def _version(cls, file_path):
+        """(mtime, size) of an upload; a deleted upload is dropped here in workers that did not delete it"""
+        try:
+            stat = os.stat(file_path)
+        except FileNotFoundError:
+            cls.invalidate(file_path)
+            raise
+        return stat.st_mtime_ns, stat.st_size
+
+    @classmethod
+    def _current(cls, file_path, version):
+        """Entry for this version of the upload; an entry for an older version is dropped"""
+        entry = cls._entries.get(file_path)
+        if entry is not None and entry.version != version:
+            cls._drop(file_path)
+            MetricsService.DATASET_CACHE_EVICTIONS.inc(reason='stale')
+            return None
+        return entry
+
+    @classmethod
+    def _store(cls, entry, df, parser, full):
+        """Add the columns of a freshly parsed frame to an entry"""
+        entry.parser = entry.parser or parser
+        entry.index = df.index
+        for column in df.columns:
+            if column not in entry.columns:
+                series = df[column]
+                entry.columns[column] = series
+                size = int(series.memory_usage(deep=True, index=False))
+                entry.nbytes += size
+                cls._bytes += size
+        if full:
+            entry.order = list(df.columns)
+
+    @classmethod
+    def _evict(cls):
+        """Drop least recently used uploads until the budget holds"""
+        while cls._bytes > cls.BUDGET_BYTES and cls._entries:
+            cls._drop(next(iter(cls._entries)))
+            MetricsService.DATASET_CACHE_EVICTIONS.inc(reason='budget')
+        cls._update_gauges()
+
+    @classmethod
+    def _drop(cls, file_path):
+        entry = cls._entries.pop(file_path, None)
+        if entry is None:
+            return False
+        cls._bytes -= entry.nbytes
+        return True
+
+    @classmethod
+    def _update_gauges(cls):
+        MetricsService.DATASET_CACHE_BYTES.set(cls._bytes)
+        MetricsService.DATASET_CACHE_ENTRIES.set(len(cls._entries))
+
+    @staticmethod
+    def _covers(entry, usecols):
+        if usecols is None:
+            return entry.order is not None
+        return all(col in entry.columns for col in usecols)
+
+    @staticmethod
+    def _frame(entry, usecols):
+        """Frame of cached columns, in file order like DatasetReader.read()"""
+        if usecols is None:
+            names = entry.order
+        else:
+            known = entry.order or (entry.probe['header'] if entry.probe else list(usecols))
+            position = {name: i for i, name in enumerate(known)}
+            names = sorted(usecols, key=lambda name: position.get(name, len(position)))
+        return pd.DataFrame({name: entry.columns[name] for name in names}, index=entry.index, copy=False)
@@ -0,0 +1,178 @@
+import io
+import json
+import os
+import pandas as pd
+from app.services.storage_service import StorageService, COMPRESSED_EXTENSIONS
+from app.services.csv_reader import CsvReader
+
+try:
+    import pyarrow.parquet as parquet
+except ImportError:
+    parquet = None
+
+# Stored upload extension -> data format
+FORMAT_EXTENSIONS = {
+    'csv': 'csv',
+    'parquet': 'parquet',
+    'pq': 'parquet',
+    'ndjson': 'ndjson',
+    'jsonl': 'ndjson'
+}
+
+# Keep JSON's own types: no numeric coercion of strings, no date guessing
+NDJSON_OPTIONS = {
+    'dtype': False,
+    'convert_dates': False,
+    'keep_default_dates': False,
+    'precise_float': True
+}
+
+
+class DatasetReader:
+    """
+    Reads uploads of every supported format into a DataFrame.
+
+    CSV goes through CsvReader. Parquet and NDJSON carry their own column
+    types, which type inference keeps instead of re-deriving them from text.
+    Compression (gzip/zstd) is handled below this layer by StorageService.
+    """
+
+    @staticmethod
+    def format(file_path):
+        """'csv', 'parquet' or 'ndjson' from the file name; a .gz/.zst suffix is looked through"""
+        parts = os.path.basename(file_path).lower().rsplit('.', 2)
+        if len(parts) == 3 and parts[2] in COMPRESSED_EXTENSIONS:
+            parts = parts[:2]
+        extension = parts[-1] if len(parts) > 1 else ''
+        return FORMAT_EXTENSIONS.get(extension, 'csv')
+
+    @staticmethod
+    def supports(data_format):
+        """Whether the optional dependencies for a format are installed"""
+        return data_format != 'parquet' or parquet is not None
+
+    @staticmethod
+    def probe(file_path):
+        """
+        Format and column names of an upload without reading all of its rows.
+
+        Returns:
+            Dictionary with format and header; CSV adds its sniffed dialect
+        """
+        data_format = DatasetReader.format(file_path)
+
+        if data_format == 'parquet':
+            DatasetReader._require_parquet()
+            with StorageService.open(file_path) as handle:
+                return {'format': 'parquet', 'header': parquet.read_schema(handle).names}
+
+        if data_format == 'ndjson':
+            with StorageService.open(file_path) as handle:
+                block = handle.read(CsvReader.SNIFF_BYTES)
+            complete = block[:block.rfind(b'\n') + 1] or block
+            return {'format': 'ndjson', 'header': list(DatasetReader.parse_ndjson(complete).columns)}
+
+        return dict(CsvReader.sniff(file_path), format='csv')
+
+    @staticmethod
+    def read(file_path, usecols=None, probe=None):
+        """
+        Parse an upload of any supported format.
+
+        Args:
+            file_path: Upload path (raw or compressed)
+            usecols: Optional list of columns to load
+            probe: Result of probe() for this file, to avoid sniffing twice
+
+        Returns:
+            Tuple of (DataFrame, parser info with format and engine; CSV adds its dialect)
+        """
+        data_format = probe['format'] if probe else DatasetReader.format(file_path)
+
+        if data_format == 'parquet':
+            DatasetReader._require_parquet()
+            with StorageService.open(file_path) as handle:
+                table = parquet.read_table(handle, columns=usecols)
+            # Dates as datetime64 rather than Python date objects
+            return table.to_pandas(date_as_object=False), {'format': 'parquet', 'engine': 'pyarrow'}
+
+        if data_format == 'ndjson':
+            with StorageService.open(file_path) as handle:
+                df = DatasetReader.parse_ndjson(handle.read())
+            if usecols is not None:
+                df = df[[col for col in df.columns if col in usecols]]
+            return df, {'format': 'ndjson', 'engine': 'pandas'}
+
+        df, parser = CsvReader.read(file_path, usecols=usecols, dialect=probe)
+        return df, dict(parser, format='csv')
+
+    @staticmethod
+    def iter_chunks(file_path, chunk_rows, probe=None, progress=None):
+        """
+        Yield an upload of any supported format as DataFrames of at most chunk_rows rows.
+
+        progress, if given, is called with the bytes read before each chunk
+        (text formats only; Parquet reads whole row groups).
+        """
+        data_format = probe['format'] if probe else DatasetReader.format(file_path)
+
+        if data_format == 'parquet':
+            DatasetReader._require_parquet()
+            with StorageService.open(file_path) as handle:
+                for batch in parquet.ParquetFile(handle).iter_batches(batch_size=chunk_rows):
+                    yield batch.to_pandas(date_as_object=False)
+
+        elif data_format == 'ndjson':
+            with StorageService.open(file_path) as handle:
+                reader = pd.read_json(handle, lines=True, chunksize=chunk_rows, **NDJSON_OPTIONS)
+                with reader:
+                    for chunk in reader:
+                        if progress is not None:
+                            progress(StorageService.tell(handle))
+                        yield DatasetReader._flatten_nested(chunk)
+
+        else:
+            yield from CsvReader.iter_chunks(file_path, chunk_rows, dialect=probe, progress=progress)
+
+    @staticmethod
+    def parquet_head(file_path, rows):
+        """
+        First rows of a Parquet upload and its total row count, from the footer.
+
+        Returns:
+            Tuple of (DataFrame, total rows)
+        """
+        DatasetReader._require_parquet()
+        with StorageService.open(file_path) as handle:
+            parquet_file = parquet.ParquetFile(handle)
+            batch = next(parquet_file.iter_batches(batch_size=rows), None)
+            total = parquet_file.metadata.num_rows
+
+        head = batch.to_pandas(date_as_object=False) if batch is not None else pd.DataFrame()
+        return head, total
+
+    @staticmethod
+    def parse_ndjson(data):
+        """DataFrame from NDJSON bytes, keeping JSON's own value types"""
+        if not data.strip():
+            return pd.DataFrame()
+
+        df = pd.read_json(io.BytesIO(data), lines=True, **NDJSON_OPTIONS)
+        return DatasetReader._flatten_nested(df)
+
+    @staticmethod
+    def _flatten_nested(df):
+        # Nested objects and arrays are analyzed as their JSON text
+        for column in df.columns:
+            if df[column].dtype == object:
+                nested = df[column].map(lambda value: isinstance(value, (dict, list)))
+                if nested.any():
+                    df.loc[nested, column] = df.loc[nested, column].map(json.dumps)
+
+        return df
+
+    @staticmethod
+    def _require_parquet():
+        if parquet is None:
+            raise ValueError('pyarrow is required to read Parquet uploads')
+
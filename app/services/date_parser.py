@@ -0,0 +1,86 @@
+import pandas as pd
+
+# Explicit formats tried during inference, most common first. Month-first
+# precedes day-first so ambiguous slash dates keep pandas' default reading.
+DATE_FORMATS = [
+    '%Y-%m-%d',
+    '%Y-%m-%d %H:%M:%S',
+    '%Y-%m-%d %H:%M',
+    '%Y-%m-%dT%H:%M:%S',
+    '%Y/%m/%d',
+    '%Y/%m/%d %H:%M:%S',
+    '%m/%d/%Y',
+    '%m/%d/%Y %H:%M:%S',
+    '%m/%d/%Y %H:%M',
+    '%d/%m/%Y',
+    '%d/%m/%Y %H:%M:%S',
+    '%d/%m/%Y %H:%M',
+    '%m-%d-%Y',
+    '%d-%m-%Y',
+    '%d.%m.%Y',
+    '%d.%m.%Y %H:%M:%S',
+    '%d.%m.%Y %H:%M',
+    '%b %d, %Y',
+    '%B %d, %Y',
+    '%d %b %Y',
+    '%d %B %Y',
+    '%d-%b-%Y',
+    'ISO8601'
+]
+
+
+class DateParser:
+    """Single-format, vectorized date parsing"""
+
+    # Share of a sample a format must parse to be chosen
+    MIN_MATCH_RATIO = 0.8
+
+    @staticmethod
+    def infer_format(sample):
+        """
+        Pick the one explicit format that parses the most values of a sample.
+
+        Args:
+            sample: Series of non-missing values
+
+        Returns:
+            Tuple of (format or None, share of the sample it parses)
+        """
+        values = sample.astype(str).str.strip()
+        values = values[values != '']
+        if len(values) == 0:
+            return None, 0.0
+
+        # Plain numbers are never dates, even where a format would accept them
+        if pd.to_numeric(values, errors='coerce').notna().mean() >= DateParser.MIN_MATCH_RATIO:
+            return None, 0.0
+
+        best_format, best_ratio = None, 0.0
+        for date_format in DATE_FORMATS:
+            ratio = DateParser.parse(values, date_format).notna().mean()
+            if ratio > best_ratio:
+                best_format, best_ratio = date_format, ratio
+                if ratio == 1.0:
+                    break
+
+        if best_ratio < DateParser.MIN_MATCH_RATIO:
+            return None, float(best_ratio)
+        return best_format, float(best_ratio)
+
+    @staticmethod
+    def parse(series, date_format):
+        """
+        Parse a whole column with one explicit format.
+
+        Values that do not match become NaT. Time zone aware values are
+        converted to UTC and made naive so they compare with naive stamps.
+        """
+        # Typed columns (e.g. Parquet timestamps) are already parsed
+        if pd.api.types.is_datetime64_any_dtype(series):
+            return series.dt.tz_convert(None) if series.dt.tz is not None else series
+
+        if date_format is None:
+            return pd.Series(pd.NaT, index=series.index, dtype='datetime64[ns]')
+
+        parsed = pd.to_datetime(series.astype(str), format=date_format, errors='coerce', utc=True)
+        return parsed.dt.tz_convert(None)
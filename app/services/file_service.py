@@ -1,15 +1,45 @@
 import os
 import uuid
+import zipfile
 from werkzeug.utils import secure_filename
+from app.services.storage_service import StorageService, StorageLimitExceeded, COMPRESSED_EXTENSIONS
+from app.services.dataset_reader import DatasetReader, FORMAT_EXTENSIONS
 
 class FileService:
     """Service for handling file operations"""
 
     @staticmethod
-    def allowed_file(filename, allowed_extensions):
-        """Check if file extension is allowed"""
-        return '.' in filename and \
-            filename.rsplit('.', 1)[1].lower() in allowed_extensions
+    def split_extension(filename):
+        """
+        Data extension and upload codec of a file name.
+
+        'orders.csv.gz' -> ('csv', 'gzip'), 'orders.parquet' -> ('parquet', None)
+        """
+        parts = filename.lower().rsplit('.', 2)
+        if len(parts) == 3 and parts[2] in COMPRESSED_EXTENSIONS:
+            return parts[1], COMPRESSED_EXTENSIONS[parts[2]]
+        return (parts[-1] if len(parts) > 1 else ''), None
+
+    @staticmethod
+    def allowed_file(filename, allowed_extensions, compressed_extensions=()):
+        """Check if file extension is allowed; compressed_extensions may also arrive as .gz/.zst"""
+        extension, codec = FileService.split_extension(filename)
+        if codec is not None:
+            return extension in compressed_extensions
+        return extension in allowed_extensions
+
+    @staticmethod
+    def storage_codec(extension, upload_codec, compression):
+        """
+        Codec to store an upload with.
+
+        Uploads that arrive compressed are kept as they are, since readers
+        recognise the codec from magic bytes. Parquet is compressed per column
+        chunk already and needs random access, so it is stored raw.
+        """
+        if upload_codec is not None or FORMAT_EXTENSIONS.get(extension) == 'parquet':
+            return None
+        return compression
 
     @staticmethod
     def validate_file(file, config):
@@ -23,10 +53,17 @@ class FileService:
             return {'valid': False, 'message': 'No file selected'}
 
         # Check file extension
-        if not FileService.allowed_file(file.filename, config['ALLOWED_EXTENSIONS']):
-            return {'valid': False, 'message': 'Only CSV files are allowed'}
+        if not FileService.allowed_file(file.filename, config['ALLOWED_EXTENSIONS'],
+                                        config['COMPRESSED_UPLOAD_EXTENSIONS']):
+            return {'valid': False, 'message': 'Only CSV, Parquet and NDJSON files are allowed'}
 
-        # Check file size
+        extension, upload_codec = FileService.split_extension(file.filename)
+        if not DatasetReader.supports(FORMAT_EXTENSIONS.get(extension)):
+            return {'valid': False, 'message': f'{extension} uploads are not supported on this server'}
+        if not StorageService.readable(upload_codec):
+            return {'valid': False, 'message': f'{upload_codec} compressed uploads are not supported on this server'}
+
+        # Check file size (uploads that arrive compressed are checked again once saved)
         file.seek(0, os.SEEK_END)
         file_size = file.tell()
         file.seek(0)  # Reset file pointer
@@ -40,19 +77,30 @@ class FileService:
         return {'valid': True, 'message': 'File is valid'}
 
     @staticmethod
-    def save_file(file, upload_folder, user_id):
-        """Save uploaded file with unique name"""
+    def save_file(file, upload_folder, user_id, compression=None, limit=None):
+        """
+        Save uploaded file with unique name, compressed with the given codec
+
+        Raises:
+            StorageLimitExceeded: a compressed upload decompresses to more than limit bytes
+        """
         # Generate unique filename
         original_filename = secure_filename(file.filename)
-        file_extension = original_filename.rsplit('.', 1)[1].lower()
+        file_extension, upload_codec = FileService.split_extension(original_filename)
         unique_filename = f"{user_id}_{uuid.uuid4().hex}.{file_extension}"
 
-        # Save file
+        # Save file (file_size is the original, uncompressed size)
         file_path = os.path.join(upload_folder, unique_filename)
-        file.save(file_path)
-
-        # Get file size
-        file_size = os.path.getsize(file_path)
+        file.stream.seek(0, os.SEEK_END)
+        size_hint = file.stream.tell()
+        file.stream.seek(0)
+        file_size = StorageService.write(
+            file.stream, file_path,
+            codec=FileService.storage_codec(file_extension, upload_codec, compression),
+            size_hint=size_hint
+        )
+        if upload_codec is not None:
+            file_size = StorageService.adopt(file_path, limit=limit)
 
         return {
             'file_id': unique_filename,
@@ -61,6 +109,68 @@ class FileService:
             'file_size': file_size
         }
 
+    @staticmethod
+    def extract_archive(file, upload_folder, user_id, config):
+        """
+        Extract the data file members of an uploaded zip archive into the upload folder.
+
+        Members are streamed out one at a time under unique names; anything
+        that is not an allowed file, or exceeds MAX_FILE_SIZE (once
+        decompressed, for members that are compressed themselves), is skipped.
+
+        Returns:
+            Tuple of (list of saved file info dicts, list of skipped member names)
+        """
+        saved = []
+        skipped = []
+
+        with zipfile.ZipFile(file) as archive:
+            for member in archive.infolist():
+                if member.is_dir():
+                    continue
+
+                original_filename = secure_filename(os.path.basename(member.filename))
+
+                if not original_filename or \
+                        not FileService.allowed_file(original_filename, config['ALLOWED_EXTENSIONS'],
+                                                     config['COMPRESSED_UPLOAD_EXTENSIONS']) or \
+                        not StorageService.readable(FileService.split_extension(original_filename)[1]) or \
+                        member.file_size == 0 or member.file_size > config['MAX_FILE_SIZE']:
+                    skipped.append(member.filename)
+                    continue
+
+                if len(saved) >= config['BATCH_MAX_FILES']:
+                    skipped.append(member.filename)
+                    continue
+
+                file_extension, upload_codec = FileService.split_extension(original_filename)
+                unique_filename = f"{user_id}_{uuid.uuid4().hex}.{file_extension}"
+                file_path = os.path.join(upload_folder, unique_filename)
+
+                try:
+                    # Never trust the declared size of a zip member
+                    with archive.open(member) as source:
+                        file_size = StorageService.write(
+                            source, file_path,
+                            codec=FileService.storage_codec(file_extension, upload_codec,
+                                                            config['UPLOAD_COMPRESSION']),
+                            limit=config['MAX_FILE_SIZE']
+                        )
+                    if upload_codec is not None:
+                        file_size = StorageService.adopt(file_path, limit=config['MAX_FILE_SIZE'])
+                except StorageLimitExceeded:
+                    skipped.append(member.filename)
+                    continue
+
+                saved.append({
+                    'file_id': unique_filename,
+                    'filename': original_filename,
+                    'file_path': file_path,
+                    'file_size': file_size
+                })
+
+        return saved, skipped
+
     @staticmethod
     def format_file_size(bytes_size):
         """Format file size in human-readable format"""
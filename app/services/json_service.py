@@ -0,0 +1,131 @@
+import gzip
+import json
+import math
+from datetime import date, datetime
+import numpy as np
+from flask import current_app, request
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+def _default(value):
+    """Encode NumPy/pandas values the serializer does not handle natively"""
+    if isinstance(value, np.integer):
+        return int(value)
+    if isinstance(value, np.floating):
+        value = float(value)
+        return None if math.isnan(value) or math.isinf(value) else value
+    if isinstance(value, np.bool_):
+        return bool(value)
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(f'Object of type {type(value).__name__} is not JSON serializable')
+
+
+class JsonService:
+    """JSON encoding and compressed JSON responses for analysis payloads"""
+
+    MIMETYPE = 'application/json'
+
+    @staticmethod
+    def dumps(payload):
+        """Serialize to UTF-8 bytes; NumPy scalars and arrays are accepted as-is"""
+        if orjson is not None:
+            return orjson.dumps(
+                payload,
+                default=_default,
+                option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+            )
+        return json.dumps(payload, default=_default, separators=(',', ':')).encode('utf-8')
+
+    @staticmethod
+    def loads(data):
+        """Parse JSON from str or bytes"""
+        if orjson is not None:
+            return orjson.loads(data)
+        return json.loads(data)
+
+    @staticmethod
+    def embed(stored_json, **fields):
+        """
+        Prepend top-level fields to an already encoded JSON object.
+
+        Lets stored results go out with e.g. their analysis_id attached
+        without decoding and re-encoding the whole document.
+        """
+        body = stored_json.encode('utf-8') if isinstance(stored_json, str) else (stored_json or b'{}')
+        body = body.strip() or b'{}'
+        prefix = JsonService.dumps(fields)[1:-1] if fields else b''
+
+        if not prefix:
+            return body
+        if body == b'{}':
+            return b'{' + prefix + b'}'
+        return b'{' + prefix + b',' + body[1:]
+
+    @staticmethod
+    def envelope(data_body, **fields):
+        """Wrap an encoded body as {"success": true, ..., "data": <body>}"""
+        head = JsonService.dumps(dict({'success': True}, **fields))[:-1]
+        return head + b',"data":' + data_body + b'}'
+
+    @staticmethod
+    def response(payload, status=200, etag=None, headers=None):
+        """Serialize a payload into a (possibly compressed) JSON response"""
+        return JsonService.raw_response(JsonService.dumps(payload), status, etag=etag, headers=headers)
+
+    @staticmethod
+    def raw_response(body, status=200, etag=None, headers=None, mimetype=None):
+        """
+        Build a response from already encoded JSON bytes.
+
+        Bodies of at least JSON_COMPRESS_MIN_BYTES are compressed with brotli
+        (when installed) or gzip if the client accepts it. The ETag gets a
+        per-encoding suffix so each representation stays strongly validated.
+        """
+        response = current_app.response_class(body, status=status, mimetype=mimetype or JsonService.MIMETYPE)
+        if headers:
+            response.headers.update(headers)
+
+        encoding = JsonService.negotiate_encoding(len(body))
+        if encoding == 'br':
+            response.set_data(brotli.compress(body, quality=current_app.config['BROTLI_QUALITY']))
+        elif encoding == 'gzip':
+            response.set_data(gzip.compress(body, compresslevel=current_app.config['GZIP_LEVEL']))
+
+        if encoding:
+            response.headers['Content-Encoding'] = encoding
+        response.vary.add('Accept-Encoding')
+
+        if etag:
+            response.set_etag(f'{etag}-{encoding}' if encoding else etag)
+
+        return response
+
+    @staticmethod
+    def negotiate_encoding(size):
+        """Pick 'br', 'gzip' or None for a body of the given size"""
+        if size < current_app.config['JSON_COMPRESS_MIN_BYTES']:
+            return None
+
+        accepted = request.accept_encodings
+        if brotli is not None and accepted['br']:
+            return 'br'
+        if accepted['gzip']:
+            return 'gzip'
+        return None
+
+    @staticmethod
+    def etag_variants(etag):
+        """Every ETag raw_response may have sent for this representation"""
+        return [etag, f'{etag}-gzip', f'{etag}-br']
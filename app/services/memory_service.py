@@ -0,0 +1,202 @@
+import json
+import os
+import time
+import uuid
+from contextlib import contextmanager
+from pandas.api.types import is_bool_dtype, is_datetime64_any_dtype, is_numeric_dtype
+from app.services.dataset_reader import DatasetReader
+from app.services.sampling_service import SamplingService
+from app.services.metrics_service import MetricsService
+from app.services.accumulator_service import UniqueCounter
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - not available on Windows
+    fcntl = None
+
+
+class AdmissionTimeout(Exception):
+    """Raised when an analysis waited too long for memory budget"""
+
+
+class MemoryService:
+    """
+    Memory-aware planning and admission of analyses.
+
+    Each job's peak memory is estimated from a small sample: the bytes a
+    parsed row takes per column, scaled by how much working memory the
+    analysis of that column type needs. Jobs whose estimate exceeds the
+    in-memory limit stream through the file in chunks. Every job reserves
+    its estimate against a budget shared by all worker processes on the
+    host and waits in line for it instead of pushing a worker into OOM.
+    The shared ledger needs fcntl; where it is missing jobs are not gated.
+    """
+
+    # Working-set multipliers over the parsed size: the frame itself plus
+    # the copies analysis makes (numeric coercion, str conversion, masks)
+    NUMERIC_FACTOR = 3
+    TEXT_FACTOR = 5
+    ESTIMATE_SAMPLE_ROWS = 500
+
+    BUDGET_BYTES = 2 * 1024 ** 3
+    IN_MEMORY_LIMIT = 512 * 1024 ** 2
+    CHUNK_ROWS = 100000
+    QUEUE_TIMEOUT = 20
+    LEDGER_PATH = None
+
+    @classmethod
+    def configure(cls, config):
+        """Take budget settings from the app config; the ledger lives in the upload folder"""
+        cls.BUDGET_BYTES = config['ANALYSIS_MEMORY_BUDGET']
+        cls.IN_MEMORY_LIMIT = config['ANALYSIS_IN_MEMORY_LIMIT']
+        cls.CHUNK_ROWS = config['ANALYSIS_CHUNK_ROWS']
+        cls.QUEUE_TIMEOUT = config['ANALYSIS_QUEUE_TIMEOUT']
+        cls.LEDGER_PATH = os.path.join(config['UPLOAD_FOLDER'], '.memory-ledger.json') if fcntl else None
+
+    @classmethod
+    def snapshot(cls):
+        """Current settings, to hand to worker processes that did not run configure()"""
+        return {name: getattr(cls, name) for name in
+                ('BUDGET_BYTES', 'IN_MEMORY_LIMIT', 'CHUNK_ROWS', 'QUEUE_TIMEOUT', 'LEDGER_PATH')}
+
+    @classmethod
+    def restore(cls, settings):
+        """Apply settings from snapshot(); used as a process pool initializer"""
+        for name, value in settings.items():
+            setattr(cls, name, value)
+
+    @staticmethod
+    def estimate(file_path):
+        """
+        Estimate the peak memory of analyzing an upload in memory.
+
+        Returns:
+            Dictionary with rows, columns, typeMix, bytesPerRow and inMemoryBytes
+        """
+        sample_rows = MemoryService.ESTIMATE_SAMPLE_ROWS
+        if DatasetReader.format(file_path) == 'parquet':
+            sample, rows = DatasetReader.parquet_head(file_path, sample_rows)
+        else:
+            sample, info = SamplingService.sample_file(file_path, sample_size=sample_rows, strata=10, seed=0)
+            rows = info['estimatedTotalRows']
+
+        type_mix = {'numeric': 0, 'text': 0}
+        bytes_per_row = 0.0
+
+        for column in sample.columns:
+            series = sample[column]
+            numeric = is_datetime64_any_dtype(series) or (is_numeric_dtype(series) and not is_bool_dtype(series))
+            type_mix['numeric' if numeric else 'text'] += 1
+
+            column_bytes = series.memory_usage(deep=True, index=False) / len(series) if len(series) else 8
+            bytes_per_row += column_bytes * (MemoryService.NUMERIC_FACTOR if numeric else MemoryService.TEXT_FACTOR)
+
+        return {
+            'rows': int(rows),
+            'columns': len(sample.columns),
+            'typeMix': type_mix,
+            'bytesPerRow': int(round(bytes_per_row)),
+            'inMemoryBytes': int(rows * bytes_per_row)
+        }
+
+    @staticmethod
+    def plan(file_path):
+        """
+        Choose the execution engine for an upload and the memory to reserve.
+
+        Chunked jobs hold one chunk at a time plus the streaming accumulators:
+        a row hash per row, numeric values until the outlier pass and exact
+        distinct sets up to UniqueCounter.EXACT_LIMIT per column.
+
+        Returns:
+            estimate() plus engine ('in_memory' or 'chunked'), chunkRows and reserveBytes
+        """
+        estimate = MemoryService.estimate(file_path)
+        rows = estimate['rows']
+
+        if estimate['inMemoryBytes'] <= MemoryService.IN_MEMORY_LIMIT:
+            return dict(estimate, engine='in_memory', chunkRows=None, reserveBytes=estimate['inMemoryBytes'])
+
+        chunk_rows = MemoryService.CHUNK_ROWS
+        state_bytes = 8 * rows * (1 + estimate['typeMix']['numeric']) + \
+            8 * estimate['columns'] * min(rows, UniqueCounter.EXACT_LIMIT)
+        reserve = int(min(chunk_rows, rows) * estimate['bytesPerRow'] + state_bytes)
+
+        return dict(estimate, engine='chunked', chunkRows=chunk_rows, reserveBytes=reserve)
+
+    @classmethod
+    @contextmanager
+    def admit(cls, nbytes, timeout=None, check=None):
+        """
+        Hold nbytes of the shared budget for the duration of the block.
+
+        Waits with backoff while other jobs hold the budget. A job is always
+        admitted when nothing else is running, so one oversized job cannot
+        wait forever. Without a configured ledger (CLI, tests) nothing is gated.
+        check, if given, is called while waiting and may raise to stop waiting
+        (e.g. AnalysisJob.check for a cancelled job).
+
+        Raises:
+            AdmissionTimeout: the budget did not free up within timeout seconds
+        """
+        if cls.LEDGER_PATH is None:
+            yield
+            return
+
+        token = uuid.uuid4().hex
+        deadline = time.monotonic() + (timeout if timeout is not None else cls.QUEUE_TIMEOUT)
+        delay = 0.05
+
+        with MetricsService.timed('admission_wait'):
+            while not cls._update_ledger(lambda ledger: cls._reserve(ledger, token, nbytes)):
+                if time.monotonic() >= deadline:
+                    raise AdmissionTimeout('Server is busy with other analyses; please retry shortly')
+                if check is not None:
+                    check()
+                time.sleep(delay)
+                delay = min(delay * 2, 1.0)
+
+        try:
+            yield
+        finally:
+            cls._update_ledger(lambda ledger: ledger.pop(token, None))
+
+    @classmethod
+    def _reserve(cls, ledger, token, nbytes):
+        used = sum(size for _, size in ledger.values())
+        if ledger and used + nbytes > cls.BUDGET_BYTES:
+            return False
+        ledger[token] = [os.getpid(), nbytes]
+        return True
+
+    @classmethod
+    def _update_ledger(cls, change):
+        """Apply change(ledger) to the reservation ledger under an exclusive flock"""
+        with open(cls.LEDGER_PATH, 'a+') as handle:
+            fcntl.flock(handle, fcntl.LOCK_EX)
+            try:
+                handle.seek(0)
+                content = handle.read()
+                ledger = json.loads(content) if content.strip() else {}
+
+                # Reservations of processes that died (e.g. OOM-killed) are dropped
+                ledger = {token: entry for token, entry in ledger.items() if _process_alive(entry[0])}
+
+                result = change(ledger)
+
+                handle.seek(0)
+                handle.truncate()
+                handle.write(json.dumps(ledger))
+                return result
+            finally:
+                fcntl.flock(handle, fcntl.LOCK_UN)
+
+
+def _process_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
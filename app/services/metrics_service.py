@@ -0,0 +1,253 @@
+import threading
+import time
+from contextlib import contextmanager
+from app.services.trace_service import TraceService
+
+try:
+    import resource
+except ImportError:  # pragma: no cover - not available on Windows
+    resource = None
+
+
+DURATION_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+ROWS_PER_SECOND_BUCKETS = (1e3, 1e4, 5e4, 1e5, 2.5e5, 5e5, 1e6, 2.5e6, 5e6, 1e7)
+RSS_BUCKETS = tuple(mb * 1024 * 1024 for mb in (64, 128, 256, 512, 768, 1024, 1536, 2048, 4096, 8192))
+
+
+def _format_value(value):
+    """Format a number the way the Prometheus text format expects"""
+    if value == float('inf'):
+        return '+Inf'
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _format_labels(labels):
+    """Render a label dict as {k="v",...}"""
+    if not labels:
+        return ''
+    parts = []
+    for key, value in labels:
+        escaped = str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+        parts.append(f'{key}="{escaped}"')
+    return '{' + ','.join(parts) + '}'
+
+
+class Histogram:
+    """Thread-safe cumulative histogram rendered in Prometheus text format"""
+
+    def __init__(self, name, help_text, buckets, label_names=()):
+        self.name = name
+        self.help_text = help_text
+        self.buckets = tuple(sorted(buckets)) + (float('inf'),)
+        self.label_names = tuple(label_names)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        """Record a single observation"""
+        key = tuple((name, labels.get(name, '')) for name in self.label_names)
+
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = {'counts': [0] * len(self.buckets), 'sum': 0.0, 'count': 0}
+                self._series[key] = series
+
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series['counts'][i] += 1
+            series['sum'] += value
+            series['count'] += 1
+
+    def render(self):
+        """Return the exposition lines for this histogram"""
+        lines = [
+            f'# HELP {self.name} {self.help_text}',
+            f'# TYPE {self.name} histogram'
+        ]
+
+        with self._lock:
+            snapshot = [(key, dict(series, counts=list(series['counts'])))
+                        for key, series in sorted(self._series.items())]
+
+        for key, series in snapshot:
+            for bound, count in zip(self.buckets, series['counts']):
+                labels = _format_labels(key + (('le', _format_value(bound)),))
+                lines.append(f'{self.name}_bucket{labels} {count}')
+            labels = _format_labels(key)
+            lines.append(f'{self.name}_sum{labels} {_format_value(series["sum"])}')
+            lines.append(f'{self.name}_count{labels} {series["count"]}')
+
+        return lines
+
+
+class Counter:
+    """Thread-safe monotonically increasing counter rendered in Prometheus text format"""
+
+    def __init__(self, name, help_text, label_names=()):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = tuple(label_names)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        """Add amount to the series for the given labels"""
+        key = tuple((name, labels.get(name, '')) for name in self.label_names)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self, metric_type='counter'):
+        """Return the exposition lines for this metric"""
+        lines = [
+            f'# HELP {self.name} {self.help_text}',
+            f'# TYPE {self.name} {metric_type}'
+        ]
+        with self._lock:
+            snapshot = sorted(self._values.items())
+        for key, value in snapshot:
+            lines.append(f'{self.name}{_format_labels(key)} {_format_value(value)}')
+        return lines
+
+
+class Gauge(Counter):
+    """Thread-safe value that can go up and down"""
+
+    def set(self, value, **labels):
+        """Replace the value of the series for the given labels"""
+        key = tuple((name, labels.get(name, '')) for name in self.label_names)
+        with self._lock:
+            self._values[key] = value
+
+    def render(self):
+        return super().render(metric_type='gauge')
+
+
+class StageTimer:
+    """Collects per-stage durations for a single analysis run
+
+    With a job (see ProgressService) every stage is also reported as
+    progress and is a cancellation checkpoint.
+    """
+
+    def __init__(self, job=None):
+        self.started = time.perf_counter()
+        self.stages = {}
+        self.job = job
+
+    @contextmanager
+    def stage(self, name):
+        """Time a stage; repeated stages with the same name accumulate"""
+        if self.job is not None:
+            self.job.stage(name)
+        with MetricsService.timed(name) as elapsed:
+            yield
+        self.stages[name] = self.stages.get(name, 0.0) + elapsed()
+
+    def breakdown(self, rows=None):
+        """Return the timing breakdown attached to analysis results"""
+        total = time.perf_counter() - self.started
+        data = {
+            'totalMs': round(total * 1000, 2),
+            'stages': {name: round(seconds * 1000, 2) for name, seconds in self.stages.items()},
+            'peakRssBytes': MetricsService.peak_rss_bytes()
+        }
+
+        if rows is not None:
+            data['rowsPerSecond'] = round(rows / total, 1) if total > 0 else None
+
+        return data
+
+
+class MetricsService:
+    """In-process hot-path instrumentation exposed on /metrics.
+
+    Metrics are kept per process, so under gunicorn each worker reports its
+    own series and the scraper aggregates them.
+    """
+
+    STAGE_DURATION = Histogram(
+        'delta_stage_duration_seconds',
+        'Duration of instrumented pipeline stages',
+        DURATION_BUCKETS,
+        label_names=('stage',)
+    )
+    ROWS_PER_SECOND = Histogram(
+        'delta_analysis_rows_per_second',
+        'End-to-end analysis throughput',
+        ROWS_PER_SECOND_BUCKETS
+    )
+    PEAK_RSS = Histogram(
+        'delta_analysis_peak_rss_bytes',
+        'Peak resident set size of the worker observed after each analysis',
+        RSS_BUCKETS
+    )
+    DATASET_CACHE_REQUESTS = Counter(
+        'delta_dataset_cache_requests_total',
+        'Parsed-upload cache lookups by result (hit, partial or miss)',
+        label_names=('result',)
+    )
+    DATASET_CACHE_EVICTIONS = Counter(
+        'delta_dataset_cache_evictions_total',
+        'Parsed uploads dropped from the cache by reason (budget, stale or deleted)',
+        label_names=('reason',)
+    )
+    DATASET_CACHE_BYTES = Gauge(
+        'delta_dataset_cache_bytes',
+        'Memory held by parsed uploads in this worker\'s cache'
+    )
+    DATASET_CACHE_ENTRIES = Gauge(
+        'delta_dataset_cache_entries',
+        'Uploads held in this worker\'s parsed-upload cache'
+    )
+
+    @staticmethod
+    @contextmanager
+    def timed(stage):
+        """Time a block and record it under the given stage label.
+
+        The block is also a span of the current trace, if any. Yields a
+        callable returning the elapsed seconds once the block exits.
+        """
+        result = {'seconds': 0.0}
+        start = time.perf_counter()
+        try:
+            with TraceService.span(stage):
+                yield lambda: result['seconds']
+        finally:
+            result['seconds'] = time.perf_counter() - start
+            MetricsService.STAGE_DURATION.observe(result['seconds'], stage=stage)
+
+    @staticmethod
+    def observe_analysis(rows, seconds):
+        """Record throughput and memory for a completed analysis"""
+        if seconds > 0:
+            MetricsService.ROWS_PER_SECOND.observe(rows / seconds)
+
+        peak_rss = MetricsService.peak_rss_bytes()
+        if peak_rss is not None:
+            MetricsService.PEAK_RSS.observe(peak_rss)
+
+    @staticmethod
+    def peak_rss_bytes():
+        """Peak RSS of the current process in bytes, if the platform reports it"""
+        if resource is None:
+            return None
+        # ru_maxrss is reported in kilobytes on Linux
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+    @staticmethod
+    def render():
+        """Render all metrics in the Prometheus text exposition format"""
+        lines = []
+        for metric in (MetricsService.STAGE_DURATION,
+                       MetricsService.ROWS_PER_SECOND,
+                       MetricsService.PEAK_RSS,
+                       MetricsService.DATASET_CACHE_REQUESTS,
+                       MetricsService.DATASET_CACHE_EVICTIONS,
+                       MetricsService.DATASET_CACHE_BYTES,
+                       MetricsService.DATASET_CACHE_ENTRIES):
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
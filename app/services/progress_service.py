@@ -0,0 +1,175 @@
+import json
+import os
+import time
+
+
+class AnalysisCancelled(Exception):
+    """Raised inside an analysis whose cancellation was requested"""
+
+
+class AnalysisJob:
+    """
+    Progress and cancellation of one running analysis.
+
+    The analysis calls stage() as it enters each pipeline stage (through
+    StageTimer) and advance() as bytes are read. Both check the cancel
+    marker, so a cancelled job stops at its next chunk, column or detector.
+    The single parse of an in-memory job is not interrupted: a cancel
+    requested during it takes effect once the file has been read.
+    Progress writes are throttled to one per ProgressService.WRITE_INTERVAL.
+    """
+
+    def __init__(self, record_path, cancel_path, record):
+        self.record_path = record_path
+        self.cancel_path = cancel_path
+        self.record = record
+        self._written = 0.0
+
+    def stage(self, name):
+        """Enter a pipeline stage; detectors are reported under stage 'detect'"""
+        self.check()
+        if name.startswith('detect_'):
+            self.record.update(stage='detect', detector=name[len('detect_'):])
+        else:
+            self.record.update(stage=name, detector=None)
+        self._write()
+
+    def advance(self, bytes_read=None, rows=None, **fields):
+        """Record how far the analysis has read"""
+        self.check()
+        if bytes_read is not None:
+            self.record['bytesRead'] = bytes_read
+        if rows is not None:
+            self.record['rows'] = rows
+        self.record.update(fields)
+        self._write()
+
+    def read_all(self, rows):
+        """Record that the whole upload has been parsed"""
+        self.advance(bytes_read=self.record['bytesTotal'], rows=rows)
+
+    def check(self):
+        """
+        Raises:
+            AnalysisCancelled: cancellation was requested for this job
+        """
+        if self.cancel_path is not None and os.path.exists(self.cancel_path):
+            raise AnalysisCancelled('Analysis was cancelled')
+
+    def finish(self, status, message=None):
+        """Record the final status ('done', 'cancelled' or 'failed') and clear any cancel request"""
+        self.record.update(status=status, message=message, detector=None)
+        self._write(force=True)
+        if self.cancel_path is not None:
+            try:
+                os.remove(self.cancel_path)
+            except FileNotFoundError:
+                pass
+
+    def _write(self, force=False):
+        now = time.time()
+        if self.record_path is None or (not force and now - self._written < ProgressService.WRITE_INTERVAL):
+            return
+
+        self._written = now
+        self.record['updatedAt'] = now
+        # Write then rename, so readers in other workers never see a partial record
+        temporary = f'{self.record_path}.{os.getpid()}.tmp'
+        with open(temporary, 'w') as handle:
+            json.dump(self.record, handle)
+        os.replace(temporary, self.record_path)
+
+
+class ProgressService:
+    """
+    Progress records and cancel requests of running analyses.
+
+    An analysis runs inside the request that started it, while progress
+    and cancel requests may reach any worker process. Both therefore live
+    as small files in a directory of the upload folder: a JSON record per
+    job and a marker file per cancel request.
+    """
+
+    DIRECTORY = None
+    WRITE_INTERVAL = 0.5
+    RECORD_TTL = 3600
+
+    @classmethod
+    def configure(cls, config):
+        """Keep job files in the upload folder"""
+        cls.DIRECTORY = os.path.join(config['UPLOAD_FOLDER'], '.jobs')
+        cls.WRITE_INTERVAL = config['ANALYSIS_PROGRESS_INTERVAL']
+        cls.RECORD_TTL = config['ANALYSIS_PROGRESS_TTL']
+        os.makedirs(cls.DIRECTORY, exist_ok=True)
+
+    @classmethod
+    def start(cls, job_id, user_id, bytes_total):
+        """
+        Begin tracking an analysis.
+
+        A cancel request made before the job started is kept, so the job
+        stops at its first checkpoint. Without a configured directory
+        (CLI, tests) the job reports nothing and cannot be cancelled.
+
+        Returns:
+            AnalysisJob
+        """
+        record = {
+            'jobId': job_id,
+            'userId': user_id,
+            'status': 'running',
+            'stage': 'queued',
+            'detector': None,
+            'bytesRead': 0,
+            'bytesTotal': bytes_total,
+            'rows': 0,
+            'startedAt': time.time(),
+            'message': None
+        }
+        if cls.DIRECTORY is None:
+            return AnalysisJob(None, None, record)
+
+        cls._sweep()
+        record_path, cancel_path = cls._paths(job_id)
+        job = AnalysisJob(record_path, cancel_path, record)
+        job._write(force=True)
+        return job
+
+    @classmethod
+    def get(cls, job_id):
+        """Latest progress record of a job, or None"""
+        if cls.DIRECTORY is None:
+            return None
+        record_path, cancel_path = cls._paths(job_id)
+        try:
+            with open(record_path) as handle:
+                record = json.load(handle)
+        except (FileNotFoundError, ValueError):
+            return None
+        record['cancelRequested'] = os.path.exists(cancel_path)
+        return record
+
+    @classmethod
+    def request_cancel(cls, job_id):
+        """Ask a job to stop at its next checkpoint; returns False when cancellation is unavailable"""
+        if cls.DIRECTORY is None:
+            return False
+        with open(cls._paths(job_id)[1], 'a'):
+            pass
+        return True
+
+    @classmethod
+    def _paths(cls, job_id):
+        name = os.path.basename(job_id)
+        return os.path.join(cls.DIRECTORY, f'{name}.json'), os.path.join(cls.DIRECTORY, f'{name}.cancel')
+
+    @classmethod
+    def _sweep(cls):
+        """Remove records and cancel markers older than RECORD_TTL"""
+        cutoff = time.time() - cls.RECORD_TTL
+        for entry in os.scandir(cls.DIRECTORY):
+            try:
+                if entry.stat().st_mtime < cutoff:
+                    os.remove(entry.path)
+            except FileNotFoundError:
+                pass
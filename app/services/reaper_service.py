@@ -0,0 +1,175 @@
+import os
+import queue
+import threading
+import time
+from app.services.storage_service import StorageService, SIDECAR_SUFFIXES
+from app.services.dataset_cache import DatasetCache
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - not available on Windows
+    fcntl = None
+
+
+class ReaperService:
+    """
+    Asynchronous file deletion.
+
+    Requests delete database rows and hand the file paths to the reaper,
+    which removes them in batches on a background thread and retries
+    failures with backoff. A periodic sweep removes whatever is left
+    behind: uploads no analysis references and sidecars without an upload.
+    """
+
+    BATCH_SIZE = 200
+    MAX_RETRIES = 5
+    RETRY_DELAY = 2.0
+
+    _queue = queue.Queue()
+    _worker = None
+    _worker_lock = threading.Lock()
+
+    @classmethod
+    def configure(cls, config):
+        """Take batch and retry settings from the app config"""
+        cls.BATCH_SIZE = config['REAPER_BATCH_SIZE']
+        cls.MAX_RETRIES = config['REAPER_MAX_RETRIES']
+        cls.RETRY_DELAY = config['REAPER_RETRY_DELAY']
+
+    @staticmethod
+    def upload_paths(file_path):
+        """An upload and every sidecar that may exist next to it"""
+        return [file_path] + [f'{file_path}{suffix}' for suffix in SIDECAR_SUFFIXES]
+
+    @classmethod
+    def enqueue(cls, paths):
+        """Schedule paths for deletion; returns immediately"""
+        for path in paths:
+            if path:
+                DatasetCache.invalidate(path)
+                cls._queue.put((path, 0))
+        cls._ensure_worker()
+
+    @classmethod
+    def _ensure_worker(cls):
+        with cls._worker_lock:
+            if cls._worker is None or not cls._worker.is_alive():
+                cls._worker = threading.Thread(target=cls._run, name='file-reaper', daemon=True)
+                cls._worker.start()
+
+    @classmethod
+    def _run(cls):
+        while True:
+            batch = [cls._queue.get()]
+            while len(batch) < cls.BATCH_SIZE:
+                try:
+                    batch.append(cls._queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            for path, attempts in cls.remove_batch(batch):
+                if attempts < cls.MAX_RETRIES:
+                    # Exponential backoff without blocking the rest of the queue
+                    timer = threading.Timer(cls.RETRY_DELAY * (2 ** attempts), cls._queue.put,
+                                            args=((path, attempts + 1),))
+                    timer.daemon = True
+                    timer.start()
+
+    @staticmethod
+    def remove_batch(batch):
+        """
+        Remove a batch of (path, attempts) items.
+
+        Returns:
+            List of (path, attempts) that failed and may be retried
+        """
+        failed = []
+        for path, attempts in batch:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            except OSError:
+                failed.append((path, attempts))
+        return failed
+
+    @staticmethod
+    def find_orphans(upload_folder, referenced, grace_seconds, now=None):
+        """
+        Upload-folder files that no longer belong to anything.
+
+        Args:
+            upload_folder: Folder holding uploads and sidecars
+            referenced: Callable mapping a list of upload paths to the subset
+                still referenced by an analysis
+            grace_seconds: Minimum age, so fresh uploads awaiting analysis survive
+
+        Returns:
+            List of paths to delete
+        """
+        now = now if now is not None else time.time()
+        groups = StorageService.upload_groups(upload_folder)
+
+        candidates = [path for path, (_, mtime, _, _) in groups.items() if now - mtime > grace_seconds]
+        kept = set(referenced(candidates)) if candidates else set()
+
+        orphans = []
+        for path in candidates:
+            if path not in kept:
+                orphans.extend(groups[path][3])
+
+        # Sidecars whose upload is gone (e.g. removed by an older delete path)
+        for entry in os.scandir(upload_folder):
+            if entry.is_file() and entry.name.endswith(SIDECAR_SUFFIXES):
+                base = entry.path
+                for suffix in SIDECAR_SUFFIXES:
+                    if base.endswith(suffix):
+                        base = base[:-len(suffix)]
+                if base not in groups and now - entry.stat().st_mtime > grace_seconds:
+                    orphans.append(entry.path)
+
+        return orphans
+
+    @staticmethod
+    def start_sweeper(app):
+        """
+        Enqueue orphans every ORPHAN_SWEEP_INTERVAL seconds from a daemon thread.
+
+        As with upload retention, a flock in the upload folder keeps the
+        sweep to one worker process at a time where fcntl is available.
+        """
+        from app.models.analysis import Analysis
+
+        config = app.config
+        upload_folder = config['UPLOAD_FOLDER']
+        lock_path = os.path.join(upload_folder, '.reaper.lock')
+
+        def referenced(paths):
+            with app.app_context():
+                return Analysis.referenced_file_paths(paths)
+
+        def sweep_forever():
+            while True:
+                time.sleep(config['ORPHAN_SWEEP_INTERVAL'])
+                try:
+                    with open(lock_path, 'a') as lock_file:
+                        try:
+                            if fcntl is not None:
+                                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                        except BlockingIOError:
+                            continue
+                        try:
+                            grace = config['ORPHAN_GRACE_SECONDS']
+                            orphans = ReaperService.find_orphans(upload_folder, referenced, grace)
+                            if orphans:
+                                app.logger.info('Reaper sweep queued %s orphaned files', len(orphans))
+                                ReaperService.enqueue(orphans)
+                        finally:
+                            if fcntl is not None:
+                                fcntl.flock(lock_file, fcntl.LOCK_UN)
+                except Exception:
+                    app.logger.exception('Orphan sweep failed')
+
+        thread = threading.Thread(target=sweep_forever, name='orphan-sweeper', daemon=True)
+        thread.start()
+        return thread
@@ -0,0 +1,355 @@
+import re
+import string
+import pandas as pd
+from app.services.date_parser import DateParser
+
+RULE_TYPES = ('range', 'comparison', 'regex', 'not_null', 'unique')
+
+COMPARISON_OPERATORS = {
+    '<': lambda left, right: left < right,
+    '<=': lambda left, right: left <= right,
+    '>': lambda left, right: left > right,
+    '>=': lambda left, right: left >= right,
+    '==': lambda left, right: left == right,
+    '!=': lambda left, right: left != right
+}
+
+# Issue types produced by AnalysisService's own detectors; custom rules may
+# not claim them as issue_type
+DETECTOR_ISSUE_TYPES = ('Missing Values', 'Invalid Format', 'Invalid Date',
+                        'Statistical Outlier', 'Duplicate Records', 'Dependency Violation')
+
+# Placeholders a rule issue template may use; build_issue fills only these
+RULE_TEMPLATE_FIELDS = {'count', 'column'}
+
+POSITIVE_KEYWORDS = ['age', 'price', 'quantity', 'stock', 'amount', 'cost', 'selling']
+
+# Built-in rules reproducing the historical hard-coded logical checks.
+# 'issue' names an AnalysisService.ISSUE_TEMPLATES kind.
+DEFAULT_RULES = [
+    {
+        'id': 'non_negative',
+        'type': 'range',
+        'column': {'contains_any': POSITIVE_KEYWORDS},
+        'column_types': ['numeric'],
+        'min': 0,
+        'issue': 'negative_value'
+    },
+    {
+        'id': 'price_below_cost',
+        'type': 'comparison',
+        'left': {'contains_all': ['selling', 'price']},
+        'op': '>=',
+        'right': {'contains_all': ['cost', 'price']},
+        'issue': 'price_below_cost'
+    },
+    {
+        'id': 'stock_below_reorder',
+        'type': 'comparison',
+        'left': {'contains_all': ['stock', 'current']},
+        'op': '>=',
+        'right': {'contains_any': ['reorder']},
+        'issue': 'stock_below_reorder'
+    }
+]
+
+
+class RuleError(Exception):
+    """Raised for malformed rule definitions"""
+
+
+def match_columns(selector, columns):
+    """
+    Resolve a column selector against a list of column names.
+
+    A selector is either an exact column name or a dict with 'contains_all'
+    or 'contains_any' keyword lists matched case-insensitively.
+    """
+    if isinstance(selector, str):
+        return [selector] if selector in columns else []
+
+    if isinstance(selector, dict):
+        if 'contains_all' in selector:
+            keywords = [k.lower() for k in selector['contains_all']]
+            return [col for col in columns if all(k in str(col).lower() for k in keywords)]
+        if 'contains_any' in selector:
+            keywords = [k.lower() for k in selector['contains_any']]
+            return [col for col in columns if any(k in str(col).lower() for k in keywords)]
+
+    raise RuleError(f'Invalid column selector: {selector!r}')
+
+
+class ChunkCache:
+    """Per-chunk memo of column conversions shared by all rules and detectors"""
+
+    def __init__(self, df):
+        self.df = df
+        self._numeric = {}
+        self._text = {}
+        self._dates = {}
+
+    def numeric(self, column):
+        if column not in self._numeric:
+            self._numeric[column] = pd.to_numeric(self.df[column], errors='coerce')
+        return self._numeric[column]
+
+    def text(self, column):
+        if column not in self._text:
+            self._text[column] = self.df[column].astype(str)
+        return self._text[column]
+
+    def dates(self, column, date_format):
+        """Column parsed once with an explicit format (NaT where it does not match)"""
+        key = (column, date_format)
+        if key not in self._dates:
+            self._dates[key] = DateParser.parse(self.df[column], date_format)
+        return self._dates[key]
+
+
+class CompiledRule:
+    """A rule bound to concrete columns of one schema"""
+
+    def __init__(self, rule, rule_id, columns, evaluate):
+        self.rule = rule
+        self.id = rule_id
+        self.type = rule['type']
+        self.columns = columns
+        self._evaluate = evaluate
+
+    @property
+    def column(self):
+        """Column reported on the issue (single-column rules only)"""
+        return self.columns[0] if self.type in ('range', 'regex', 'not_null') or \
+            (self.type == 'unique' and len(self.columns) == 1) else None
+
+    @property
+    def issue_type(self):
+        """Issue type reported for violations of this rule"""
+        from app.services.analysis_service import AnalysisService
+
+        if self.rule.get('issue'):
+            return AnalysisService.ISSUE_TEMPLATES[self.rule['issue']][0]
+        return self.rule.get('issue_type', 'Business Rule Violation')
+
+    def mask(self, df, cache=None, all_occurrences=False):
+        """Boolean Series marking the rows that violate the rule"""
+        cache = cache or ChunkCache(df)
+        if self.type == 'unique':
+            return self._evaluate(df, cache, all_occurrences)
+        return self._evaluate(df, cache)
+
+    def build_issue(self, count):
+        """Issue entry for this rule, matching the AnalysisService format"""
+        from app.services.analysis_service import AnalysisService
+
+        count = int(count)
+        if self.rule.get('issue'):
+            issue = AnalysisService.build_issue(self.rule['issue'], count, self.column)
+        else:
+            label = self.rule.get('name') or self.rule.get('id')
+            issue = {
+                'type': self.issue_type,
+                'severity': self.rule.get('severity', 'warning'),
+                'count': count
+            }
+            if self.column is not None:
+                issue['column'] = self.column
+            issue['description'] = self.rule.get('description') or \
+                f'{count} rows violate rule "{label}"'
+
+        issue['rule'] = self.id
+        return issue
+
+
+class RuleSet:
+    """
+    Declarative data quality rules compiled into vectorized masks.
+
+    Rules are plain dicts so they can be stored per user as JSON. Rules that
+    reference columns missing from a file are skipped, which makes each rule
+    set apply per schema.
+    """
+
+    def __init__(self, rules=None):
+        self.rules = list(rules) if rules is not None else list(DEFAULT_RULES)
+
+    @staticmethod
+    def validate(rule):
+        """Raise RuleError unless the rule definition is well formed"""
+        from app.services.analysis_service import AnalysisService
+
+        if not isinstance(rule, dict):
+            raise RuleError('Rule must be an object')
+
+        if rule.get('issue'):
+            template = AnalysisService.ISSUE_TEMPLATES.get(rule['issue'])
+            if template is None:
+                raise RuleError(f'Unknown issue: {rule["issue"]!r}')
+            fields = {field for _, field, _, _ in string.Formatter().parse(template[2]) if field}
+            if not fields <= RULE_TEMPLATE_FIELDS:
+                raise RuleError(f'Issue {rule["issue"]!r} cannot be reported by a rule')
+
+        if rule.get('issue_type') in DETECTOR_ISSUE_TYPES:
+            raise RuleError(f'Issue type {rule["issue_type"]!r} is reserved for built-in checks')
+
+        rule_type = rule.get('type')
+        if rule_type not in RULE_TYPES:
+            raise RuleError(f'Unknown rule type: {rule_type!r}')
+
+        if rule_type == 'range':
+            if 'column' not in rule:
+                raise RuleError('Range rules require a column')
+            if rule.get('min') is None and rule.get('max') is None:
+                raise RuleError('Range rules require min and/or max')
+
+        elif rule_type == 'comparison':
+            if 'left' not in rule or 'right' not in rule:
+                raise RuleError('Comparison rules require left and right columns')
+            if rule.get('op') not in COMPARISON_OPERATORS:
+                raise RuleError(f'Unknown comparison operator: {rule.get("op")!r}')
+
+        elif rule_type == 'regex':
+            if 'column' not in rule or not rule.get('pattern'):
+                raise RuleError('Regex rules require a column and a pattern')
+            try:
+                re.compile(rule['pattern'])
+            except re.error as exc:
+                raise RuleError(f'Invalid pattern: {exc}')
+
+        elif rule_type == 'not_null':
+            if 'column' not in rule:
+                raise RuleError('Not-null rules require a column')
+
+        elif rule_type == 'unique':
+            if 'column' not in rule and not rule.get('columns'):
+                raise RuleError('Unique rules require a column or columns')
+
+    def compile(self, columns, column_types=None):
+        """
+        Bind every rule to the given schema.
+
+        Args:
+            columns: Column names of the dataset
+            column_types: Optional dict of column name -> inferred type;
+                when omitted, column_types restrictions are not applied
+
+        Returns:
+            List of CompiledRule in rule order
+        """
+        columns = list(columns)
+        compiled = []
+
+        for index, rule in enumerate(self.rules):
+            self.validate(rule)
+            base_id = str(rule.get('id') or f'rule_{index}')
+            rule_type = rule['type']
+
+            if rule_type == 'comparison':
+                left = match_columns(rule['left'], columns)
+                right = match_columns(rule['right'], columns)
+                if left and right:
+                    compiled.append(CompiledRule(rule, base_id, [left[0], right[0]],
+                                                 _comparison(left[0], right[0], rule['op'])))
+                continue
+
+            if rule_type == 'unique':
+                selectors = rule.get('columns') or [rule['column']]
+                unique_cols = [match_columns(selector, columns) for selector in selectors]
+                if all(unique_cols):
+                    cols = [matched[0] for matched in unique_cols]
+                    compiled.append(CompiledRule(rule, base_id, cols, _unique(cols)))
+                continue
+
+            allowed_types = rule.get('column_types')
+            for column in match_columns(rule['column'], columns):
+                if allowed_types and column_types is not None and column_types.get(column) not in allowed_types:
+                    continue
+
+                if rule_type == 'range':
+                    evaluate = _range(column, rule.get('min'), rule.get('max'))
+                elif rule_type == 'regex':
+                    evaluate = _regex(column, rule['pattern'])
+                else:
+                    evaluate = _not_null(column)
+
+                rule_id = base_id if isinstance(rule['column'], str) else f'{base_id}:{column}'
+                compiled.append(CompiledRule(rule, rule_id, [column], evaluate))
+
+        return compiled
+
+    @staticmethod
+    def find(compiled, rule_id=None, issue_type=None, column=None):
+        """
+        Locate the compiled rule behind an issue.
+
+        Issues carry the rule id; older issues without one are matched on
+        issue type and column instead.
+        """
+        for rule in compiled:
+            if rule_id is not None:
+                if rule.id == rule_id:
+                    return rule
+            elif rule.issue_type == issue_type and (rule.column or None) == (column or None):
+                return rule
+        return None
+
+    @staticmethod
+    def evaluate(compiled, df, cache=None):
+        """
+        Evaluate all compiled rules over one chunk in a single pass.
+
+        Column conversions are shared between rules through a ChunkCache.
+
+        Returns:
+            Dictionary of rule id -> violation mask
+        """
+        cache = cache or ChunkCache(df)
+        return {rule.id: rule.mask(df, cache) for rule in compiled}
+
+
+def _range(column, minimum, maximum):
+    def evaluate(df, cache):
+        values = cache.numeric(column)
+        mask = pd.Series(False, index=df.index)
+        if minimum is not None:
+            mask |= values < minimum
+        if maximum is not None:
+            mask |= values > maximum
+        return mask & values.notna()
+    return evaluate
+
+
+def _comparison(left, right, op):
+    compare = COMPARISON_OPERATORS[op]
+
+    def evaluate(df, cache):
+        left_values = cache.numeric(left)
+        right_values = cache.numeric(right)
+        both = left_values.notna() & right_values.notna()
+        return ~compare(left_values, right_values) & both
+    return evaluate
+
+
+def _regex(column, pattern):
+    compiled = re.compile(pattern)
+
+    def evaluate(df, cache):
+        present = df[column].notna()
+        matches = cache.text(column).str.fullmatch(compiled.pattern, flags=compiled.flags).astype(bool)
+        return ~matches & present
+    return evaluate
+
+
+def _not_null(column):
+    def evaluate(df, cache):
+        return df[column].isna() | (cache.text(column).str.strip() == '')
+    return evaluate
+
+
+def _unique(columns):
+    def evaluate(df, cache, all_occurrences=False):
+        subset = df[columns]
+        present = subset.notna().any(axis=1)
+        keep = False if all_occurrences else 'first'
+        return subset.duplicated(keep=keep) & present
+    return evaluate
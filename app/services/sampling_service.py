@@ -0,0 +1,216 @@
+import math
+import random
+from app.services.storage_service import StorageService
+from app.services.csv_reader import CsvReader
+from app.services.dataset_reader import DatasetReader
+
+
+class SamplingService:
+    """Row sampling for quick estimates over files too large to scan eagerly"""
+
+    # Two-sided z-score used for the confidence bounds (95%)
+    Z_SCORE = 1.96
+
+    @staticmethod
+    def stratified_positions(total, sample_size, strata=20, seed=None):
+        """
+        Sorted row positions spread evenly over [0, total).
+
+        The range is split into equal strata and each contributes the same
+        number of random positions, so the start, middle and end of a file
+        are all represented. Returns every position when total <= sample_size.
+        """
+        if total <= sample_size:
+            return list(range(total))
+
+        rng = random.Random(seed)
+        strata = max(1, min(strata, sample_size))
+        per_stratum = max(1, sample_size // strata)
+        stratum_size = total / strata
+        positions = set()
+
+        for stratum in range(strata):
+            low = int(stratum * stratum_size)
+            high = max(low + 1, int((stratum + 1) * stratum_size))
+            positions.update(rng.sample(range(low, high), min(per_stratum, high - low)))
+
+        return sorted(positions)
+
+    @staticmethod
+    def wilson_lower(successes, trials):
+        """Lower bound of the Wilson score interval for a proportion"""
+        if trials <= 0:
+            return 0.0
+
+        z = SamplingService.Z_SCORE
+        p = successes / trials
+        denominator = 1 + z * z / trials
+        centre = p + z * z / (2 * trials)
+        margin = z * math.sqrt(p * (1 - p) / trials + z * z / (4 * trials * trials))
+        return max(0.0, (centre - margin) / denominator)
+
+    @staticmethod
+    def sample_file(file_path, sample_size=2000, strata=20, seed=None):
+        """
+        Stratified row sample of an upload of any supported format.
+
+        CSV and NDJSON are sampled by seeking to byte offsets; Parquet is
+        read column-wise and sampled by row position over the same strata.
+        """
+        data_format = DatasetReader.format(file_path)
+
+        if data_format == 'csv':
+            return SamplingService.sample_csv(file_path, sample_size=sample_size, strata=strata, seed=seed)
+        if data_format == 'ndjson':
+            return SamplingService.sample_ndjson(file_path, sample_size=sample_size, strata=strata, seed=seed)
+
+        df, parser = DatasetReader.read(file_path)
+        positions = SamplingService.stratified_positions(len(df), sample_size, strata, seed=seed)
+        return df.iloc[positions].reset_index(drop=True), {
+            'sampledRows': len(positions),
+            'estimatedTotalRows': len(df),
+            'exhaustive': len(positions) == len(df),
+            'parser': parser
+        }
+
+    @staticmethod
+    def sample_csv(file_path, sample_size=2000, strata=20, seed=None):
+        """
+        Draw a stratified row sample from a CSV file by seeking to byte offsets.
+
+        The file is split into equal byte ranges and each range contributes
+        the same number of rows, so sorted or drifting files are covered end
+        to end without parsing them in full. Rows are aligned to the next
+        line break after each random offset.
+
+        Args:
+            file_path: Path to CSV file
+            sample_size: Target number of sampled rows
+            strata: Number of equal byte ranges to draw from
+            seed: Optional seed for reproducible samples
+
+        Returns:
+            Tuple of (DataFrame, info dict with sampledRows, estimatedTotalRows,
+            exhaustive and parser)
+        """
+        dialect = CsvReader.sniff(file_path)
+        header, lines, data_bytes, exhaustive = SamplingService.sample_lines(
+            file_path, sample_size, strata, seed, has_header=True
+        )
+
+        # Sampled lines may be cut inside a quoted field; skip what does not parse
+        df, parser = CsvReader.read_bytes(header + b''.join(lines), dialect,
+                                          on_bad_lines='error' if exhaustive else 'skip')
+
+        return df, SamplingService._sample_info(df, lines, data_bytes, exhaustive, dict(parser, format='csv'))
+
+    @staticmethod
+    def sample_ndjson(file_path, sample_size=2000, strata=20, seed=None):
+        """sample_csv for NDJSON uploads, where every line is one record"""
+        _, lines, data_bytes, exhaustive = SamplingService.sample_lines(
+            file_path, sample_size, strata, seed, has_header=False
+        )
+        df = DatasetReader.parse_ndjson(b''.join(lines))
+        return df, SamplingService._sample_info(df, lines, data_bytes, exhaustive,
+                                                {'format': 'ndjson', 'engine': 'pandas'})
+
+    @staticmethod
+    def sample_lines(file_path, sample_size, strata, seed=None, has_header=True):
+        """
+        Stratified sample of the lines of a text upload, by byte offset.
+
+        On a raw file each seek is a jump, so the cost depends on the sample
+        size only. Compressed uploads (gzip is the UPLOAD_COMPRESSION default)
+        cannot jump: a forward seek decompresses every byte before the
+        offset, so the file is streamed through once and the cost grows
+        with its size, but stays a single sequential pass.
+
+        Returns:
+            Tuple of (header line, sampled lines, data bytes, exhaustive); an
+            exhaustive sample holds the whole (small) file as a single block
+        """
+        file_size = StorageService.size(file_path)
+        rng = random.Random(seed)
+
+        with StorageService.open(file_path) as handle:
+            header = handle.readline() if has_header else b''
+            data_start = handle.tell()
+            data_bytes = file_size - data_start
+
+            # Small files are cheaper to read whole than to seek around in
+            if data_bytes <= 0 or data_bytes <= sample_size * 256:
+                return header, [handle.read()], data_bytes, True
+
+            strata = max(1, min(strata, sample_size))
+            per_stratum = max(1, sample_size // strata)
+            stratum_bytes = data_bytes / strata
+
+            seen_offsets = set()
+            lines = []
+
+            for stratum in range(strata):
+                low = data_start + int(stratum * stratum_bytes)
+                high = data_start + int((stratum + 1) * stratum_bytes)
+
+                for offset in sorted(rng.randrange(low, max(low + 1, high)) for _ in range(per_stratum)):
+                    # Only ever seek forward so compressed uploads stream once;
+                    # an offset already passed continues from the current line
+                    if offset > handle.tell():
+                        handle.seek(offset)
+                        # Discard the partial line the offset landed in
+                        handle.readline()
+
+                    line_start = handle.tell()
+                    if line_start in seen_offsets:
+                        continue
+
+                    line = handle.readline()
+                    if not line.strip():
+                        continue
+
+                    seen_offsets.add(line_start)
+                    lines.append(line if line.endswith(b'\n') else line + b'\n')
+
+        return header, lines, data_bytes, False
+
+    @staticmethod
+    def _sample_info(df, lines, data_bytes, exhaustive, parser):
+        if exhaustive:
+            estimated_rows = len(df)
+        else:
+            avg_line_bytes = sum(len(line) for line in lines) / len(lines) if lines else 0
+            estimated_rows = int(round(data_bytes / avg_line_bytes)) if avg_line_bytes else len(df)
+
+        return {
+            'sampledRows': len(df),
+            'estimatedTotalRows': max(estimated_rows, len(df)),
+            'exhaustive': exhaustive,
+            'parser': parser
+        }
+
+    @staticmethod
+    def extrapolate_count(sample_count, sample_rows, total_rows):
+        """
+        Scale a count observed in a sample to the full population.
+
+        Uses the Wilson score interval on the sampled proportion, so bounds
+        stay inside [0, total_rows] even for rare or saturated issues.
+
+        Returns:
+            Dictionary with estimate, lower and upper counts
+        """
+        if sample_rows <= 0:
+            return {'estimate': 0, 'lower': 0, 'upper': total_rows}
+
+        z = SamplingService.Z_SCORE
+        p = sample_count / sample_rows
+        denominator = 1 + z * z / sample_rows
+        centre = (p + z * z / (2 * sample_rows)) / denominator
+        margin = z * math.sqrt(p * (1 - p) / sample_rows + z * z / (4 * sample_rows * sample_rows)) / denominator
+
+        return {
+            'estimate': int(round(p * total_rows)),
+            'lower': max(int(sample_count), int(math.floor(max(0.0, centre - margin) * total_rows))),
+            'upper': int(math.ceil(min(1.0, centre + margin) * total_rows))
+        }
+
@@ -0,0 +1,382 @@
+import gzip
+import io
+import os
+import shutil
+import threading
+import time
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - not available on Windows
+    fcntl = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+GZIP_MAGIC = b'\x1f\x8b'
+ZSTD_MAGIC = b'\x28\xb5\x2f\xfd'
+
+# Upload name suffix -> codec of files that arrive already compressed
+COMPRESSED_EXTENSIONS = {'gz': 'gzip', 'zst': 'zstd'}
+
+# Files in the upload folder that belong to an upload rather than being one
+SIDECAR_SUFFIXES = ('.state.npz', '.tmp', '.size')
+
+
+class StorageLimitExceeded(Exception):
+    """Raised when a stream written to storage exceeds its size limit"""
+
+
+class StorageService:
+    """
+    Compressed upload storage.
+
+    Uploads keep their original names and are compressed in place; the codec
+    is recognised from magic bytes, so readers never need to know whether a
+    file was stored raw (older uploads) or compressed.
+    """
+
+    COPY_BLOCK_SIZE = 1024 * 1024
+
+    @staticmethod
+    def codec(file_path):
+        """'gzip', 'zstd' or None for a raw file"""
+        with open(file_path, 'rb') as handle:
+            magic = handle.read(4)
+
+        if magic.startswith(GZIP_MAGIC):
+            return 'gzip'
+        if magic == ZSTD_MAGIC:
+            return 'zstd'
+        return None
+
+    @staticmethod
+    def open(file_path):
+        """
+        Open an upload for reading as a binary stream of its original bytes.
+
+        Compressed files decompress as they are read; seeking forward works
+        everywhere, seeking backward only on raw files (cheaply) or gzip.
+        """
+        codec = StorageService.codec(file_path)
+
+        if codec == 'gzip':
+            return gzip.open(file_path, 'rb')
+        if codec == 'zstd':
+            if zstandard is None:
+                raise RuntimeError('zstandard is required to read zstd-compressed uploads')
+            reader = zstandard.ZstdDecompressor().stream_reader(open(file_path, 'rb'), closefd=True)
+            return io.BufferedReader(reader, StorageService.COPY_BLOCK_SIZE)
+        return open(file_path, 'rb')
+
+    @staticmethod
+    def tell(handle):
+        """Original bytes read so far from a stream from open(), or None if it cannot tell"""
+        try:
+            return handle.tell()
+        except (OSError, ValueError):
+            return None
+
+    @staticmethod
+    def remove(file_path):
+        """Delete an upload together with its sidecars; missing files are ignored"""
+        for path in [file_path] + [file_path + suffix for suffix in SIDECAR_SUFFIXES]:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    @staticmethod
+    def size_path(file_path):
+        """Sidecar recording the original size of a compressed upload"""
+        return f'{file_path}.size'
+
+    @staticmethod
+    def record_size(file_path, size):
+        """Remember the original size of a compressed upload for size()"""
+        with open(StorageService.size_path(file_path), 'w') as handle:
+            handle.write(str(size))
+
+    @staticmethod
+    def size(file_path):
+        """
+        Original (uncompressed) size of an upload in bytes.
+
+        Compressed uploads use the size recorded when they were written. The
+        gzip ISIZE trailer is not used: it only covers the last member and
+        wraps at 4GB. Files without a record are measured by decompressing
+        them once, and the result is recorded.
+        """
+        codec = StorageService.codec(file_path)
+
+        if codec is None:
+            return os.path.getsize(file_path)
+
+        try:
+            with open(StorageService.size_path(file_path)) as handle:
+                return int(handle.read())
+        except (FileNotFoundError, ValueError):
+            pass
+
+        if codec == 'zstd' and zstandard is not None:
+            with open(file_path, 'rb') as handle:
+                content_size = zstandard.frame_content_size(handle.read(18))
+            if content_size >= 0:
+                return content_size
+
+        total = StorageService.measure(file_path)
+        StorageService.record_size(file_path, total)
+        return total
+
+    @staticmethod
+    def measure(file_path, limit=None):
+        """
+        Count the original bytes of an upload by reading it through.
+
+        Raises:
+            StorageLimitExceeded: the upload decompresses to more than limit bytes
+        """
+        total = 0
+        with StorageService.open(file_path) as handle:
+            while True:
+                block = handle.read(StorageService.COPY_BLOCK_SIZE)
+                if not block:
+                    return total
+                total += len(block)
+                if limit is not None and total > limit:
+                    raise StorageLimitExceeded(f'Upload decompresses to more than {limit} bytes')
+
+    @staticmethod
+    def adopt(file_path, limit=None):
+        """
+        Measure and record the original size of an upload that arrived compressed.
+
+        Returns:
+            Number of original bytes
+
+        Raises:
+            StorageLimitExceeded: it decompresses to more than limit bytes (the file is removed)
+        """
+        try:
+            size = StorageService.measure(file_path, limit=limit)
+        except Exception:
+            StorageService.remove(file_path)
+            raise
+        StorageService.record_size(file_path, size)
+        return size
+
+    @staticmethod
+    def readable(codec):
+        """Whether uploads compressed with codec can be decompressed on this server"""
+        return codec != 'zstd' or zstandard is not None
+
+    @staticmethod
+    def write(source, file_path, codec='gzip', limit=None, level=None, size_hint=None):
+        """
+        Stream a binary file-like object into storage, compressing on the fly.
+
+        Args:
+            source: Readable binary stream
+            file_path: Destination path (name is kept as-is)
+            codec: 'gzip', 'zstd' or None; zstd falls back to gzip when
+                the zstandard module is unavailable
+            limit: Optional maximum number of uncompressed bytes
+            level: Optional compression level
+            size_hint: Uncompressed size if known (recorded in zstd frames)
+
+        Returns:
+            Number of uncompressed bytes written; for compressed output it is
+            also recorded next to the file for size()
+
+        Raises:
+            StorageLimitExceeded: source is larger than limit (nothing is kept)
+        """
+        if codec == 'zstd' and zstandard is None:
+            codec = 'gzip'
+
+        written = 0
+        try:
+            with open(file_path, 'wb') as raw:
+                if codec == 'gzip':
+                    target = gzip.GzipFile(fileobj=raw, mode='wb', compresslevel=level or 6, mtime=0)
+                elif codec == 'zstd':
+                    compressor = zstandard.ZstdCompressor(level=level or 3)
+                    target = compressor.stream_writer(raw, size=size_hint if size_hint is not None else -1,
+                                                      closefd=False)
+                else:
+                    target = raw
+
+                try:
+                    while True:
+                        block = source.read(StorageService.COPY_BLOCK_SIZE)
+                        if not block:
+                            break
+                        written += len(block)
+                        if limit is not None and written > limit:
+                            raise StorageLimitExceeded(f'Upload exceeds {limit} bytes')
+                        target.write(block)
+                finally:
+                    if target is not raw:
+                        target.close()
+            if codec is not None:
+                StorageService.record_size(file_path, written)
+        except Exception:
+            StorageService.remove(file_path)
+            raise
+
+        return written
+
+    @staticmethod
+    def compress_file(file_path, codec='gzip', level=None):
+        """Compress an existing raw upload in place (no-op if already compressed)"""
+        if StorageService.codec(file_path) is not None:
+            return False
+
+        tmp_path = f'{file_path}.tmp'
+        with open(file_path, 'rb') as source:
+            StorageService.write(source, tmp_path, codec=codec, level=level,
+                                 size_hint=os.path.getsize(file_path))
+        shutil.copystat(file_path, tmp_path)
+        os.replace(StorageService.size_path(tmp_path), StorageService.size_path(file_path))
+        os.replace(tmp_path, file_path)
+        return True
+
+    @staticmethod
+    def owner(file_name):
+        """User id encoded in an upload name ('<user_id>_<uuid>.<ext>'), or None"""
+        prefix = file_name.split('_', 1)[0]
+        return int(prefix) if prefix.isdigit() else None
+
+    @staticmethod
+    def upload_groups(upload_folder):
+        """
+        Uploads in the folder with their sidecars.
+
+        Returns:
+            Dictionary of upload path -> (owner id, mtime, on-disk bytes incl. sidecars, paths)
+        """
+        groups = {}
+        sidecars = []
+
+        for entry in os.scandir(upload_folder):
+            if not entry.is_file() or entry.name.startswith('.'):
+                continue
+            if entry.name.endswith(SIDECAR_SUFFIXES):
+                sidecars.append(entry)
+                continue
+            stat = entry.stat()
+            groups[entry.path] = [StorageService.owner(entry.name), stat.st_mtime, stat.st_size, [entry.path]]
+
+        for entry in sidecars:
+            base = entry.path
+            for suffix in SIDECAR_SUFFIXES:
+                if base.endswith(suffix):
+                    base = base[:-len(suffix)]
+            if base in groups:
+                groups[base][2] += entry.stat().st_size
+                groups[base][3].append(entry.path)
+
+        return {path: tuple(group) for path, group in groups.items()}
+
+    @staticmethod
+    def select_expired(groups, max_age_seconds=None, quota_bytes=None, now=None):
+        """
+        Pick uploads to evict: older than max_age_seconds, then the oldest of
+        each user until that user's on-disk total fits in quota_bytes.
+
+        Returns:
+            List of upload paths
+        """
+        now = now if now is not None else time.time()
+        expired = set()
+        usage = {}
+
+        for path, (owner, mtime, size, _) in groups.items():
+            if max_age_seconds and now - mtime > max_age_seconds:
+                expired.add(path)
+                continue
+            usage.setdefault(owner, []).append((mtime, size, path))
+
+        if quota_bytes:
+            for owner, uploads in usage.items():
+                if owner is None:
+                    continue
+                total = sum(size for _, size, _ in uploads)
+                for mtime, size, path in sorted(uploads):
+                    if total <= quota_bytes:
+                        break
+                    expired.add(path)
+                    total -= size
+
+        return sorted(expired)
+
+    @staticmethod
+    def enforce_retention(upload_folder, max_age_seconds=None, quota_bytes=None, logger=None):
+        """
+        Delete expired uploads and their sidecars. Analysis rows are kept;
+        their file_path simply stops existing and readers report the data
+        as expired.
+
+        Returns:
+            Number of uploads removed
+        """
+        groups = StorageService.upload_groups(upload_folder)
+        removed = 0
+
+        for path in StorageService.select_expired(groups, max_age_seconds, quota_bytes):
+            for member in groups[path][3]:
+                try:
+                    os.remove(member)
+                except FileNotFoundError:
+                    pass
+                except OSError as exc:
+                    if logger:
+                        logger.warning('Retention could not remove %s: %s', member, exc)
+            removed += 1
+
+        if removed and logger:
+            logger.info('Retention removed %s expired uploads', removed)
+        return removed
+
+    @staticmethod
+    def start_retention(app):
+        """
+        Run enforce_retention every RETENTION_INTERVAL seconds in a daemon thread.
+
+        Every worker starts the thread, but an exclusive non-blocking flock on
+        a file in the upload folder lets only one of them sweep at a time
+        (without fcntl every worker sweeps; removals tolerate missing files).
+        """
+        config = app.config
+        upload_folder = config['UPLOAD_FOLDER']
+        max_age = config['UPLOAD_RETENTION_DAYS'] * 86400 if config['UPLOAD_RETENTION_DAYS'] else None
+        lock_path = os.path.join(upload_folder, '.retention.lock')
+
+        def sweep_forever():
+            while True:
+                time.sleep(config['RETENTION_INTERVAL'])
+                try:
+                    with open(lock_path, 'a') as lock_file:
+                        try:
+                            if fcntl is not None:
+                                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                        except BlockingIOError:
+                            continue
+                        try:
+                            StorageService.enforce_retention(
+                                upload_folder,
+                                max_age_seconds=max_age,
+                                quota_bytes=config['USER_STORAGE_QUOTA_BYTES'],
+                                logger=app.logger
+                            )
+                        finally:
+                            if fcntl is not None:
+                                fcntl.flock(lock_file, fcntl.LOCK_UN)
+                except Exception:
+                    app.logger.exception('Upload retention sweep failed')
+
+        thread = threading.Thread(target=sweep_forever, name='upload-retention', daemon=True)
+        thread.start()
+        return thread
@@ -0,0 +1,380 @@
+import os
+import random
+import secrets
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from flask import g, request
+from app.services.json_service import JsonService
+
+# Innermost open span of the current request, job or thread
+_current_span = ContextVar('current_span', default=None)
+
+
+class Trace:
+    """Spans of one request or job, kept in memory until the root span ends"""
+
+    def __init__(self, trace_id, sampled):
+        self.trace_id = trace_id
+        self.sampled = sampled
+        self.spans = []
+        self.dropped = 0
+        self._lock = threading.Lock()
+
+    def record(self, span):
+        """Keep a finished span, up to TraceService.MAX_SPANS per trace"""
+        with self._lock:
+            if len(self.spans) < TraceService.MAX_SPANS:
+                self.spans.append(span)
+            else:
+                self.dropped += 1
+
+
+class Span:
+    """One timed step of a trace"""
+
+    __slots__ = ('trace', 'name', 'span_id', 'parent_id', 'started_at', 'start', 'duration', 'attributes', 'error',
+                 'previous')
+
+    def __init__(self, trace, name, parent_id, attributes):
+        self.trace = trace
+        self.name = name
+        self.span_id = secrets.token_hex(8)
+        self.parent_id = parent_id
+        self.started_at = time.time()
+        self.start = time.perf_counter()
+        self.duration = None
+        self.attributes = attributes
+        self.error = None
+        # Span that was current before a root span opened; restored by finish()
+        self.previous = None
+
+    def set(self, **attributes):
+        """Add attributes, e.g. row counts known only once the step ran"""
+        self.attributes.update(attributes)
+
+    def end(self, error=None):
+        self.duration = time.perf_counter() - self.start
+        if error is not None:
+            self.error = f'{type(error).__name__}: {error}'
+        self.trace.record(self)
+
+    def to_dict(self):
+        data = {
+            'spanId': self.span_id,
+            'parentId': self.parent_id,
+            'name': self.name,
+            'startedAt': self.started_at,
+            'durationMs': round(self.duration * 1000, 3)
+        }
+        if self.attributes:
+            data['attributes'] = self.attributes
+        if self.error:
+            data['error'] = self.error
+        return data
+
+
+class TraceService:
+    """
+    Request and analysis tracing with offline export.
+
+    Every request gets a trace whose spans cover its slow steps; stages
+    timed through MetricsService.timed open spans automatically. Spans are
+    recorded in memory for every trace so slow requests can always be
+    logged with their full span tree, while only a sampled share of traces
+    is exported. Analyses run in worker processes record their spans under
+    the caller's trace context and hand them back to be grafted in.
+    """
+
+    ENABLED = True
+    SAMPLE_RATE = 0.1
+    EXPORTER = None
+    EXPORT_PATH = None
+    EXPORT_MAX_BYTES = 50 * 1024 ** 2
+    SLOW_SECONDS = 1.0
+    SLOW_LOG_PATH = None
+    MAX_SPANS = 2000
+
+    EXPORTERS = ('file', 'console')
+    _write_lock = threading.Lock()
+
+    @classmethod
+    def configure(cls, config):
+        """Take tracing settings from the app config"""
+        if config['TRACE_EXPORTER'] not in cls.EXPORTERS + (None,):
+            raise ValueError(f"TRACE_EXPORTER must be one of {cls.EXPORTERS} or None")
+
+        cls.ENABLED = config['TRACE_ENABLED']
+        cls.SAMPLE_RATE = config['TRACE_SAMPLE_RATE']
+        cls.EXPORTER = config['TRACE_EXPORTER']
+        cls.EXPORT_PATH = config['TRACE_EXPORT_PATH']
+        cls.EXPORT_MAX_BYTES = config['TRACE_EXPORT_MAX_BYTES']
+        cls.SLOW_SECONDS = config['TRACE_SLOW_REQUEST_SECONDS']
+        cls.SLOW_LOG_PATH = config['TRACE_SLOW_LOG_PATH']
+        cls.MAX_SPANS = config['TRACE_MAX_SPANS']
+
+    @staticmethod
+    def init_app(app):
+        """Trace every request except static files"""
+        if not app.config['TRACE_ENABLED']:
+            return
+
+        @app.before_request
+        def start_request_trace():
+            if request.endpoint == 'static':
+                return
+            parent = TraceService.parse_traceparent(request.headers.get('traceparent'))
+            g.trace_span = TraceService.start(f'{request.method} {request.path}', parent=parent,
+                                              method=request.method, path=request.path)
+
+        @app.after_request
+        def tag_request_trace(response):
+            span = g.get('trace_span')
+            if span is not None:
+                span.set(status=response.status_code)
+                response.headers['X-Trace-Id'] = span.trace.trace_id
+                if response.is_streamed:
+                    # Streamed bodies run after teardown; end the trace once the body is sent
+                    g.pop('trace_span')
+                    response.call_on_close(lambda: TraceService.finish(span))
+            return response
+
+        @app.teardown_request
+        def finish_request_trace(error=None):
+            span = g.pop('trace_span', None)
+            if span is not None:
+                TraceService.finish(span, error=error)
+
+    @staticmethod
+    @contextmanager
+    def span(name, **attributes):
+        """
+        Time a block as a child of the current span.
+
+        A no-op outside a trace, so instrumented code also runs unchanged in
+        the CLI and in background threads that were not handed a context.
+        """
+        parent = _current_span.get()
+        if parent is None:
+            yield None
+            return
+
+        span = Span(parent.trace, name, parent.span_id, attributes)
+        token = _current_span.set(span)
+        try:
+            yield span
+        except BaseException as exc:
+            span.end(error=exc)
+            raise
+        else:
+            span.end()
+        finally:
+            _current_span.reset(token)
+
+    @staticmethod
+    @contextmanager
+    def trace(name, parent=None, **attributes):
+        """Run a block as the root span of a new trace (or of a propagated context), then export it"""
+        span = TraceService.start(name, parent=parent, **attributes)
+        try:
+            yield span
+        except BaseException as exc:
+            TraceService.finish(span, error=exc)
+            raise
+        else:
+            TraceService.finish(span)
+
+    @staticmethod
+    def start(name, parent=None, **attributes):
+        """
+        Open a root span and make it current; pair with finish().
+
+        Args:
+            name: Span name, e.g. 'GET /api/results/12'
+            parent: Context from context() or parse_traceparent() to join, or None for a new trace
+            attributes: Attributes recorded on the span
+
+        Returns:
+            The root Span, or None when tracing is disabled
+        """
+        if not TraceService.ENABLED:
+            return None
+
+        if parent is not None:
+            trace = Trace(parent['traceId'], parent['sampled'])
+            parent_id = parent['spanId']
+        else:
+            trace = Trace(secrets.token_hex(16), random.random() < TraceService.SAMPLE_RATE)
+            parent_id = None
+
+        span = Span(trace, name, parent_id, attributes)
+        span.previous = _current_span.get()
+        _current_span.set(span)
+        return span
+
+    @staticmethod
+    def finish(span, error=None, export=True):
+        """Close a root span from start(), restore the previous span and export the trace"""
+        if span is None:
+            return
+
+        # Set rather than reset: teardown of a streamed response may run in another context
+        _current_span.set(span.previous)
+        span.previous = None
+        span.end(error=error)
+
+        if not export:
+            return
+        slow = span.duration >= TraceService.SLOW_SECONDS
+        if slow:
+            TraceService.log_slow(span)
+        if span.trace.sampled or slow:
+            TraceService.export(span)
+
+    @staticmethod
+    def context():
+        """Serializable context of the current span, to hand to a worker process or thread"""
+        span = _current_span.get()
+        if span is None:
+            return None
+        return {'traceId': span.trace.trace_id, 'spanId': span.span_id, 'sampled': span.trace.sampled}
+
+    @staticmethod
+    @contextmanager
+    def remote(context, name, **attributes):
+        """
+        Record a worker's spans under a context from context().
+
+        Yields a list that holds the worker's finished spans as dicts once
+        the block exits; return it to the caller and pass it to adopt().
+        Nothing is recorded without a context.
+        """
+        exported = []
+        if context is None or not TraceService.ENABLED:
+            yield exported
+            return
+
+        span = TraceService.start(name, parent=context, **attributes)
+        try:
+            yield exported
+        except BaseException as exc:
+            TraceService.finish(span, error=exc, export=False)
+            raise
+        else:
+            TraceService.finish(span, export=False)
+        finally:
+            exported.extend(recorded.to_dict() for recorded in span.trace.spans)
+
+    @staticmethod
+    def adopt(spans):
+        """Graft spans recorded by remote() in another process into the current trace"""
+        current = _current_span.get()
+        if current is None or not spans:
+            return
+
+        trace = current.trace
+        with trace._lock:
+            room = max(0, TraceService.MAX_SPANS - len(trace.spans))
+            trace.spans.extend(_RemoteSpan(data) for data in spans[:room])
+            trace.dropped += max(0, len(spans) - room)
+
+    @staticmethod
+    def parse_traceparent(header):
+        """Context from a W3C traceparent header, or None when absent or malformed"""
+        parts = (header or '').strip().split('-')
+        if len(parts) != 4 or len(parts[1]) != 32 or len(parts[2]) != 16:
+            return None
+        try:
+            int(parts[1], 16), int(parts[2], 16)
+            flags = int(parts[3], 16)
+        except ValueError:
+            return None
+        return {'traceId': parts[1], 'spanId': parts[2], 'sampled': bool(flags & 1)}
+
+    @staticmethod
+    def to_dict(root):
+        """Exported form of a finished trace: one record with its spans in start order"""
+        spans = sorted((span.to_dict() for span in root.trace.spans), key=lambda span: span['startedAt'])
+        return {
+            'traceId': root.trace.trace_id,
+            'name': root.name,
+            'startedAt': datetime.fromtimestamp(root.started_at, timezone.utc).isoformat(),
+            'durationMs': round(root.duration * 1000, 3),
+            'sampled': root.trace.sampled,
+            'droppedSpans': root.trace.dropped,
+            'spans': spans
+        }
+
+    @staticmethod
+    def render(root):
+        """Span tree of a finished trace as indented text, children in start order"""
+        spans = [span.to_dict() for span in root.trace.spans]
+        children = {}
+        for span in sorted(spans, key=lambda span: span['startedAt']):
+            children.setdefault(span['parentId'], []).append(span)
+
+        lines = [f"trace {root.trace.trace_id} {root.name} {root.duration * 1000:.1f} ms"]
+
+        def walk(span, depth):
+            attributes = ' '.join(f'{key}={value}' for key, value in span.get('attributes', {}).items())
+            line = f"{'  ' * depth}{span['name']} {span['durationMs']:.1f} ms"
+            if attributes:
+                line += f' [{attributes}]'
+            if span.get('error'):
+                line += f" !! {span['error']}"
+            lines.append(line)
+            for child in children.get(span['spanId'], ()):
+                walk(child, depth + 1)
+
+        for child in children.get(root.span_id, ()):
+            walk(child, 1)
+
+        if root.trace.dropped:
+            lines.append(f'  ... {root.trace.dropped} spans dropped')
+        return '\n'.join(lines)
+
+    @staticmethod
+    def log_slow(root):
+        """Write the span tree of a request that took longer than SLOW_SECONDS"""
+        stamp = datetime.fromtimestamp(root.started_at, timezone.utc).isoformat()
+        TraceService._write(TraceService.SLOW_LOG_PATH, f'{stamp} slow request\n{TraceService.render(root)}\n\n')
+
+    @staticmethod
+    def export(root):
+        """Hand a finished trace to the configured exporter"""
+        if TraceService.EXPORTER == 'file':
+            TraceService._write(TraceService.EXPORT_PATH,
+                                JsonService.dumps(TraceService.to_dict(root)).decode('utf-8') + '\n',
+                                max_bytes=TraceService.EXPORT_MAX_BYTES)
+        elif TraceService.EXPORTER == 'console':
+            TraceService._write(None, TraceService.render(root) + '\n')
+
+    @staticmethod
+    def _write(path, text, max_bytes=None):
+        """Append text to path (stderr when None), rotating to path.1 past max_bytes"""
+        with TraceService._write_lock:
+            if path is None:
+                sys.stderr.write(text)
+                sys.stderr.flush()
+                return
+
+            try:
+                if max_bytes and os.path.getsize(path) >= max_bytes:
+                    os.replace(path, path + '.1')
+            except OSError:
+                pass
+            with open(path, 'a', encoding='utf-8') as handle:
+                handle.write(text)
+
+
+class _RemoteSpan:
+    """A span recorded in another process, already in exported form"""
+
+    def __init__(self, data):
+        self.data = data
+
+    def to_dict(self):
+        return self.data
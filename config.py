@@ -23,10 +23,122 @@ class Config:
     MYSQL_POOL_TIMEOUT = 30
     MYSQL_POOL_RECYCLE = 300
 
+    # Seconds a worker waits for another worker's schema migration to finish
+    MIGRATION_LOCK_TIMEOUT = 60
+
     # File upload settings
     MAX_FILE_SIZE = 52428800  # 50MB
     UPLOAD_FOLDER = os.path.join(basedir, 'uploads')
-    ALLOWED_EXTENSIONS = {'csv'}
+    ALLOWED_EXTENSIONS = {'csv', 'parquet', 'ndjson', 'jsonl'}
+    # Text formats may also be uploaded gzip/zstd compressed, e.g. orders.csv.gz
+    COMPRESSED_UPLOAD_EXTENSIONS = {'csv', 'ndjson', 'jsonl'}
+
+    # Upload storage: compression codec ('gzip', 'zstd' or None) and retention
+    UPLOAD_COMPRESSION = 'gzip'
+    RETENTION_ENABLED = True
+    RETENTION_INTERVAL = 3600  # seconds between sweeps
+    UPLOAD_RETENTION_DAYS = 30
+    USER_STORAGE_QUOTA_BYTES = 1073741824  # 1GB on disk per user
+
+    # Background file deletion and orphan sweeping
+    REAPER_BATCH_SIZE = 200
+    REAPER_MAX_RETRIES = 5
+    REAPER_RETRY_DELAY = 2  # seconds, doubled on each retry
+    ORPHAN_SWEEP_ENABLED = True
+    ORPHAN_SWEEP_INTERVAL = 3600
+    ORPHAN_GRACE_SECONDS = 86400  # uploads younger than this are never orphans
+
+    # CSV parsing: 'auto' uses pyarrow when installed, 'c' forces pandas' parser
+    CSV_ENGINE = 'auto'
+    CSV_SNIFF_BYTES = 1024 * 1024  # first block used to sniff dialect and encoding
+
+    # Memory-aware admission: each analysis reserves its estimated peak memory against a
+    # budget shared by all workers on the host and queues until it fits
+    ANALYSIS_MEMORY_BUDGET = 2 * 1024 ** 3
+    ANALYSIS_IN_MEMORY_LIMIT = 512 * 1024 ** 2  # larger jobs stream in chunks
+    ANALYSIS_CHUNK_ROWS = 100000
+    ANALYSIS_QUEUE_TIMEOUT = 20  # seconds a job may wait for a 503; keep below the gunicorn --timeout
+
+    # Cross-column profile: columns examined and pairs reported, so the stored
+    # results (results_json, LONGTEXT since migration 7) stay small for wide files
+    CROSS_COLUMN_MAX_CORRELATION_COLUMNS = 50
+    CROSS_COLUMN_MAX_DEPENDENCY_COLUMNS = 20
+    CROSS_COLUMN_MAX_CORRELATIONS = 20
+    CROSS_COLUMN_MAX_DEPENDENCIES = 10
+
+    # Analysis progress: records are rewritten at most once per interval and
+    # removed after the TTL; cancellation is checked between chunks and detectors
+    # (not inside the single parse of an in-memory job)
+    ANALYSIS_PROGRESS_INTERVAL = 0.5
+    ANALYSIS_PROGRESS_TTL = 3600
+
+    # Batch analysis settings
+    BATCH_ARCHIVE_EXTENSIONS = {'zip'}
+    BATCH_MAX_FILES = 100
+    BATCH_MAX_WORKERS = 4
+
+    # Preview (sampled) analysis settings
+    PREVIEW_SAMPLE_ROWS = 2000
+    PREVIEW_STRATA = 20
+
+    # Largest affected-rows page a client may request
+    AFFECTED_ROWS_MAX_LIMIT = 5000
+
+    # Saved results are revalidated with their ETag on every reuse
+    RESULTS_CACHE_CONTROL = 'private, no-cache'
+
+    # JSON responses at least this large are gzip/brotli compressed
+    JSON_COMPRESS_MIN_BYTES = 8192
+    GZIP_LEVEL = 6
+    BROTLI_QUALITY = 5
+
+    # Instrumentation settings. /metrics only answers scrapes from
+    # METRICS_ALLOWED_IPS or carrying "Authorization: Bearer <METRICS_TOKEN>"
+    METRICS_ENABLED = True
+    METRICS_TOKEN = None
+    METRICS_ALLOWED_IPS = ('127.0.0.1', '::1')
+    ANALYSIS_INCLUDE_TIMINGS = False
+
+    # Tracing: every request is traced in memory; a sampled share of traces is
+    # exported ('file' appends NDJSON to TRACE_EXPORT_PATH, 'console' prints
+    # span trees to stderr, None exports nothing) and requests slower than
+    # TRACE_SLOW_REQUEST_SECONDS always have their span tree written to
+    # TRACE_SLOW_LOG_PATH (stderr when None)
+    TRACE_ENABLED = True
+    TRACE_SAMPLE_RATE = 0.01
+    TRACE_EXPORTER = 'file'
+    TRACE_EXPORT_PATH = os.path.join(basedir, 'instance', 'traces.ndjson')
+    TRACE_EXPORT_MAX_BYTES = 50 * 1024 * 1024
+    TRACE_SLOW_REQUEST_SECONDS = 2.0
+    TRACE_SLOW_LOG_PATH = os.path.join(basedir, 'instance', 'slow-requests.log')
+    TRACE_MAX_SPANS = 2000
+
+    # Parsed uploads kept per worker for affected-rows and AI requests, keyed
+    # by path and mtime and evicted least recently used first (0 disables)
+    DATASET_CACHE_BYTES = 256 * 1024 * 1024
+
+    # Gemini calls: per-attempt timeout and an overall deadline (kept well
+    # under the 120s gunicorn worker timeout in the Procfile), retries with
+    # jittered backoff, a host-wide concurrency limit and a circuit breaker;
+    # while the API is unavailable, cached or templated analysis text is
+    # served instead.
+    # The 'fake' backend answers with canned text and needs no network.
+    GEMINI_BACKEND = 'google'
+    GEMINI_ATTEMPT_TIMEOUT = 15
+    GEMINI_DEADLINE = 25
+    GEMINI_MAX_RETRIES = 2
+    GEMINI_BACKOFF_BASE = 0.5
+    GEMINI_BACKOFF_MAX = 4
+    GEMINI_MAX_CONCURRENCY = 4
+    GEMINI_QUEUE_TIMEOUT = 2
+    GEMINI_BREAKER_FAILURES = 3
+    GEMINI_BREAKER_RESET = 30
+    GEMINI_CACHE_SIZE = 256
+
+    # Authenticated user loading: per-worker cache and optional session claims
+    USER_CACHE_TTL = 60
+    USER_CACHE_SIZE = 1024
+    USER_SESSION_CLAIMS = False
 
     # Session settings
     SESSION_TIMEOUT = 3600
@@ -48,6 +160,7 @@ class TestingConfig(Config):
     """Testing configuration"""
     TESTING = True
     WTF_CSRF_ENABLED = False
+    GEMINI_BACKEND = 'fake'
 
 config = {
     'development': DevelopmentConfig,
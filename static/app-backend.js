@@ -1,9 +1,16 @@
+// Data files the upload zone accepts (compressed CSV/NDJSON included) plus zip batches
+const UPLOAD_SUFFIXES = ['.csv', '.csv.gz', '.csv.zst', '.parquet', '.ndjson', '.jsonl', '.ndjson.gz', '.ndjson.zst', '.jsonl.gz', '.jsonl.zst', '.zip'];
+
 class DataQualityDashboard {
     constructor() {
         this.currentFile = null;
         this.currentFileId = null;
+        this.analyzingFileId = null;
+        this.previewShown = false;
+        this.progressPercent = 0;
         this.analysisResults = null;
         this.history = [];
+        this.etagCache = new Map();
         this.modalElement = null;
         this.modalRefs = {};
         this.activeModalConfirmHandler = null;
@@ -18,6 +25,8 @@ class DataQualityDashboard {
         this.setupFileUpload();
         this.setupModal();
         this.setupButtons();
+        // An analysis nobody waits for any more only holds up other uploads
+        window.addEventListener('pagehide', () => this.cancelAnalysis());
         await this.loadHistory();
     }
 
@@ -114,10 +123,7 @@ class DataQualityDashboard {
 
         // File selection
         fileInput.addEventListener('change', (e) => {
-            const file = e.target.files[0];
-            if (file) {
-                this.handleFile(file);
-            }
+            this.handleFiles(Array.from(e.target.files));
         });
 
         // Drag and drop
@@ -134,15 +140,98 @@ class DataQualityDashboard {
             e.preventDefault();
             uploadZone.classList.remove('dragover');
 
-            const file = e.dataTransfer.files[0];
-            if (file && file.name.endsWith('.csv')) {
-                this.handleFile(file);
+            const files = Array.from(e.dataTransfer.files)
+                .filter(file => UPLOAD_SUFFIXES.some(suffix => file.name.toLowerCase().endsWith(suffix)));
+            if (files.length) {
+                this.handleFiles(files);
             } else {
-                alert('Please upload a CSV file');
+                alert('Please upload a CSV, Parquet or NDJSON file');
             }
         });
     }
 
+    handleFiles(files) {
+        if (files.length === 0) {
+            return;
+        }
+
+        // Several files or an archive go through the batch endpoint
+        if (files.length === 1 && !files[0].name.endsWith('.zip')) {
+            this.handleFile(files[0]);
+        } else {
+            this.handleBatch(files);
+        }
+    }
+
+    async handleBatch(files) {
+        this.showProgress();
+        this.updateProgressLabel(`Uploading ${files.length} file${files.length !== 1 ? 's' : ''}...`);
+
+        try {
+            const formData = new FormData();
+            files.forEach(file => formData.append('files', file));
+
+            const response = await fetch('/api/analyze/batch', {
+                method: 'POST',
+                body: formData
+            });
+
+            if (!response.ok) {
+                const error = await response.json();
+                throw new Error(error.message || 'Batch analysis failed');
+            }
+
+            const reader = response.body.getReader();
+            const decoder = new TextDecoder();
+            let buffer = '';
+            let failed = 0;
+            let complete = null;
+
+            while (true) {
+                const { value, done } = await reader.read();
+                if (done) break;
+
+                buffer += decoder.decode(value, { stream: true });
+                const lines = buffer.split('\n');
+                buffer = lines.pop();
+
+                for (const line of lines) {
+                    if (!line.trim()) continue;
+                    const event = JSON.parse(line);
+
+                    if (event.event === 'start') {
+                        this.updateProgressLabel(`Analyzing ${event.total} files...`);
+                    } else if (event.event === 'file') {
+                        if (!event.success) failed += 1;
+                        this.updateProgress((event.completed / event.total) * 100);
+                        this.updateProgressLabel(`Analyzed ${event.completed} of ${event.total}: ${event.filename}`);
+                    } else if (event.event === 'complete') {
+                        complete = event;
+                    }
+                }
+            }
+
+            if (!complete || !complete.success) {
+                throw new Error((complete && complete.message) || 'Batch analysis did not complete');
+            }
+
+            await this.loadHistory();
+            this.hideProgress();
+
+            this.showModal({
+                title: 'Batch Analysis Complete',
+                message: `${complete.analyses.length} file${complete.analyses.length !== 1 ? 's' : ''} analyzed` +
+                    (failed ? `, ${failed} failed` : '') + '. Results are available in your history.',
+                variant: failed ? 'warning' : 'success',
+                confirmLabel: 'OK'
+            });
+        } catch (error) {
+            console.error('Batch error:', error);
+            alert('Error: ' + error.message);
+            this.hideProgress();
+        }
+    }
+
     setupModal() {
         this.modalElement = document.getElementById('feedback-modal');
 
@@ -302,6 +391,8 @@ class DataQualityDashboard {
         }
 
         this.currentFile = file;
+        this.cancelAnalysis();
+        let fileId = null;
 
         // Show progress
         this.showProgress();
@@ -323,22 +414,42 @@ class DataQualityDashboard {
             }
 
             const uploadData = await uploadResponse.json();
-            this.currentFileId = uploadData.file_id;
+            fileId = uploadData.file_id;
+            this.currentFileId = fileId;
+            this.analyzingFileId = fileId;
+            this.previewShown = false;
 
             this.updateProgressLabel('Analyzing data...');
             this.updateProgress(50);
 
-            const analyzeResponse = await fetch('/api/analyze', {
+            const analyzePromise = fetch('/api/analyze', {
                 method: 'POST',
                 headers: {
                     'Content-Type': 'application/json'
                 },
-                body: JSON.stringify({ file_id: this.currentFileId })
+                body: JSON.stringify({ file_id: fileId })
+            });
+            analyzePromise.then(() => {}, () => {}).then(() => {
+                if (this.analyzingFileId === fileId) {
+                    this.analyzingFileId = null;
+                }
             });
 
+            // Show a sampled estimate and live progress while the full pass is still running
+            this.loadPreview(fileId, analyzePromise);
+            this.pollProgress(fileId, analyzePromise);
+
+            const analyzeResponse = await analyzePromise;
+
             if (!analyzeResponse.ok) {
                 const error = await analyzeResponse.json();
-                throw new Error(error.message || 'Analysis failed');
+                const failure = new Error(error.message || 'Analysis failed');
+                failure.cancelled = Boolean(error.cancelled);
+                throw failure;
+            }
+
+            if (fileId !== this.currentFileId) {
+                return;
             }
 
             const analyzeData = await analyzeResponse.json();
@@ -360,12 +471,106 @@ class DataQualityDashboard {
             }, 800);
 
         } catch (error) {
+            // A cancelled or superseded run must not disturb the upload that replaced it
+            if (error.cancelled || (fileId && fileId !== this.currentFileId)) {
+                return;
+            }
             console.error('Error:', error);
             alert('Error: ' + error.message);
             this.hideProgress();
         }
     }
 
+    cancelAnalysis() {
+        if (!this.analyzingFileId) {
+            return;
+        }
+        // sendBeacon still goes out while the page unloads
+        navigator.sendBeacon(`/api/analyze/${encodeURIComponent(this.analyzingFileId)}/cancel`);
+        this.analyzingFileId = null;
+    }
+
+    async pollProgress(fileId, analyzePromise) {
+        let done = false;
+        analyzePromise.then(() => { done = true; }, () => { done = true; });
+
+        while (true) {
+            await new Promise(resolve => setTimeout(resolve, 1000));
+            if (done || fileId !== this.currentFileId) {
+                return;
+            }
+
+            try {
+                const response = await fetch(`/api/analyze/${encodeURIComponent(fileId)}/progress`, { cache: 'no-store' });
+                if (!response.ok) {
+                    continue;
+                }
+                const progress = (await response.json()).data;
+                if (done || fileId !== this.currentFileId || progress.status !== 'running') {
+                    continue;
+                }
+
+                if (progress.bytesTotal > 0) {
+                    const percent = 50 + 45 * Math.min(1, progress.bytesRead / progress.bytesTotal);
+                    if (percent > this.progressPercent) {
+                        this.updateProgress(percent);
+                    }
+                }
+                if (!this.previewShown) {
+                    this.updateProgressLabel(this.describeProgress(progress));
+                }
+            } catch (error) {
+                console.error('Progress error:', error);
+            }
+        }
+    }
+
+    describeProgress(progress) {
+        if (progress.stage === 'queued') {
+            return 'Waiting for capacity to analyze...';
+        }
+        if (progress.stage === 'detect' && progress.detector) {
+            return `Checking ${progress.detector.replace(/_/g, ' ')}...`;
+        }
+        if (progress.rows > 0) {
+            return `Analyzing data (${progress.rows.toLocaleString()} rows read)...`;
+        }
+        return 'Analyzing data...';
+    }
+
+    async loadPreview(fileId, analyzePromise) {
+        let fullDone = false;
+        analyzePromise.then(() => { fullDone = true; }, () => { fullDone = true; });
+
+        try {
+            const response = await fetch('/api/analyze/preview', {
+                method: 'POST',
+                headers: {
+                    'Content-Type': 'application/json'
+                },
+                body: JSON.stringify({ file_id: fileId })
+            });
+
+            if (!response.ok || fullDone || fileId !== this.currentFileId) {
+                return;
+            }
+
+            const previewData = await response.json();
+            if (fullDone || !previewData.success) {
+                return;
+            }
+
+            this.previewShown = true;
+            if (this.progressPercent < 75) {
+                this.updateProgress(75);
+            }
+            this.updateProgressLabel(`Preview from ${previewData.data.sampledRows.toLocaleString()} sampled rows, finishing full analysis...`);
+            this.updateStats(previewData.data);
+        } catch (error) {
+            console.error('Preview error:', error);
+        }
+    }
+
     showProgress() {
         document.querySelector('.upload-content').style.display = 'none';
         document.getElementById('upload-progress').style.display = 'block';
@@ -373,6 +578,7 @@ class DataQualityDashboard {
     }
 
     updateProgress(percent) {
+        this.progressPercent = percent;
         document.getElementById('progress-fill').style.width = percent + '%';
         document.getElementById('progress-percent').textContent = Math.floor(percent) + '%';
     }
@@ -506,7 +712,7 @@ class DataQualityDashboard {
 
             html += `
                 <div class="column-row">
-                    <div class="column-name">${col.name}</div>
+                    <div class="column-name" title="${this.columnProfileTitle(col)}">${col.name}</div>
                     <div class="column-type">${col.type}</div>
                     <div class="column-missing">${col.missingPercentage}%</div>
                     <div class="column-unique">${col.uniquePercentage}%</div>
@@ -520,15 +726,47 @@ class DataQualityDashboard {
         columnsTable.innerHTML = html;
     }
 
-    async loadHistory() {
-        try {
-            const response = await fetch('/api/history');
+    columnProfileTitle(col) {
+        // Most frequent values and shapes; "~" marks counts that are upper bounds
+        const format = entries => (entries || []).slice(0, 5)
+            .map(entry => `${entry.value} (${entry.error ? '~' : ''}${entry.count})`)
+            .join(', ');
 
-            if (!response.ok) {
-                throw new Error('Failed to load history');
-            }
+        const lines = [];
+        if (col.topValues && col.topValues.length) {
+            lines.push(`Top values: ${format(col.topValues)}`);
+        }
+        if (col.valueShapes && col.valueShapes.length) {
+            lines.push(`Shapes: ${format(col.valueShapes)}`);
+        }
+        return lines.join('\n').replace(/&/g, '&amp;').replace(/"/g, '&quot;').replace(/</g, '&lt;');
+    }
 
-            const data = await response.json();
+    async fetchJsonWithEtag(url) {
+        // Revalidate with the stored ETag; a 304 reuses the already-parsed body
+        const cached = this.etagCache.get(url);
+        const headers = cached ? { 'If-None-Match': cached.etag } : {};
+        const response = await fetch(url, { headers, cache: 'no-store' });
+
+        if (response.status === 304 && cached) {
+            return cached.data;
+        }
+
+        if (!response.ok) {
+            throw new Error(`Request failed with status ${response.status}`);
+        }
+
+        const data = await response.json();
+        const etag = response.headers.get('ETag');
+        if (etag) {
+            this.etagCache.set(url, { etag, data });
+        }
+        return data;
+    }
+
+    async loadHistory() {
+        try {
+            const data = await this.fetchJsonWithEtag('/api/history');
             this.history = data.history || [];
             this.renderHistory();
 
@@ -614,13 +852,7 @@ class DataQualityDashboard {
 
     async viewHistoryItem(analysisId) {
         try {
-            const response = await fetch(`/api/results/${analysisId}`);
-
-            if (!response.ok) {
-                throw new Error('Failed to load analysis');
-            }
-
-            const data = await response.json();
+            const data = await this.fetchJsonWithEtag(`/api/results/${analysisId}`);
             this.analysisResults = data.data;
 
             this.updateAnalysisView(this.analysisResults);
@@ -774,6 +1006,11 @@ class DataQualityDashboard {
                 <p><strong>Data Redundancy Impact:</strong> ${issue.count} duplicate entries inflate dataset size and skew frequency-based analyses.</p>
                 <p><strong>Accuracy Impact:</strong> Duplicates can double-count events, inflate metrics, and produce misleading reports.</p>
                 <p><strong>Storage Impact:</strong> Redundant records waste storage space and increase processing overhead unnecessarily.</p>
+            `,
+            'Dependency Violation': `
+                <p><strong>Consistency Impact:</strong> "${issue.column}" determines "${issue.dependentColumn}" in ${((issue.strength || 0) * 100).toFixed(1)}% of rows, but ${issue.count} records break that relationship.</p>
+                <p><strong>Analytical Impact:</strong> Conflicting values for the same key split groups and distort counts in reports that aggregate by either field.</p>
+                <p><strong>Root Cause Signal:</strong> Such exceptions usually come from manual entry, stale reference data, or merges of differently coded sources.</p>
             `
         };
 
@@ -836,6 +1073,14 @@ class DataQualityDashboard {
                     <li>Establish master data management practices</li>
                     <li>Review data import processes to prevent duplicate creation</li>
                 </ul>
+            `,
+            'Dependency Violation': `
+                <ul class="recommendation-list">
+                    <li>Compare the flagged rows with the usual value for the same key</li>
+                    <li>Derive the dependent field from a reference table instead of entering it by hand</li>
+                    <li>Add a lookup validation at entry for fields that should follow from a key</li>
+                    <li>Confirm whether legitimate exceptions exist before correcting records in bulk</li>
+                </ul>
             `
         };
 
@@ -874,6 +1119,10 @@ class DataQualityDashboard {
                 <p><strong>Duplicate Claims:</strong> Multiple submissions of the same claim can result in overpayment, requiring recovery and investigation for potential fraud.</p>
                 <p><strong>Patient Matching:</strong> Duplicate patient records lead to fragmented treatment history, eligibility errors, and member service issues.</p>
                 <p><strong>Provider Credentialing:</strong> Duplicate provider records complicate network management, payment accuracy, and quality reporting.</p>
+            `,
+            'Dependency Violation': `
+                <p><strong>Reference Data:</strong> Fields that follow from a key (provider NPI to practice location, ZIP code to state, procedure code to category) should agree across all claims.</p>
+                <p><strong>Claims Routing:</strong> Mismatched derived fields can route claims to the wrong region or fee schedule and trigger manual review.</p>
             `
         };
 
@@ -910,6 +1159,7 @@ class DataQualityDashboard {
                 body: JSON.stringify({
                     issue_type: issue.type,
                     column: issue.column,
+                    dependent: issue.dependentColumn,
                     severity: issue.severity,
                     count: issue.count,
                     percentage,
@@ -1240,6 +1490,7 @@ class DataQualityDashboard {
     }
 
     clearUpload() {
+        this.cancelAnalysis();
         this.currentFile = null;
         this.currentFileId = null;
         this.analysisResults = null;
@@ -1296,10 +1547,16 @@ class DataQualityDashboard {
 
         try {
             // Build query URL
-            let url = `/api/analysis/${analysisId}/affected-rows?issue_type=${encodeURIComponent(issueType)}&limit=${limit}&offset=${offset}`;
+            let url = `/api/analysis/${analysisId}/affected-rows?issue_type=${encodeURIComponent(issueType)}&limit=${limit}&offset=${offset}&format=columnar`;
             if (columnName) {
                 url += `&column=${encodeURIComponent(columnName)}`;
             }
+            if (this.currentIssue.rule) {
+                url += `&rule=${encodeURIComponent(this.currentIssue.rule)}`;
+            }
+            if (this.currentIssue.dependentColumn) {
+                url += `&dependent=${encodeURIComponent(this.currentIssue.dependentColumn)}`;
+            }
 
             const response = await fetch(url);
             const data = await response.json();
@@ -1311,7 +1568,7 @@ class DataQualityDashboard {
             // Hide loading, show table
             document.getElementById('table-loading').style.display = 'none';
 
-            if (data.data.rows.length === 0) {
+            if (data.data.row_count === 0) {
                 document.getElementById('table-empty').style.display = 'block';
                 return;
             }
@@ -1329,14 +1586,15 @@ class DataQualityDashboard {
     }
 
     renderAffectedRowsTable(data) {
-        const { rows, columns, total_count, affected_column } = data;
+        // Columnar payload: column names once, values[columnIndex][rowIndex]
+        const { values, columns, row_count, total_count, affected_column } = data;
 
         // Show table container
         document.getElementById('table-container').style.display = 'block';
 
         // Update row count
         const start = (this.currentPage - 1) * 50 + 1;
-        const end = Math.min(start + rows.length - 1, total_count);
+        const end = Math.min(start + row_count - 1, total_count);
         document.getElementById('table-row-count').textContent =
             `Showing ${start}-${end} of ${total_count} affected rows`;
 
@@ -1355,19 +1613,20 @@ class DataQualityDashboard {
 
         // Generate table body
         const tbody = document.getElementById('table-body');
-        tbody.innerHTML = rows.map(row => {
-            return `
-                <tr>
-                    ${columns.map(col => {
-                        const isRowIndex = col === 'row_index';
-                        const isAffected = col === affected_column;
-                        const className = isRowIndex ? 'row-index-col' : (isAffected ? 'highlight-column' : '');
-                        const value = row[col] !== null && row[col] !== undefined ? row[col] : '—';
-                        return `<td class="${className}" title="${value}">${value}</td>`;
-                    }).join('')}
-                </tr>
-            `;
-        }).join('');
+        const classNames = columns.map(col => {
+            if (col === 'row_index') return 'row-index-col';
+            return col === affected_column ? 'highlight-column' : '';
+        });
+        const rowsHtml = [];
+        for (let rowIndex = 0; rowIndex < row_count; rowIndex++) {
+            const cells = columns.map((col, columnIndex) => {
+                const cell = values[columnIndex][rowIndex];
+                const value = cell !== null && cell !== undefined ? cell : '—';
+                return `<td class="${classNames[columnIndex]}" title="${value}">${value}</td>`;
+            }).join('');
+            rowsHtml.push(`<tr>${cells}</tr>`);
+        }
+        tbody.innerHTML = rowsHtml.join('');
 
         // Update pagination
         const pagination = document.getElementById('table-pagination');
@@ -0,0 +1,60 @@
+import os
+import re
+import pytest
+from flask import Flask
+from flask_login import LoginManager, UserMixin
+from config import config
+
+
+@pytest.fixture
+def app(tmp_path):
+    """Bare Flask app with the testing config and a temporary upload folder; no database"""
+    app = Flask(__name__)
+    app.config.from_object(config['testing'])
+    app.config['UPLOAD_FOLDER'] = str(tmp_path / 'uploads')
+    os.makedirs(app.config['UPLOAD_FOLDER'])
+    return app
+
+
+@pytest.fixture
+def worker_timeout():
+    """The gunicorn worker timeout set in the Procfile, in seconds"""
+    procfile = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'Procfile')
+    with open(procfile) as handle:
+        return int(re.search(r'--timeout (\d+)', handle.read()).group(1))
+
+
+@pytest.fixture
+def write_csv(tmp_path):
+    """Write CSV text to a file under tmp_path and return its path"""
+    def write(text, name='data.csv'):
+        path = tmp_path / name
+        path.write_text(text)
+        return str(path)
+    return write
+
+
+class FakeUser(UserMixin):
+    """Logged-in user without a database row"""
+
+    def __init__(self, user_id):
+        self.id = user_id
+
+
+@pytest.fixture
+def api_client(app):
+    """Factory of test clients for the API blueprint, logged in as a given user id"""
+    from app.routes import api
+
+    login_manager = LoginManager(app)
+    login_manager.user_loader(lambda user_id: FakeUser(int(user_id)))
+    app.register_blueprint(api.bp)
+
+    def client_for(user_id):
+        client = app.test_client()
+        with client.session_transaction() as session:
+            session['_user_id'] = str(user_id)
+            session['_fresh'] = True
+        return client
+
+    return client_for
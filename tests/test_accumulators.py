@@ -0,0 +1,148 @@
+import os
+import numpy as np
+import pandas as pd
+import pytest
+from app.services.accumulator_service import (AccumulatorService, HyperLogLog, NumericAccumulator, SpaceSaving,
+                                              StateInvalidated, UniqueCounter, column_hashes, value_shapes)
+from app.services.analysis_service import AnalysisService
+
+
+def rows(start, stop, month='01'):
+    return ''.join(f'{i},n{i % 7},{i % 50},2024-{month}-{i % 28 + 1:02d}\n' for i in range(start, stop))
+
+
+def comparable(analysis):
+    """Exact fields an incremental result must share with a full pass (type sampling and top values are estimates)"""
+    keys = ('name', 'type', 'totalValues', 'missingCount', 'uniqueCount')
+    columns = [{key: column[key] for key in keys} for column in analysis['columns']]
+    return analysis['totalRows'], analysis['qualityScore'], analysis['issues'], columns
+
+
+def test_numeric_accumulator_merges_like_one_pass():
+    values = np.random.default_rng(0).normal(10, 3, 5000)
+    accumulator = NumericAccumulator()
+    for chunk in np.array_split(values, 7):
+        accumulator.add(chunk)
+
+    assert accumulator.n == len(values)
+    assert accumulator.mean == pytest.approx(values.mean())
+    assert accumulator.std == pytest.approx(values.std(ddof=1))
+
+
+def test_numeric_accumulator_outliers_survive_compaction():
+    values = np.concatenate([np.zeros(1000), np.ones(1000), [50.0]])
+    accumulator = NumericAccumulator()
+    accumulator.add(values)
+    accumulator.compact()
+    accumulator.add(np.array([0.0, 1.0]))
+
+    assert accumulator.outlier_count() == 1
+
+
+def test_numeric_accumulator_detects_band_drift():
+    accumulator = NumericAccumulator()
+    accumulator.add(np.tile([-10.0, 10.0], 50))
+    accumulator.compact()
+    # The spread collapses, so values dropped inside the old band could now be outliers
+    accumulator.add(np.zeros(100000))
+
+    with pytest.raises(StateInvalidated):
+        accumulator.outlier_count()
+
+
+def test_hyperloglog_merge_matches_union():
+    left, right = HyperLogLog(), HyperLogLog()
+    left.add(column_hashes(pd.Series(range(0, 60000)).astype(str)))
+    right.add(column_hashes(pd.Series(range(40000, 100000)).astype(str)))
+    left.merge(right)
+
+    assert left.count() == pytest.approx(100000, rel=0.03)
+
+
+def test_unique_counter_switches_to_sketch(monkeypatch):
+    monkeypatch.setattr(UniqueCounter, 'EXACT_LIMIT', 100)
+    counter = UniqueCounter()
+    counter.add(column_hashes(pd.Series(range(50)).astype(str)))
+    assert counter.exact and counter.count() == 50
+
+    counter.add(column_hashes(pd.Series(range(1000)).astype(str)))
+    assert not counter.exact
+    assert counter.count() == pytest.approx(1000, rel=0.05)
+
+
+def test_value_shapes_map_letters_and_digits():
+    shapes = value_shapes(pd.Series(['John 42', 'ab-1', 3.5]))
+
+    assert shapes.tolist() == ['Aaaa 99', 'aa-9', '9.9']
+
+
+def test_space_saving_is_exact_below_capacity():
+    summary = SpaceSaving()
+    for chunk in (['a', 'b', 'a'], ['b', 'a', 'c'], [1.0, 1]):
+        summary.add(pd.Series(chunk))
+
+    assert summary.top(3) == [
+        {'value': 'a', 'count': 3, 'error': 0},
+        {'value': '1', 'count': 2, 'error': 0},
+        {'value': 'b', 'count': 2, 'error': 0}
+    ]
+
+
+def test_space_saving_bounds_counts_past_capacity(monkeypatch):
+    monkeypatch.setattr(SpaceSaving, 'CAPACITY', 3)
+    chunks = [['x'] * 5 + ['a', 'b', 'c', 'd'], ['x'] * 3 + ['e', 'f', 'g', 'a']]
+    summary = SpaceSaving()
+    for chunk in chunks:
+        summary.add(pd.Series(chunk))
+
+    top = summary.top()
+    assert len(summary.counters) == 3
+    assert top[0] == {'value': 'x', 'count': 8, 'error': 0}
+    for entry in top:
+        true_count = sum(chunk.count(entry['value']) for chunk in chunks)
+        assert entry['count'] - entry['error'] <= true_count <= entry['count']
+    assert SpaceSaving.from_meta(summary.to_meta()).top() == top
+
+
+def test_analysis_reports_top_values_and_shapes(tmp_path):
+    path = tmp_path / 'data.csv'
+    path.write_text('id,code\n1,AB-1\n2,AB-2\n3,CD-3\n4,\n5,AB-1\n')
+
+    columns = {column['name']: column for column in AnalysisService.analyze_csv(str(path))['columns']}
+    chunked = {column['name']: column for column in AnalysisService.analyze_chunked(str(path), 2)['columns']}
+
+    assert columns['code']['topValues'][0] == {'value': 'AB-1', 'count': 2, 'error': 0}
+    assert columns['code']['valueShapes'] == [{'value': 'AA-9', 'count': 4, 'error': 0}]
+    assert 'valueShapes' not in columns['id']
+    assert chunked['code']['topValues'] == columns['code']['topValues']
+    assert chunked['code']['valueShapes'] == columns['code']['valueShapes']
+
+
+def test_incremental_analysis_matches_full_pass(tmp_path):
+    path = tmp_path / 'data.csv'
+    path.write_text('id,name,amount,when\n' + rows(0, 500))
+    state_path = AccumulatorService.state_path(str(path))
+    prefix_bytes = os.path.getsize(path)
+    prefix_hash = AccumulatorService.file_hash(str(path))
+    AnalysisService.analyze_csv(str(path), state_path=state_path)
+
+    with open(path, 'a') as handle:
+        handle.write(rows(500, 800, month='02') + '3,n3,3,2024-01-04\n')
+
+    assert AccumulatorService.prefix_matches(str(path), prefix_bytes, prefix_hash)
+    incremental = AnalysisService.analyze_incremental(str(path), prefix_bytes, state_path)
+    full = AnalysisService.analyze_csv(str(path))
+
+    assert incremental['incremental']['deltaRows'] == 301
+    assert comparable(incremental) == comparable(full)
+
+
+def test_prefix_mismatch_is_detected(tmp_path):
+    path = tmp_path / 'data.csv'
+    path.write_text('id,name,amount,when\n' + rows(0, 10))
+    prefix_bytes = os.path.getsize(path)
+    prefix_hash = AccumulatorService.file_hash(str(path))
+
+    path.write_text('id,name,amount,when\n' + rows(1, 11) + rows(11, 20))
+
+    assert not AccumulatorService.prefix_matches(str(path), prefix_bytes, prefix_hash)
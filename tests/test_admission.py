@@ -0,0 +1,126 @@
+import json
+import os
+import shutil
+import pytest
+from app.models.rule import Rule
+from app.services import gemini_client, memory_service
+from app.services.analysis_service import AnalysisService
+from app.services.gemini_client import ConcurrencySlots
+from app.services.memory_service import MemoryService, AdmissionTimeout
+
+
+@pytest.fixture
+def ledger(app):
+    """MemoryService configured against a ledger in the test upload folder"""
+    saved = MemoryService.snapshot()
+    MemoryService.configure(app.config)
+    yield MemoryService.LEDGER_PATH
+    MemoryService.restore(saved)
+
+
+def fill_budget(path, nbytes):
+    # A reservation held by a live process (this one) that nothing will release
+    with open(path, 'w') as handle:
+        json.dump({'other-job': [os.getpid(), nbytes]}, handle)
+
+
+def test_queue_timeout_stays_below_worker_timeout(app, worker_timeout):
+    assert app.config['ANALYSIS_QUEUE_TIMEOUT'] < worker_timeout
+
+
+def test_admit_times_out_while_budget_is_full(ledger):
+    fill_budget(ledger, MemoryService.BUDGET_BYTES)
+
+    with pytest.raises(AdmissionTimeout):
+        with MemoryService.admit(1, timeout=0.1):
+            pass
+
+    with open(ledger) as handle:
+        assert list(json.load(handle)) == ['other-job']
+
+
+def test_admit_releases_its_reservation(ledger):
+    with MemoryService.admit(100):
+        with open(ledger) as handle:
+            assert [size for _, size in json.load(handle).values()] == [100]
+
+    with open(ledger) as handle:
+        assert json.load(handle) == {}
+
+
+def test_reservations_of_dead_processes_are_dropped(ledger, monkeypatch):
+    fill_budget(ledger, MemoryService.BUDGET_BYTES)
+    monkeypatch.setattr(memory_service, '_process_alive', lambda pid: False)
+
+    with MemoryService.admit(1, timeout=0.1):
+        pass
+
+
+def test_analyze_route_answers_503_when_queue_times_out(app, api_client, ledger, write_csv, monkeypatch):
+    monkeypatch.setattr(Rule, 'rules_for_user', staticmethod(lambda user_id: None))
+    MemoryService.QUEUE_TIMEOUT = 0.1
+    fill_budget(ledger, MemoryService.BUDGET_BYTES)
+    shutil.copy(write_csv('a,b\n1,2\n'), os.path.join(app.config['UPLOAD_FOLDER'], '1_abc.csv'))
+
+    response = api_client(1).post('/api/analyze', json={'file_id': '1_abc.csv'})
+
+    assert response.status_code == 503
+    assert response.headers['Retry-After'] == '30'
+    assert response.get_json()['busy'] is True
+
+
+def test_without_fcntl_nothing_is_shared_across_processes(app, monkeypatch):
+    saved = MemoryService.snapshot()
+    monkeypatch.setattr(memory_service, 'fcntl', None)
+    monkeypatch.setattr(gemini_client, 'fcntl', None)
+    try:
+        MemoryService.configure(app.config)
+        assert MemoryService.LEDGER_PATH is None
+    finally:
+        MemoryService.restore(saved)
+
+    slots = ConcurrencySlots(1, app.config['UPLOAD_FOLDER'])
+    slot = slots.acquire(timeout=0)
+    assert slot is not None
+    assert slots.acquire(timeout=0) is None
+    slots.release(slot)
+    assert os.listdir(app.config['UPLOAD_FOLDER']) == []
+
+
+def test_chunked_engine_matches_in_memory(write_csv):
+    lines = ['id,email,amount,joined']
+    for i in range(3000):
+        email = '' if i % 11 == 0 else ('bad' if i % 29 == 0 else f'u{i}@example.com')
+        amount = 99999 if i % 997 == 0 else i % 100
+        lines.append(f'{i % 2900},{email},{amount},2020-01-{i % 28 + 1:02d}')
+    path = write_csv('\n'.join(lines) + '\n')
+
+    full = AnalysisService.analyze_csv(path)
+    chunked = AnalysisService.analyze_chunked(path, 500)
+
+    def core(results):
+        columns = [{key: col[key] for key in ('name', 'type', 'totalValues', 'missingCount', 'uniqueCount')}
+                   for col in results['columns']]
+        issues = sorted((issue['type'], issue.get('column') or '', issue['count']) for issue in results['issues'])
+        return results['totalRows'], columns, issues
+
+    assert core(chunked) == core(full)
+
+
+def test_plan_picks_engine_by_in_memory_limit(write_csv):
+    path = write_csv('id,name\n' + ''.join(f'{i},name{i}\n' for i in range(200)))
+    saved = MemoryService.snapshot()
+    try:
+        small = MemoryService.plan(path)
+        MemoryService.IN_MEMORY_LIMIT = small['inMemoryBytes'] - 1
+        MemoryService.CHUNK_ROWS = 50
+        large = MemoryService.plan(path)
+    finally:
+        MemoryService.restore(saved)
+
+    assert small['rows'] == 200
+    assert small['typeMix'] == {'numeric': 1, 'text': 1}
+    assert (small['engine'], small['chunkRows']) == ('in_memory', None)
+    assert small['reserveBytes'] == small['inMemoryBytes']
+    assert (large['engine'], large['chunkRows']) == ('chunked', 50)
+    assert large['reserveBytes'] >= 50 * large['bytesPerRow']
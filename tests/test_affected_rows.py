@@ -0,0 +1,85 @@
+import pytest
+from app.services.analysis_service import AnalysisService
+
+CSV = 'id,email,amount\n1,a@example.com,10\n2,,20\n3,c@example.com,\n4,,40\n'
+
+
+def test_columnar_matches_row_format(write_csv):
+    path = write_csv(CSV)
+
+    rows = AnalysisService.get_affected_rows(path, 'Missing Values', 'email')
+    columnar = AnalysisService.get_affected_rows(path, 'Missing Values', 'email', response_format='columnar')
+
+    assert columnar['format'] == 'columnar'
+    assert columnar['columns'] == rows['columns'] == ['row_index', 'id', 'email', 'amount']
+    assert [dict(zip(columnar['columns'], row)) for row in zip(*columnar['values'])] == rows['rows']
+
+
+def test_columnar_values_use_null_for_missing(write_csv):
+    result = AnalysisService.get_affected_rows(write_csv(CSV), 'Missing Values', 'email',
+                                               response_format='columnar')
+
+    assert result['values'] == [[2, 4], [2, 4], [None, None], [20, 40]]
+    assert result['total_count'] == 2
+    assert result['has_more'] is False
+
+
+def test_columnar_pages_and_empty_result(write_csv):
+    path = write_csv(CSV)
+
+    page = AnalysisService.get_affected_rows(path, 'Missing Values', 'email', limit=1, offset=1,
+                                             response_format='columnar')
+    empty = AnalysisService.get_affected_rows(path, 'Missing Values', 'id', response_format='columnar')
+
+    assert page['values'][0] == [4]
+    assert page['row_count'] == 1 and page['has_more'] is False
+    assert empty['values'] == [[], [], [], []]
+    assert empty['total_count'] == 0
+
+
+def test_projection_returns_only_requested_columns(write_csv):
+    result = AnalysisService.get_affected_rows(write_csv(CSV), 'Missing Values', 'email', columns=['amount'])
+
+    assert result['columns'] == ['row_index', 'amount']
+    assert result['rows'] == [{'row_index': 2, 'amount': 20}, {'row_index': 4, 'amount': 40}]
+
+
+def test_sort_descending_keeps_missing_last(write_csv):
+    path = write_csv('id,email,amount\n1,,5\n2,,\n3,,30\n4,,9\n')
+
+    result = AnalysisService.get_affected_rows(path, 'Missing Values', 'email', sort_by='amount',
+                                               descending=True)
+
+    assert [row['id'] for row in result['rows']] == [3, 4, 1, 2]
+
+
+def test_sort_mixed_column_falls_back_to_text(write_csv):
+    path = write_csv('id,email,code\n1,,b\n2,,10\n3,,a\n')
+
+    result = AnalysisService.get_affected_rows(path, 'Missing Values', 'email', sort_by='code')
+
+    assert [row['code'] for row in result['rows']] == ['10', 'a', 'b']
+
+
+def test_filters_combine_numeric_and_text(write_csv):
+    path = write_csv(CSV)
+    filters = [AnalysisService.parse_row_filter('amount', 'ge:20'),
+               AnalysisService.parse_row_filter('id', 'ne:2')]
+
+    result = AnalysisService.get_affected_rows(path, 'Missing Values', 'email', filters=filters)
+
+    assert [row['id'] for row in result['rows']] == [4]
+    assert result['total_count'] == 1
+
+
+def test_parse_row_filter_rejects_bad_specs():
+    assert AnalysisService.parse_row_filter('x', 'isnull') == ('x', 'isnull', '')
+    with pytest.raises(ValueError):
+        AnalysisService.parse_row_filter('x', 'between:1')
+    with pytest.raises(ValueError):
+        AnalysisService.parse_row_filter('x', 'eq')
+
+
+def test_unknown_columns_are_rejected(write_csv):
+    with pytest.raises(ValueError, match='nope'):
+        AnalysisService.get_affected_rows(write_csv(CSV), 'Missing Values', 'email', sort_by='nope')
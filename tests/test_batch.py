@@ -0,0 +1,96 @@
+import io
+import os
+import zipfile
+import pytest
+from app.models import analysis as analysis_model
+from app.models.analysis import Analysis
+from app.services.analysis_service import AnalysisService
+from app.services.batch_service import BatchService, _pool_context
+
+
+class FakeCursor:
+    """Cursor that hands out auto-increment ids the way MySQL does, one per INSERT"""
+
+    def __init__(self, db):
+        self.db = db
+        self.lastrowid = None
+
+    def execute(self, sql, params=None):
+        self.db.next_id += 1
+        self.lastrowid = self.db.next_id
+        self.db.statements.append(params)
+
+    def close(self):
+        pass
+
+
+class FakeDb:
+    def __init__(self, next_id=0):
+        self.next_id = next_id
+        self.statements = []
+        self.committed = False
+
+    def cursor(self):
+        return FakeCursor(self)
+
+    def commit(self):
+        self.committed = True
+
+    def rollback(self):
+        pass
+
+
+def test_workers_are_not_forked_from_the_caller():
+    assert _pool_context().get_start_method() in ('forkserver', 'spawn')
+
+
+def test_analyze_many_yields_every_file_and_reports_failures(tmp_path):
+    infos = []
+    for name, text in (('a.csv', 'x,y\n1,2\n3,4\n'), ('b.csv', 'x\n1\n\n2\n')):
+        path = tmp_path / name
+        path.write_text(text)
+        infos.append({'file_id': name, 'filename': name, 'file_path': str(path)})
+    infos.append({'file_id': 'gone.csv', 'filename': 'gone.csv', 'file_path': str(tmp_path / 'gone.csv')})
+
+    outcomes = {info['file_id']: (results, content_hash, error)
+                for info, results, content_hash, error in
+                BatchService.analyze_many(infos, max_workers=2, persist_state=False)}
+
+    assert set(outcomes) == {'a.csv', 'b.csv', 'gone.csv'}
+    results, content_hash, error = outcomes['a.csv']
+    assert error is None and len(content_hash) == 64
+    expected = AnalysisService.analyze_csv(infos[0]['file_path'])
+    assert results['issues'] == expected['issues']
+    assert results['columns'] == expected['columns']
+    assert outcomes['gone.csv'][2] is not None
+
+
+def test_save_many_assigns_ids_without_file_paths(app, monkeypatch):
+    db = FakeDb(next_id=40)
+    monkeypatch.setattr(analysis_model, 'get_db', lambda: db)
+    analyses = [Analysis(user_id=1, filename=f'{i}.csv', file_path=None) for i in range(3)]
+
+    with app.app_context():
+        Analysis.save_many(analyses)
+
+    assert [a.id for a in analyses] == [41, 42, 43]
+    assert db.committed
+    assert len(db.statements) == 3
+
+
+def test_oversized_batch_leaves_no_files_behind(app, api_client):
+    app.config['BATCH_MAX_FILES'] = 2
+    app.config['UPLOAD_COMPRESSION'] = 'gzip'
+    archive = io.BytesIO()
+    with zipfile.ZipFile(archive, 'w') as writer:
+        for name in ('a.csv', 'b.csv'):
+            writer.writestr(name, 'x,y\n1,2\n')
+    archive.seek(0)
+    # Each part fits the limit; only the extracted total exceeds it
+    files = [(archive, 'batch.zip'), (io.BytesIO(b'x,y\n1,2\n'), 'c.csv')]
+
+    response = api_client(1).post('/api/analyze/batch', data={'files': files},
+                                  content_type='multipart/form-data')
+
+    assert response.status_code == 400
+    assert os.listdir(app.config['UPLOAD_FOLDER']) == []
@@ -0,0 +1,84 @@
+import json
+import os
+import pytest
+from app import cli
+from app.services.rule_engine import RuleError
+
+ALLOWED = {'csv', 'ndjson'}
+COMPRESSED = {'csv'}
+
+
+def make_tree(tmp_path):
+    (tmp_path / 'b').mkdir()
+    for name in ('a.csv', 'notes.txt', 'b/c.csv.gz', 'b/d.ndjson'):
+        (tmp_path / name).write_text('x\n1\n')
+    return tmp_path
+
+
+def test_expand_paths_walks_directories_in_order(tmp_path):
+    root = make_tree(tmp_path)
+
+    paths = cli.expand_paths([str(root)], ALLOWED, COMPRESSED)
+
+    assert [os.path.relpath(path, root) for path in paths] == ['a.csv', 'b/c.csv.gz', 'b/d.ndjson']
+
+
+def test_expand_paths_keeps_explicit_files_and_drops_duplicates(tmp_path):
+    root = make_tree(tmp_path)
+
+    paths = cli.expand_paths([str(root / 'notes.txt'), str(root / '**' / '*.csv*'), str(root / 'a.csv')],
+                             ALLOWED, COMPRESSED)
+
+    assert [os.path.relpath(path, root) for path in paths] == ['notes.txt', 'a.csv', 'b/c.csv.gz']
+
+
+def test_completed_keys_ignores_failures_and_cut_off_lines(tmp_path):
+    output = tmp_path / 'out.ndjson'
+    output.write_bytes(
+        b'{"path":"/a","fileSize":1,"mtime":2,"success":true}\n'
+        b'{"path":"/b","fileSize":1,"mtime":2,"success":false}\n'
+        b'{"path":"/c","fileSi'
+    )
+
+    assert cli.completed_keys(str(output)) == {('/a', 1, 2)}
+    assert cli.completed_keys(str(tmp_path / 'missing.ndjson')) == set()
+
+
+def test_resumed_output_starts_on_a_new_line(tmp_path):
+    output = tmp_path / 'out.ndjson'
+    output.write_bytes(b'{"path":"/c","fileSi')
+
+    with cli.open_output(str(output), resume=True) as handle:
+        handle.write(b'{}\n')
+
+    assert output.read_bytes().splitlines() == [b'{"path":"/c","fileSi', b'{}']
+
+
+def test_load_rules_validates_every_rule(tmp_path):
+    rules = tmp_path / 'rules.json'
+    rules.write_text(json.dumps({'id': 'x'}))
+
+    assert cli.load_rules(None) is None
+    with pytest.raises(RuleError):
+        cli.load_rules(str(rules))
+
+
+def test_resume_skips_files_already_analyzed(tmp_path, capsys):
+    data = tmp_path / 'data'
+    data.mkdir()
+    (data / 'one.csv').write_text('a,b\n1,2\n3,\n')
+    output = tmp_path / 'out.ndjson'
+
+    assert cli.main(['analyze', str(data), '-o', str(output), '-w', '1']) == 0
+    (data / 'two.csv').write_text('a\n1\n')
+    assert cli.main(['analyze', str(data), '-o', str(output), '-w', '1', '--resume']) == 0
+
+    records = [json.loads(line) for line in output.read_bytes().splitlines()]
+    assert [record['filename'] for record in records] == ['one.csv', 'two.csv']
+    assert all(record['success'] for record in records)
+    assert '1 analyzed, 0 failed, 1 skipped' in capsys.readouterr().err
+
+
+def test_resume_requires_output():
+    with pytest.raises(SystemExit):
+        cli.main(['analyze', 'x.csv', '--resume'])
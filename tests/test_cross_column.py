@@ -0,0 +1,120 @@
+import numpy as np
+import pandas as pd
+import pytest
+from config import config
+from app.models.analysis import Analysis
+from app.models.rule import Rule
+from app.services.analysis_service import AnalysisService
+from app.services.cross_column_service import CrossColumnService
+from app.services.gemini_client import Completion
+from app.services.gemini_service import GeminiService
+
+
+@pytest.fixture
+def limits():
+    """Restore CrossColumnService limits changed by a test"""
+    saved = CrossColumnService.snapshot()
+    yield CrossColumnService
+    CrossColumnService.restore(saved)
+
+
+def correlated_frame(columns, rows=200):
+    base = np.arange(rows, dtype=float)
+    return pd.DataFrame({f'c{i}': base * (i + 1) + i for i in range(columns)})
+
+
+def profile_of(df):
+    column_types = {name: 'numeric' for name in df.columns}
+    correlation, dependencies = CrossColumnService.accumulators(
+        *CrossColumnService.plan(CrossColumnService.sample(df), column_types)
+    )
+    if correlation is not None:
+        correlation.add(df)
+    for dependency in dependencies:
+        dependency.add(df)
+    return CrossColumnService.report(correlation, dependencies)
+
+
+def test_configure_reads_app_settings(limits):
+    limits.configure({
+        'CROSS_COLUMN_MAX_CORRELATION_COLUMNS': 3, 'CROSS_COLUMN_MAX_DEPENDENCY_COLUMNS': 4,
+        'CROSS_COLUMN_MAX_CORRELATIONS': 5, 'CROSS_COLUMN_MAX_DEPENDENCIES': 6
+    })
+
+    assert limits.snapshot() == {'MAX_CORRELATION_COLUMNS': 3, 'MAX_DEPENDENCY_COLUMNS': 4,
+                                 'MAX_CORRELATIONS': 5, 'MAX_DEPENDENCIES': 6}
+    assert config['default'].CROSS_COLUMN_MAX_CORRELATIONS == 20
+
+
+def test_correlations_are_capped_strongest_first(limits):
+    limits.MAX_CORRELATIONS = 4
+    df = correlated_frame(8)
+    df['c7'] = df['c7'] + np.tile([0, 40], 100)
+
+    profile, _ = profile_of(df)
+
+    assert len(profile['correlations']) == 4
+    assert all(abs(entry['r']) == 1.0 for entry in profile['correlations'])
+
+
+def test_correlation_columns_are_capped(limits):
+    limits.MAX_CORRELATION_COLUMNS = 3
+
+    profile, _ = profile_of(correlated_frame(6))
+
+    assert profile['correlationColumns'] == ['c0', 'c1', 'c2']
+    assert len(profile['correlations']) == 3
+
+
+def test_dependencies_are_capped_even_for_saved_plans(limits):
+    rows = 300
+    df = pd.DataFrame({'key': np.arange(rows) % 10})
+    for i in range(6):
+        df[f'd{i}'] = (df['key'] + i) % 10 * 7
+    _, dependencies = CrossColumnService.accumulators([], [('key', f'd{i}') for i in range(6)])
+    for dependency in dependencies:
+        dependency.add(df)
+    limits.MAX_DEPENDENCIES = 2
+
+    profile, _ = CrossColumnService.report(None, dependencies)
+
+    assert [entry['dependent'] for entry in profile['dependencies']] == ['d0', 'd1']
+
+
+def test_discovery_respects_dependency_limit(limits):
+    limits.MAX_DEPENDENCIES = 3
+    df = pd.DataFrame({'key': np.arange(500) % 10})
+    for i in range(6):
+        df[f'd{i}'] = (df['key'] + i) % 10
+
+    assert len(CrossColumnService.discover_dependencies(df)) == 3
+
+
+def test_each_dependent_gets_its_own_issue_and_drill_down(app, api_client, write_csv, monkeypatch):
+    lines = ['key,d0,d1']
+    for i in range(300):
+        key = i % 10
+        lines.append(f'k{key},{"x" if i < 2 else f"a{key}"},{"y" if i < 5 else f"b{key}"}')
+    path = write_csv('\n'.join(lines) + '\n')
+    results = AnalysisService.analyze_csv(path)
+    issues = {issue['dependentColumn']: issue for issue in results['issues']
+              if issue['type'] == 'Dependency Violation' and issue['column'] == 'key'}
+
+    assert {dependent: issue['count'] for dependent, issue in issues.items()} == {'d0': 2, 'd1': 5}
+    for dependent, issue in issues.items():
+        rows = AnalysisService.get_affected_rows(path, 'Dependency Violation', 'key', dependent_column=dependent)
+        assert rows['total_count'] == issue['count']
+
+    analysis = Analysis(id=5, user_id=1, file_path=path)
+    analysis.set_results(results)
+    monkeypatch.setattr(Analysis, 'get_by_id', classmethod(lambda cls, *args, **kwargs: analysis))
+    monkeypatch.setattr(Rule, 'rules_for_user', staticmethod(lambda user_id: None))
+    payloads = []
+    monkeypatch.setattr(GeminiService, 'generate_issue_analysis',
+                        staticmethod(lambda payload: payloads.append(payload) or Completion('text', 'model')))
+
+    response = api_client(1).post('/api/analysis/5/generate-issue-analysis',
+                                  json={'issue_type': 'Dependency Violation', 'column': 'key', 'dependent': 'd1'})
+
+    assert response.status_code == 200
+    assert payloads[0]['count'] == 5
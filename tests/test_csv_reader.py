@@ -0,0 +1,86 @@
+import pandas as pd
+import pytest
+from app.services.csv_reader import CsvReader
+
+
+@pytest.fixture
+def engine():
+    """Run a test with a given CsvReader.ENGINE and restore the settings afterwards"""
+    saved = CsvReader.snapshot()
+
+    def use(name):
+        CsvReader.ENGINE = name
+    yield use
+    CsvReader.restore(saved)
+
+
+def test_sniff_detects_semicolons_and_quotes():
+    dialect = CsvReader.sniff_bytes(b"id;name\n1;'a;b'\n2;'c'\n")
+
+    assert dialect['delimiter'] == ';'
+    assert dialect['quotechar'] == "'"
+    assert dialect['header'] == ['id', 'name']
+
+
+def test_detect_encoding():
+    assert CsvReader.detect_encoding(b'\xef\xbb\xbfid\n') == 'utf-8-sig'
+    assert CsvReader.detect_encoding('café'.encode('utf-8')) == 'utf-8'
+    # A multibyte character cut off at the end of the sniffed block is still UTF-8
+    assert CsvReader.detect_encoding('café'.encode('utf-8')[:-1]) == 'utf-8'
+    assert CsvReader.detect_encoding('café,1\n'.encode('cp1252')) == 'cp1252'
+    assert CsvReader.detect_encoding(b'\x81\x8d') == 'latin-1'
+
+
+def test_header_keeps_pandas_names_for_duplicates():
+    dialect = CsvReader.sniff_bytes(b'a,a,b\n1,2,3\n')
+
+    assert dialect['rawHeader'] == ['a', 'a', 'b']
+    assert dialect['header'] == ['a', 'a.1', 'b']
+
+
+@pytest.mark.parametrize('name', ['auto', 'c'])
+def test_engines_agree(write_csv, engine, name):
+    engine(name)
+    path = write_csv('id|city|amount\n1|Paris|1.5\n2||NULL\n3|Zürich|2\n')
+
+    df, info = CsvReader.read(path)
+
+    assert info['delimiter'] == '|'
+    assert list(df.columns) == ['id', 'city', 'amount']
+    assert df['city'].isna().tolist() == [False, True, False]
+    assert df['amount'].tolist()[0] == 1.5 and pd.isna(df['amount'].iloc[1])
+    assert df['city'].iloc[2] == 'Zürich'
+
+
+def test_arrow_falls_back_to_c_on_invalid_text(tmp_path, engine):
+    engine('auto')
+    CsvReader.SNIFF_BYTES = 64
+    path = tmp_path / 'data.csv'
+    # The bad byte lies past the sniffed block, so the file is read as UTF-8
+    path.write_bytes(b'n,s\n' + b''.join(f'{i},x\n'.encode() for i in range(100)) + b'1,caf\xe9\n')
+
+    df, info = CsvReader.read(str(path))
+
+    assert info['encoding'] == 'utf-8'
+    assert info['engine'] == 'c'
+    assert 'fallbackReason' in info
+    assert df['s'].iloc[-1] == 'caf\ufffd'
+
+
+def test_iter_chunks_matches_whole_read(write_csv):
+    path = write_csv('n,s\n' + ''.join(f'{i},x{i}\n' for i in range(25)))
+    seen = []
+
+    chunks = list(CsvReader.iter_chunks(path, 10, progress=seen.append))
+
+    assert [len(chunk) for chunk in chunks] == [10, 10, 5]
+    assert pd.concat(chunks, ignore_index=True).equals(CsvReader.read(path)[0])
+    assert len(seen) == 3
+
+
+def test_read_bytes_with_names_has_no_header():
+    dialect = CsvReader.sniff_bytes(b'a,b\n1,2\n')
+
+    df, _ = CsvReader.read_bytes(b'3,4\n5,6\n', dialect=dialect, names=['a', 'b'])
+
+    assert df.to_dict('list') == {'a': [3, 5], 'b': [4, 6]}
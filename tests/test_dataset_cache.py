@@ -0,0 +1,106 @@
+import os
+import pytest
+from app.services.dataset_cache import DatasetCache
+from app.services.dataset_reader import DatasetReader
+
+
+@pytest.fixture
+def reads(monkeypatch):
+    """Empty cache with a generous budget; returns the usecols of every real parse"""
+    saved = DatasetCache.BUDGET_BYTES
+    DatasetCache.BUDGET_BYTES = 64 * 1024 ** 2
+    DatasetCache.clear()
+    calls = []
+    real_read = DatasetReader.read
+
+    def counting_read(file_path, usecols=None, probe=None):
+        calls.append(usecols)
+        return real_read(file_path, usecols=usecols, probe=probe)
+
+    monkeypatch.setattr(DatasetReader, 'read', staticmethod(counting_read))
+    yield calls
+    DatasetCache.BUDGET_BYTES = saved
+    DatasetCache.clear()
+
+
+CSV = 'a,b,c\n1,x,2.5\n2,y,\n3,z,4.0\n'
+
+
+def test_second_read_is_a_hit(write_csv, reads):
+    path = write_csv(CSV)
+
+    first, _ = DatasetCache.read(path)
+    second, parser = DatasetCache.read(path)
+
+    assert reads == [None]
+    assert second.equals(first)
+    assert parser['format'] == 'csv'
+
+
+def test_only_missing_columns_are_parsed(write_csv, reads):
+    path = write_csv(CSV)
+
+    DatasetCache.read(path, usecols=['a'])
+    df, _ = DatasetCache.read(path, usecols=['a', 'c'])
+    DatasetCache.read(path, usecols=['c'])
+
+    assert reads == [['a'], ['c']]
+    assert list(df.columns) == ['a', 'c']
+
+
+def test_replaced_file_is_never_served_stale(write_csv, reads):
+    path = write_csv(CSV)
+    DatasetCache.read(path)
+
+    with open(path, 'a') as handle:
+        handle.write('4,w,5.0\n')
+    os.utime(path, ns=(0, os.stat(path).st_mtime_ns + 10 ** 9))
+    df, _ = DatasetCache.read(path)
+
+    assert len(df) == 4
+    assert len(reads) == 2
+
+
+def test_least_recently_used_upload_is_evicted(write_csv, reads):
+    first = write_csv(CSV, name='first.csv')
+    second = write_csv(CSV, name='second.csv')
+    DatasetCache.read(first)
+    DatasetCache.BUDGET_BYTES = DatasetCache._bytes + 1
+
+    DatasetCache.read(second)
+    DatasetCache.read(second)
+    DatasetCache.read(first)
+
+    assert reads == [None, None, None]
+    assert list(DatasetCache._entries) == [first]
+
+
+def test_invalidate_and_zero_budget_bypass(write_csv, reads):
+    path = write_csv(CSV)
+    DatasetCache.read(path)
+
+    DatasetCache.invalidate(path)
+    DatasetCache.read(path)
+    DatasetCache.BUDGET_BYTES = 0
+    DatasetCache.read(path)
+
+    assert len(reads) == 3
+
+
+def test_frames_do_not_leak_changes_into_the_cache(write_csv, reads):
+    path = write_csv(CSV)
+    df, _ = DatasetCache.read(path)
+
+    df.loc[0, 'a'] = 100
+
+    assert DatasetCache.read(path)[0].loc[0, 'a'] == 1
+
+
+def test_deleted_upload_is_dropped(write_csv, reads):
+    path = write_csv(CSV)
+    DatasetCache.read(path)
+    os.remove(path)
+
+    with pytest.raises(FileNotFoundError):
+        DatasetCache.read(path)
+    assert path not in DatasetCache._entries
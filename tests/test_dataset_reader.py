@@ -0,0 +1,66 @@
+import io
+import pandas as pd
+import pytest
+from app.services.analysis_service import AnalysisService
+from app.services.dataset_reader import DatasetReader, parquet
+from app.services.storage_service import StorageService
+
+NDJSON = b'{"id": 1, "tags": ["a"], "code": "007"}\n{"id": 2, "tags": null, "code": "8"}\n'
+
+
+def test_format_looks_through_compression_suffix():
+    assert DatasetReader.format('u/1_a.ndjson.gz') == 'ndjson'
+    assert DatasetReader.format('u/1_a.pq') == 'parquet'
+    assert DatasetReader.format('u/1_a.unknown') == 'csv'
+
+
+def test_ndjson_keeps_json_types_and_flattens_nesting():
+    df = DatasetReader.parse_ndjson(NDJSON)
+
+    assert df['code'].tolist() == ['007', '8']
+    assert df['tags'].iloc[0] == '["a"]'
+    assert pd.isna(df['tags'].iloc[1])
+    assert DatasetReader.parse_ndjson(b'  \n').empty
+
+
+def test_compressed_ndjson_reads_and_chunks(tmp_path):
+    path = str(tmp_path / '1_a.ndjson')
+    StorageService.write(io.BytesIO(NDJSON * 5), path, codec='gzip')
+
+    probe = DatasetReader.probe(path)
+    df, parser = DatasetReader.read(path, usecols=['id'], probe=probe)
+    chunks = list(DatasetReader.iter_chunks(path, 4, probe=probe))
+
+    assert probe == {'format': 'ndjson', 'header': ['id', 'tags', 'code']}
+    assert parser['format'] == 'ndjson'
+    assert list(df.columns) == ['id'] and len(df) == 10
+    assert [len(chunk) for chunk in chunks] == [4, 4, 2]
+
+
+@pytest.mark.skipif(parquet is None, reason='pyarrow is not installed')
+def test_parquet_keeps_column_types(tmp_path):
+    path = str(tmp_path / '1_a.parquet')
+    pd.DataFrame({
+        'amount': [1.5, None, 3.0],
+        'when': pd.to_datetime(['2024-01-01', '2024-02-01', None]),
+        'name': ['a', 'b', 'c']
+    }).to_parquet(path)
+
+    df, parser = DatasetReader.read(path, usecols=['amount', 'when'])
+    head, total = DatasetReader.parquet_head(path, 2)
+    types = {col['name']: col['type'] for col in AnalysisService.analyze_csv(path)['columns']}
+
+    assert parser == {'format': 'parquet', 'engine': 'pyarrow'}
+    assert list(df.columns) == ['amount', 'when']
+    assert (len(head), total) == (2, 3)
+    assert types == {'amount': 'numeric', 'when': 'date', 'name': 'text'}
+
+
+def test_parquet_requires_pyarrow(tmp_path, monkeypatch):
+    from app.services import dataset_reader
+    monkeypatch.setattr(dataset_reader, 'parquet', None)
+
+    assert DatasetReader.supports('parquet') is False
+    assert DatasetReader.supports('csv') is True
+    with pytest.raises(ValueError):
+        DatasetReader.read(str(tmp_path / '1_a.parquet'))
@@ -0,0 +1,53 @@
+import pandas as pd
+from app.services.date_parser import DateParser
+
+
+def test_infer_format_picks_single_explicit_format():
+    sample = pd.Series(['2024-01-05', '2024-02-17', '2023-12-31'])
+
+    assert DateParser.infer_format(sample) == ('%Y-%m-%d', 1.0)
+
+
+def test_infer_format_prefers_day_first_when_month_first_fails():
+    sample = pd.Series(['25/01/2024', '13/02/2024', '01/03/2024'])
+
+    assert DateParser.infer_format(sample)[0] == '%d/%m/%Y'
+
+
+def test_infer_format_keeps_month_first_for_ambiguous_dates():
+    assert DateParser.infer_format(pd.Series(['01/02/2024', '03/04/2024']))[0] == '%m/%d/%Y'
+
+
+def test_infer_format_rejects_numbers_and_mostly_text():
+    assert DateParser.infer_format(pd.Series(['20240101', '20240102'])) == (None, 0.0)
+
+    date_format, ratio = DateParser.infer_format(pd.Series(['2024-01-01', 'n/a', 'soon', 'later']))
+    assert date_format is None
+    assert ratio == 0.25
+
+
+def test_infer_format_of_blank_sample():
+    assert DateParser.infer_format(pd.Series(['', '  '])) == (None, 0.0)
+
+
+def test_parse_turns_mismatches_into_nat():
+    parsed = DateParser.parse(pd.Series(['2024-01-05', 'bad', None]), '%Y-%m-%d')
+
+    assert parsed.iloc[0] == pd.Timestamp('2024-01-05')
+    assert parsed.iloc[1:].isna().all()
+
+
+def test_parse_converts_aware_values_to_naive_utc():
+    parsed = DateParser.parse(pd.Series(['2024-01-05T12:00:00+02:00']), 'ISO8601')
+
+    assert parsed.dt.tz is None
+    assert parsed.iloc[0] == pd.Timestamp('2024-01-05 10:00:00')
+
+
+def test_parse_passes_typed_columns_through():
+    typed = pd.Series(pd.to_datetime(['2024-01-05 12:00']).tz_localize('Europe/Paris'))
+
+    parsed = DateParser.parse(typed, None)
+
+    assert parsed.iloc[0] == pd.Timestamp('2024-01-05 11:00')
+    assert DateParser.parse(pd.Series(['2024-01-05']), None).isna().all()
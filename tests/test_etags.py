@@ -0,0 +1,91 @@
+import gzip
+import json
+import pytest
+from app.models.analysis import Analysis
+from app.services.json_service import JsonService
+
+
+@pytest.fixture
+def saved_analysis(monkeypatch):
+    analysis = Analysis(id=5, user_id=1, version=2, results_json='{"totalRows":1}')
+    monkeypatch.setattr(Analysis, 'get_by_id',
+                        classmethod(lambda cls, analysis_id, user_id=None, include_results=True:
+                                    analysis if analysis_id == 5 and user_id == 1 else None))
+    return analysis
+
+
+def test_etag_changes_with_version_and_representation():
+    analysis = Analysis(id=5, version=2)
+
+    assert analysis.etag('results') == 'analysis-5-v2-results'
+    assert analysis.etag('export') != analysis.etag('results')
+    assert Analysis(id=5, version=3).etag('results') != analysis.etag('results')
+
+
+def test_etag_variants_cover_every_encoding():
+    assert JsonService.etag_variants('tag') == ['tag', 'tag-gzip', 'tag-br']
+
+
+def test_embed_prepends_fields_without_reencoding():
+    body = JsonService.embed('{"totalRows":1}', analysis_id=5)
+
+    assert json.loads(body) == {'analysis_id': 5, 'totalRows': 1}
+    assert JsonService.embed('', analysis_id=5) == b'{"analysis_id":5}'
+
+
+def test_results_carry_etag_and_revalidate(api_client, saved_analysis):
+    client = api_client(1)
+
+    response = client.get('/api/results/5')
+    etag = response.headers['ETag'].strip('"')
+
+    assert response.status_code == 200
+    assert etag == 'analysis-5-v2-results'
+    assert response.get_json()['data'] == {'analysis_id': 5, 'totalRows': 1}
+
+    revalidated = client.get('/api/results/5', headers={'If-None-Match': f'"{etag}"'})
+
+    assert revalidated.status_code == 304
+    assert revalidated.data == b''
+
+
+def test_new_version_is_not_served_as_not_modified(api_client, saved_analysis):
+    client = api_client(1)
+    etag = client.get('/api/results/5').headers['ETag']
+
+    saved_analysis.version = 3
+
+    assert client.get('/api/results/5', headers={'If-None-Match': etag}).status_code == 200
+
+
+def test_compressed_etag_revalidates(app, api_client, saved_analysis):
+    app.config['JSON_COMPRESS_MIN_BYTES'] = 0
+    client = api_client(1)
+    headers = {'Accept-Encoding': 'gzip'}
+
+    response = client.get('/api/results/5', headers=headers)
+    etag = response.headers['ETag'].strip('"')
+
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert etag == 'analysis-5-v2-results-gzip'
+    assert json.loads(gzip.decompress(response.data))['success'] is True
+
+    revalidated = client.get('/api/results/5', headers=dict(headers, **{'If-None-Match': f'"{etag}"'}))
+
+    assert revalidated.status_code == 304
+    assert revalidated.headers['ETag'].strip('"') == etag
+
+
+def test_export_etag_is_separate_from_results(api_client, saved_analysis):
+    client = api_client(1)
+    results_etag = client.get('/api/results/5').headers['ETag']
+
+    export = client.get('/api/export/5', headers={'If-None-Match': results_etag})
+
+    assert export.status_code == 200
+    assert export.headers['ETag'].strip('"') == 'analysis-5-v2-export'
+    assert 'quality-report-5.json' in export.headers['Content-Disposition']
+
+
+def test_other_users_analysis_is_not_found(api_client, saved_analysis):
+    assert api_client(2).get('/api/results/5').status_code == 404
@@ -0,0 +1,168 @@
+import pytest
+from collections import OrderedDict
+from app.services.gemini_client import (CircuitBreaker, ConcurrencySlots, FakeBackend, GeminiClient,
+                                        GeminiUnavailable)
+
+CLIENT_SETTINGS = ('ATTEMPT_TIMEOUT', 'DEADLINE', 'MAX_RETRIES', 'BACKOFF_BASE', 'BACKOFF_MAX', 'QUEUE_TIMEOUT',
+                   'CACHE_SIZE', 'backend', 'breaker', 'slots', '_cache')
+
+
+class ApiError(Exception):
+    """Stand-in for google-genai's APIError, which carries the HTTP status as code"""
+
+    def __init__(self, code):
+        super().__init__(f'HTTP {code}')
+        self.code = code
+
+
+@pytest.fixture
+def client(monkeypatch):
+    """GeminiClient on a FakeBackend with fast retries; returns a function installing a script"""
+    saved = {name: getattr(GeminiClient, name) for name in CLIENT_SETTINGS}
+    GeminiClient.ATTEMPT_TIMEOUT = 2
+    GeminiClient.DEADLINE = 5
+    GeminiClient.MAX_RETRIES = 2
+    GeminiClient.BACKOFF_BASE = 0.001
+    GeminiClient.BACKOFF_MAX = 0.002
+    GeminiClient.QUEUE_TIMEOUT = 0.05
+    GeminiClient.CACHE_SIZE = 2
+    GeminiClient.breaker = CircuitBreaker(failure_threshold=2, reset_seconds=30)
+    GeminiClient.slots = ConcurrencySlots(1)
+    GeminiClient._cache = OrderedDict()
+
+    def use(script=None, latency=0.0):
+        GeminiClient.backend = FakeBackend(script, latency=latency)
+        return GeminiClient.backend
+
+    yield use
+    for name, value in saved.items():
+        setattr(GeminiClient, name, value)
+
+
+def test_retryable_errors_are_retried(client):
+    backend = client([ApiError(503), TimeoutError('slow'), 'answer'])
+
+    assert GeminiClient.generate('p', 'fallback') == ('answer', 'model')
+    assert len(backend.calls) == 3
+    assert GeminiClient.breaker.failures == 0
+
+
+def test_client_errors_are_not_retried(client):
+    backend = client([ApiError(400), 'never'])
+
+    assert GeminiClient.generate('p', 'fallback') == ('fallback', 'fallback')
+    assert len(backend.calls) == 1
+
+
+def test_retries_stop_after_max_retries(client):
+    backend = client([ApiError(500)] * 5)
+
+    with pytest.raises(GeminiUnavailable):
+        GeminiClient.call('p')
+    assert len(backend.calls) == GeminiClient.MAX_RETRIES + 1
+
+
+def test_attempts_share_one_deadline(client):
+    GeminiClient.DEADLINE = 0.9
+    backend = client([ApiError(503), 'late'])
+
+    with pytest.raises(GeminiUnavailable):
+        GeminiClient.call('p')
+    # A retry needs at least a second left before the deadline
+    assert len(backend.calls) == 1
+
+
+def test_slow_backend_is_cut_off_by_attempt_timeout(client):
+    GeminiClient.ATTEMPT_TIMEOUT = 0.05
+    GeminiClient.DEADLINE = 0.5
+    client(latency=1.0)
+
+    assert GeminiClient.generate('p', 'fallback').source == 'fallback'
+
+
+def test_breaker_opens_then_admits_one_trial():
+    breaker = CircuitBreaker(failure_threshold=2, reset_seconds=30)
+
+    breaker.record_failure()
+    assert breaker.state == 'closed'
+    breaker.record_failure()
+    assert breaker.state == 'open' and not breaker.allow()
+
+    breaker.opened_at -= 30
+    assert breaker.state == 'half_open'
+    assert breaker.allow() is True
+    assert breaker.allow() is False
+
+    breaker.record_failure()
+    assert breaker.state == 'open'
+
+    breaker.opened_at -= 30
+    assert breaker.allow()
+    breaker.record_success()
+    assert breaker.state == 'closed' and breaker.failures == 0
+
+
+def test_open_breaker_refuses_without_calling(client):
+    backend = client([ApiError(500)] * 10)
+    GeminiClient.MAX_RETRIES = 0
+
+    for _ in range(2):
+        GeminiClient.generate('p', 'fallback')
+    calls = len(backend.calls)
+
+    assert GeminiClient.generate('p', 'fallback').source == 'fallback'
+    assert len(backend.calls) == calls
+
+
+def test_cached_answer_beats_fallback(client):
+    client(['first answer', ApiError(400)])
+
+    GeminiClient.generate('p', 'fallback')
+
+    assert GeminiClient.generate('p', 'fallback') == ('first answer', 'cache')
+
+
+def test_cache_keeps_most_recent_prompts(client):
+    client(['a', 'b', 'c'])
+    for prompt in ('a', 'b', 'c'):
+        GeminiClient.generate(prompt, 'fallback')
+
+    assert GeminiClient._cached('a') is None
+    assert GeminiClient._cached('c') == 'c'
+
+
+def test_no_free_slot_gives_fallback_and_returns_breaker_trial(client):
+    client(['answer'])
+    held = GeminiClient.slots.acquire(timeout=0)
+    GeminiClient.breaker.failures = 2
+    GeminiClient.breaker.opened_at = 0
+    try:
+        assert GeminiClient.generate('p', 'fallback').source == 'fallback'
+    finally:
+        GeminiClient.slots.release(held)
+
+    assert GeminiClient.breaker.trial_running is False
+
+
+def test_file_slots_are_shared_across_instances(tmp_path):
+    first = ConcurrencySlots(1, str(tmp_path))
+    second = ConcurrencySlots(1, str(tmp_path))
+
+    slot = first.acquire(timeout=0)
+    assert second.acquire(timeout=0.05) is None
+    first.release(slot)
+    again = second.acquire(timeout=0)
+    assert again is not None
+    second.release(again)
+
+
+def test_fake_backend_script_and_canned_answer():
+    backend = FakeBackend(['scripted'])
+
+    assert backend.generate('one', timeout=1) == 'scripted'
+    assert '### Executive Summary' in backend.generate('two', timeout=1)
+    assert backend.calls == ['one', 'two']
+
+
+def test_deadline_stays_below_worker_timeout(app, worker_timeout):
+    assert app.config['GEMINI_DEADLINE'] < worker_timeout
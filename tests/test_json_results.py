@@ -0,0 +1,45 @@
+import json
+from app.services.analysis_service import AnalysisService
+
+
+def make_messy_csv():
+    lines = ['id,email,amount,price,joined,city,zip']
+    for i in range(400):
+        email = 'not-an-email' if i % 13 == 0 else f'user{i}@example.com'
+        amount = 100000 if i == 7 else i % 50
+        joined = '2999-01-01' if i % 17 == 0 else f'2020-01-{i % 28 + 1:02d}'
+        city, zip_code = ('Springfield', '11111') if i % 2 else ('Shelbyville', '22222')
+        if i == 3:
+            zip_code = '22222'
+        lines.append(f'{i},{email},{amount},{i % 40 - 5},{joined},{city},{zip_code}')
+    lines.append(lines[-1])
+    return '\n'.join(lines) + '\n'
+
+
+def assert_native_counts(results):
+    # The stdlib encoder rejects NumPy scalars; results must not need a custom default
+    json.dumps(results)
+    for issue in results['issues']:
+        assert type(issue['count']) is int, issue
+
+
+def test_in_memory_results_are_plain_json(write_csv):
+    results = AnalysisService.analyze_csv(write_csv(make_messy_csv()))
+
+    assert {issue['type'] for issue in results['issues']} >= {'Invalid Format', 'Duplicate Records', 'Statistical Outlier'}
+    assert_native_counts(results)
+
+
+def test_chunked_results_are_plain_json(write_csv):
+    assert_native_counts(AnalysisService.analyze_chunked(write_csv(make_messy_csv()), 64))
+
+
+def test_custom_rule_counts_are_native_ints(write_csv):
+    rules = [{'id': 'user_1', 'type': 'regex', 'column': 'city', 'pattern': 'Spring.*', 'name': 'City'}]
+
+    assert_native_counts(AnalysisService.analyze_csv(write_csv(make_messy_csv()), rules=rules))
+
+
+def test_email_pattern_is_shared():
+    assert AnalysisService.EMAIL_PATTERN.match('a@b.co')
+    assert not AnalysisService.EMAIL_PATTERN.match('a b@c.co')
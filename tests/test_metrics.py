@@ -0,0 +1,64 @@
+import pytest
+from app.routes import metrics
+from app.services.metrics_service import Histogram, MetricsService, StageTimer
+
+
+@pytest.fixture
+def client(app):
+    app.register_blueprint(metrics.bp)
+    return app.test_client()
+
+
+def test_histogram_buckets_are_cumulative():
+    histogram = Histogram('test_seconds', 'Test', buckets=(0.1, 1), label_names=('stage',))
+    histogram.observe(0.05, stage='parse')
+    histogram.observe(0.5, stage='parse')
+
+    lines = histogram.render()
+
+    assert 'test_seconds_bucket{stage="parse",le="0.1"} 1' in lines
+    assert 'test_seconds_bucket{stage="parse",le="1"} 2' in lines
+    assert 'test_seconds_bucket{stage="parse",le="+Inf"} 2' in lines
+    assert 'test_seconds_count{stage="parse"} 2' in lines
+
+
+def test_stage_timer_accumulates_repeated_stages():
+    timer = StageTimer()
+    for _ in range(3):
+        with timer.stage('accumulate'):
+            pass
+
+    breakdown = timer.breakdown(rows=10)
+
+    assert list(breakdown['stages']) == ['accumulate']
+    assert breakdown['totalMs'] >= breakdown['stages']['accumulate']
+    assert 'rowsPerSecond' in breakdown
+
+
+def test_metrics_served_to_allowed_address(client):
+    response = client.get('/metrics', environ_base={'REMOTE_ADDR': '127.0.0.1'})
+
+    assert response.status_code == 200
+    assert MetricsService.STAGE_DURATION.name in response.get_data(as_text=True)
+
+
+def test_metrics_hidden_from_other_addresses(client):
+    response = client.get('/metrics', environ_base={'REMOTE_ADDR': '203.0.113.9'})
+
+    assert response.status_code == 404
+
+
+def test_metrics_token_admits_any_address(app, client):
+    app.config['METRICS_TOKEN'] = 'scrape-secret'
+    remote = {'REMOTE_ADDR': '203.0.113.9'}
+
+    assert client.get('/metrics', environ_base=remote,
+                      headers={'Authorization': 'Bearer scrape-secret'}).status_code == 200
+    assert client.get('/metrics', environ_base=remote,
+                      headers={'Authorization': 'Bearer wrong'}).status_code == 404
+
+
+def test_metrics_disabled(app, client):
+    app.config['METRICS_ENABLED'] = False
+
+    assert client.get('/metrics', environ_base={'REMOTE_ADDR': '127.0.0.1'}).status_code == 404
@@ -0,0 +1,120 @@
+import pytest
+from app import migrations
+from app.migrations import LATEST_VERSION, MIGRATIONS, MigrationError, run_migrations
+
+
+class FakeCursor:
+    def __init__(self, db):
+        self.db = db
+        self.row = None
+
+    def execute(self, sql, params=None):
+        sql = ' '.join(sql.split())
+        self.db.executed.append(sql)
+        self.row = None
+
+        if sql.startswith('SELECT MAX(version)'):
+            self.row = {'version': max(self.db.applied, default=None)}
+        elif sql.startswith('SELECT GET_LOCK'):
+            self.row = {'acquired': 1 if self.db.lock_free else 0}
+        elif sql.startswith('SELECT DATA_TYPE'):
+            self.row = {'data_type': self.db.types[params]} if params in self.db.types else None
+        elif 'information_schema.COLUMNS' in sql:
+            self.row = {'found': int(params in self.db.columns)}
+        elif 'information_schema' in sql:
+            self.row = {'found': 0}
+        elif sql.startswith('INSERT INTO schema_migrations'):
+            self.db.applied.append(params[0])
+        elif sql.startswith('ALTER TABLE') and 'ADD COLUMN' in sql:
+            table, column = sql.split()[2], sql.split()[5]
+            self.db.columns.add((table, column))
+        elif sql.startswith('ALTER TABLE') and 'MODIFY COLUMN' in sql:
+            table, column, data_type = sql.split()[2], sql.split()[5], sql.split()[6]
+            self.db.types[(table, column)] = data_type
+
+    def fetchone(self):
+        return self.row
+
+    def fetchall(self):
+        return []
+
+    def close(self):
+        pass
+
+
+class FakeDb:
+    def __init__(self, applied=(), columns=(), lock_free=True, types=None):
+        self.applied = list(applied)
+        self.columns = set(columns)
+        self.types = dict(types or {})
+        self.lock_free = lock_free
+        self.executed = []
+        self.commits = 0
+
+    def cursor(self):
+        return FakeCursor(self)
+
+    def commit(self):
+        self.commits += 1
+
+    def rollback(self):
+        pass
+
+
+def test_versions_are_consecutive_from_one():
+    versions = [version for version, name, steps in MIGRATIONS]
+
+    assert versions == list(range(1, len(MIGRATIONS) + 1))
+    assert LATEST_VERSION == versions[-1]
+
+
+def test_fresh_database_applies_every_migration_in_order():
+    db = FakeDb()
+
+    assert run_migrations(db) == LATEST_VERSION
+    assert db.applied == list(range(1, LATEST_VERSION + 1))
+    assert db.commits == LATEST_VERSION
+
+
+def test_only_pending_migrations_run():
+    db = FakeDb(applied=range(1, LATEST_VERSION))
+
+    run_migrations(db)
+
+    assert db.applied[-1] == LATEST_VERSION
+    assert not any(sql.startswith('CREATE TABLE IF NOT EXISTS users') for sql in db.executed)
+
+
+def test_current_schema_is_a_single_select():
+    db = FakeDb(applied=range(1, LATEST_VERSION + 1))
+
+    assert run_migrations(db) == LATEST_VERSION
+    assert len(db.executed) == 1
+
+
+def test_add_column_is_idempotent():
+    db = FakeDb(columns={('analyses', 'version')})
+    cursor = db.cursor()
+
+    migrations.add_column('analyses', 'version', 'INT')(cursor)
+
+    assert not any(sql.startswith('ALTER TABLE') for sql in db.executed)
+
+
+def test_results_json_is_widened_once():
+    db = FakeDb(applied=range(1, 7), types={('analyses', 'results_json'): 'text'})
+
+    run_migrations(db)
+
+    assert db.types[('analyses', 'results_json')] == 'LONGTEXT'
+    assert sum('MODIFY COLUMN results_json' in sql for sql in db.executed) == 1
+
+    cursor = db.cursor()
+    migrations.modify_column('analyses', 'results_json', 'LONGTEXT')(cursor)
+
+    assert sum('MODIFY COLUMN results_json' in sql for sql in db.executed) == 1
+
+
+def test_lock_timeout_raises():
+    with pytest.raises(MigrationError):
+        run_migrations(FakeDb(lock_free=False))
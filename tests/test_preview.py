@@ -0,0 +1,96 @@
+import os
+import shutil
+from app.models.rule import Rule
+from app.services.analysis_service import AnalysisService
+from app.services.sampling_service import SamplingService
+
+
+def make_rows(count):
+    lines = ['id,email,amount']
+    for i in range(count):
+        email = '' if i % 10 == 0 else f'user{i}@example.com'
+        lines.append(f'{i},{email},{i % 97}')
+    return '\n'.join(lines) + '\n'
+
+
+def test_extrapolate_count_bounds_bracket_estimate():
+    bounds = SamplingService.extrapolate_count(50, 1000, 100000)
+
+    assert bounds['estimate'] == 5000
+    assert bounds['lower'] < 5000 < bounds['upper']
+    assert 0 <= bounds['lower'] and bounds['upper'] <= 100000
+
+
+def test_extrapolate_count_stays_in_range_for_saturated_issue():
+    bounds = SamplingService.extrapolate_count(1000, 1000, 5000)
+
+    assert bounds['estimate'] == 5000
+    assert bounds['upper'] == 5000
+    assert bounds['lower'] >= 1000
+
+
+def test_extrapolate_count_rare_issue_keeps_observed_minimum():
+    bounds = SamplingService.extrapolate_count(0, 1000, 100000)
+
+    assert bounds['estimate'] == 0
+    assert bounds['lower'] == 0
+    assert bounds['upper'] > 0
+
+
+def test_wilson_lower_is_below_observed_proportion():
+    assert SamplingService.wilson_lower(0, 0) == 0.0
+    assert 0 < SamplingService.wilson_lower(80, 100) < 0.8
+
+
+def test_stratified_positions_cover_whole_range():
+    positions = SamplingService.stratified_positions(100000, 200, strata=10, seed=1)
+
+    assert positions == sorted(set(positions))
+    assert len(positions) == 200
+    assert min(positions) < 10000 and max(positions) >= 90000
+
+
+def test_stratified_positions_small_file_is_exhaustive():
+    assert SamplingService.stratified_positions(5, 10) == [0, 1, 2, 3, 4]
+
+
+def test_preview_extrapolates_to_estimated_rows(write_csv):
+    path = write_csv(make_rows(20000))
+
+    preview = AnalysisService.analyze_preview(path, sample_size=1000, strata=10)
+    full = AnalysisService.analyze_csv(path)
+
+    assert preview['preview'] is True
+    assert preview['sampledRows'] < full['totalRows']
+    assert abs(preview['totalRows'] - full['totalRows']) / full['totalRows'] < 0.05
+
+    missing = next(issue for issue in preview['issues'] if issue['column'] == 'email')
+    assert missing['countLower'] <= missing['count'] <= missing['countUpper']
+
+
+def test_preview_route_rejects_other_users_uploads(app, api_client, write_csv):
+    file_id = '2_abcdef.csv'
+    shutil.copy(write_csv(make_rows(10)), os.path.join(app.config['UPLOAD_FOLDER'], file_id))
+
+    response = api_client(1).post('/api/analyze/preview', json={'file_id': file_id})
+
+    assert response.status_code == 404
+
+
+def test_preview_route_rejects_path_traversal(app, api_client, write_csv):
+    write_csv(make_rows(10), name='1_outside.csv')
+
+    response = api_client(1).post('/api/analyze/preview', json={'file_id': '../1_outside.csv'})
+
+    assert response.status_code == 404
+
+
+def test_preview_route_serves_own_upload(app, api_client, write_csv, monkeypatch):
+    monkeypatch.setattr(Rule, 'rules_for_user', staticmethod(lambda user_id: None))
+    file_id = '1_abcdef.csv'
+    shutil.copy(write_csv(make_rows(10)), os.path.join(app.config['UPLOAD_FOLDER'], file_id))
+
+    response = api_client(1).post('/api/analyze/preview', json={'file_id': file_id})
+
+    assert response.status_code == 200
+    assert response.get_json()['data']['preview'] is True
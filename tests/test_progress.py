@@ -0,0 +1,104 @@
+import os
+import shutil
+import pytest
+from app.services import analysis_service
+from app.services.analysis_service import AnalysisService
+from app.services.progress_service import ProgressService, AnalysisCancelled
+
+
+@pytest.fixture
+def jobs(app):
+    """ProgressService keeping job files in the test upload folder"""
+    saved = (ProgressService.DIRECTORY, ProgressService.WRITE_INTERVAL)
+    ProgressService.configure(app.config)
+    ProgressService.WRITE_INTERVAL = 0
+    yield ProgressService
+    ProgressService.DIRECTORY, ProgressService.WRITE_INTERVAL = saved
+
+
+def rows(count):
+    return 'id,amount\n' + ''.join(f'{i},{i % 7}\n' for i in range(count))
+
+
+def test_progress_record_follows_the_analysis(jobs, write_csv):
+    path = write_csv(rows(50))
+    job = jobs.start('1_a.csv', 1, os.path.getsize(path))
+
+    AnalysisService.analyze_csv(path, job=job)
+    job.finish('done')
+
+    record = jobs.get('1_a.csv')
+    assert record['status'] == 'done'
+    assert record['rows'] == 50
+    assert record['bytesRead'] == record['bytesTotal']
+    assert record['cancelRequested'] is False
+
+
+def test_cancel_before_start_stops_at_first_checkpoint(jobs, write_csv):
+    assert jobs.request_cancel('1_a.csv') is True
+    job = jobs.start('1_a.csv', 1, 100)
+
+    with pytest.raises(AnalysisCancelled):
+        AnalysisService.analyze_chunked(write_csv(rows(50)), 10, job=job)
+
+    job.finish('cancelled')
+    assert jobs.get('1_a.csv')['cancelRequested'] is False
+
+
+def test_chunked_analysis_stops_between_chunks(jobs, write_csv, monkeypatch):
+    job = jobs.start('1_a.csv', 1, 100)
+    seen = []
+    advance = job.advance
+
+    def advance_and_cancel(*args, **kwargs):
+        seen.append(kwargs.get('rows'))
+        if len(seen) == 2:
+            jobs.request_cancel('1_a.csv')
+        advance(*args, **kwargs)
+
+    monkeypatch.setattr(job, 'advance', advance_and_cancel)
+
+    with pytest.raises(AnalysisCancelled):
+        AnalysisService.analyze_chunked(write_csv(rows(100)), 10, job=job)
+    assert len(seen) < 10
+
+
+def test_in_memory_parse_finishes_before_cancel_is_seen(jobs, write_csv, monkeypatch):
+    job = jobs.start('1_a.csv', 1, 100)
+    parsed = []
+    read = analysis_service.DatasetReader.read
+
+    def read_then_cancel(file_path, **kwargs):
+        jobs.request_cancel('1_a.csv')
+        result = read(file_path, **kwargs)
+        parsed.append(len(result[0]))
+        return result
+
+    monkeypatch.setattr(analysis_service.DatasetReader, 'read', staticmethod(read_then_cancel))
+
+    with pytest.raises(AnalysisCancelled):
+        AnalysisService.analyze_csv(write_csv(rows(30)), job=job)
+    assert parsed == [30]
+
+
+def test_without_directory_jobs_cannot_be_cancelled():
+    assert ProgressService.DIRECTORY is None
+    job = ProgressService.start('1_a.csv', 1, 10)
+
+    job.check()
+    assert ProgressService.request_cancel('1_a.csv') is False
+    assert ProgressService.get('1_a.csv') is None
+
+
+def test_cancel_and_progress_routes(app, api_client, jobs, write_csv):
+    shutil.copy(write_csv(rows(5)), os.path.join(app.config['UPLOAD_FOLDER'], '1_a.csv'))
+    owner = api_client(1)
+    jobs.start('1_a.csv', 1, 10)
+
+    assert api_client(2).get('/api/analyze/1_a.csv/progress').status_code == 404
+    assert api_client(2).post('/api/analyze/1_a.csv/cancel').status_code == 404
+    assert owner.post('/api/analyze/1_a.csv/cancel').status_code == 202
+    assert owner.get('/api/analyze/1_a.csv/progress').get_json()['data']['cancelRequested'] is True
+
+    jobs.start('1_a.csv', 1, 10).finish('done')
+    assert owner.post('/api/analyze/1_a.csv/cancel').status_code == 409
@@ -0,0 +1,61 @@
+import os
+from app.services.reaper_service import ReaperService
+
+
+def touch(path, mtime):
+    with open(path, 'w') as handle:
+        handle.write('x')
+    os.utime(path, (mtime, mtime))
+    return str(path)
+
+
+def test_orphans_include_unreferenced_uploads_and_their_sidecars(tmp_path):
+    kept = touch(tmp_path / '1_kept.csv', 100)
+    orphan = touch(tmp_path / '1_orphan.csv', 100)
+    sidecar = touch(tmp_path / '1_orphan.csv.state.npz', 100)
+
+    orphans = ReaperService.find_orphans(str(tmp_path), lambda paths: [kept], grace_seconds=10, now=1000)
+
+    assert sorted(orphans) == [orphan, sidecar]
+
+
+def test_fresh_uploads_survive_the_grace_period(tmp_path):
+    touch(tmp_path / '1_new.csv', 995)
+    touch(tmp_path / '1_gone.csv.size', 995)
+
+    def referenced(paths):
+        raise AssertionError('no candidate should be looked up')
+
+    assert ReaperService.find_orphans(str(tmp_path), referenced, grace_seconds=10, now=1000) == []
+
+
+def test_sidecars_without_upload_are_orphans(tmp_path):
+    sidecar = touch(tmp_path / '1_gone.csv.state.npz', 100)
+
+    assert ReaperService.find_orphans(str(tmp_path), lambda paths: paths, grace_seconds=10, now=1000) == [sidecar]
+
+
+def test_sweep_never_looks_outside_the_upload_folder(tmp_path):
+    uploads = tmp_path / 'uploads'
+    uploads.mkdir()
+    outside = touch(tmp_path / 'tmpabcdefgh.json', 100)
+
+    assert ReaperService.find_orphans(str(uploads), lambda paths: paths, grace_seconds=10, now=1000) == []
+    assert os.path.exists(outside)
+
+
+def test_remove_batch_reports_only_retryable_failures(tmp_path):
+    present = touch(tmp_path / 'a', 0)
+    directory = tmp_path / 'b'
+    directory.mkdir()
+
+    failed = ReaperService.remove_batch([(present, 0), (str(tmp_path / 'missing'), 0), (str(directory), 2)])
+
+    assert not os.path.exists(present)
+    assert failed == [(str(directory), 2)]
+
+
+def test_upload_paths_cover_every_sidecar():
+    assert ReaperService.upload_paths('u/1_a.csv') == [
+        'u/1_a.csv', 'u/1_a.csv.state.npz', 'u/1_a.csv.tmp', 'u/1_a.csv.size'
+    ]
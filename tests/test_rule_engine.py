@@ -0,0 +1,136 @@
+import pandas as pd
+import pytest
+from app.models.analysis import Analysis
+from app.models.rule import Rule
+from app.services.analysis_service import AnalysisService
+from app.services.rule_engine import RuleError, RuleSet, match_columns
+
+
+def violations(rule, df):
+    compiled = RuleSet([rule]).compile(df.columns)
+    return {rule.id: list(mask[mask].index) for rule, mask in
+            zip(compiled, RuleSet.evaluate(compiled, df).values())}
+
+
+@pytest.mark.parametrize('rule', [
+    {'type': 'between', 'column': 'a'},
+    {'type': 'range', 'column': 'a'},
+    {'type': 'comparison', 'left': 'a', 'right': 'b', 'op': '=>'},
+    {'type': 'regex', 'column': 'a', 'pattern': '('},
+    {'type': 'unique'},
+    {'type': 'not_null', 'column': 'a', 'issue': 'bogus'},
+    {'type': 'not_null', 'column': 'a', 'issue': 'dependency_violation'},
+    {'type': 'not_null', 'column': 'a', 'issue_type': 'Missing Values'},
+])
+def test_validate_rejects_malformed_rules(rule):
+    with pytest.raises(RuleError):
+        RuleSet.validate(rule)
+
+
+def test_match_columns_selectors():
+    columns = ['Selling Price', 'Cost Price', 'stock']
+
+    assert match_columns('stock', columns) == ['stock']
+    assert match_columns({'contains_all': ['price', 'cost']}, columns) == ['Cost Price']
+    assert match_columns({'contains_any': ['selling', 'stock']}, columns) == ['Selling Price', 'stock']
+    with pytest.raises(RuleError):
+        match_columns(3, columns)
+
+
+def test_rule_types_mark_violating_rows():
+    df = pd.DataFrame({
+        'age': [5, -1, 30, None],
+        'low': [1, 5, 2, 3],
+        'high': [2, 4, 2, None],
+        'code': ['AB1', 'xx', None, 'CD2'],
+        'email': ['a@x.org', 'a@x.org', 'b@x.org', ' ']
+    })
+
+    assert violations({'id': 'r', 'type': 'range', 'column': 'age', 'min': 0}, df) == {'r': [1]}
+    assert violations({'id': 'c', 'type': 'comparison', 'left': 'low', 'op': '<=', 'right': 'high'}, df) == {'c': [1]}
+    assert violations({'id': 'x', 'type': 'regex', 'column': 'code', 'pattern': '[A-Z]{2}[0-9]'}, df) == {'x': [1]}
+    assert violations({'id': 'n', 'type': 'not_null', 'column': 'email'}, df) == {'n': [3]}
+    assert violations({'id': 'u', 'type': 'unique', 'column': 'email'}, df) == {'u': [1]}
+
+
+def test_rules_on_missing_columns_are_skipped():
+    assert RuleSet([{'type': 'not_null', 'column': 'absent'}]).compile(['a']) == []
+
+
+def test_default_rules_match_keyword_columns_of_allowed_types():
+    compiled = RuleSet().compile(['unit price', 'name'], {'unit price': 'numeric', 'name': 'text'})
+
+    assert [rule.id for rule in compiled] == ['non_negative:unit price']
+    assert RuleSet().compile(['unit price'], {'unit price': 'text'}) == []
+
+
+def test_find_prefers_rule_id_and_falls_back_to_issue_type():
+    compiled = RuleSet([
+        {'id': 'a', 'type': 'not_null', 'column': 'x', 'issue_type': 'Required'},
+        {'id': 'b', 'type': 'not_null', 'column': 'y', 'issue_type': 'Required'}
+    ]).compile(['x', 'y'])
+
+    assert RuleSet.find(compiled, rule_id='b').columns == ['y']
+    assert RuleSet.find(compiled, issue_type='Required', column='x').id == 'a'
+    assert RuleSet.find(compiled, rule_id='missing') is None
+
+
+def test_custom_rule_issue_is_reported_by_analysis(write_csv):
+    path = write_csv('sku,qty\nA1,1\nbad,2\nB2,3\n')
+    rules = [{'id': 'user_1', 'type': 'regex', 'column': 'sku', 'pattern': '[A-Z][0-9]', 'name': 'SKU format'}]
+
+    issues = AnalysisService.analyze_csv(path, rules=rules)['issues']
+
+    issue = next(issue for issue in issues if issue.get('rule') == 'user_1')
+    assert issue['count'] == 1
+    assert issue['type'] == 'Business Rule Violation'
+
+
+def test_analysis_keeps_rules_it_was_produced_with():
+    analysis = Analysis()
+    assert analysis.get_rules(default='current') == 'current'
+
+    analysis.set_rules(None)
+    assert analysis.get_rules(default='current') is None
+
+    analysis.set_rules([{'id': 'user_1', 'type': 'not_null', 'column': 'a'}])
+    assert analysis.get_rules()[0]['id'] == 'user_1'
+
+
+def test_affected_rows_use_the_stored_rules(api_client, write_csv, monkeypatch):
+    path = write_csv('sku\nA1\nbad\nworse\n')
+    analysis = Analysis(id=5, user_id=1, file_path=path)
+    analysis.set_rules([{'id': 'user_1', 'type': 'regex', 'column': 'sku', 'pattern': '[A-Z][0-9]'}])
+
+    monkeypatch.setattr(Analysis, 'get_by_id', classmethod(lambda cls, *args, **kwargs: analysis))
+    # The user deleted the rule after the analysis ran
+    monkeypatch.setattr(Rule, 'rules_for_user', staticmethod(lambda user_id: None))
+
+    response = api_client(1).get('/api/analysis/5/affected-rows',
+                                 query_string={'issue_type': 'Business Rule Violation', 'rule': 'user_1'})
+
+    assert response.status_code == 200
+    assert response.get_json()['data']['total_count'] == 2
+
+
+def test_create_rule_rejects_issues_it_cannot_report(api_client, monkeypatch):
+    monkeypatch.setattr(Rule, 'save', lambda self: pytest.fail('invalid rule was stored'))
+
+    response = api_client(1).post('/api/rules', json={
+        'definition': {'type': 'not_null', 'column': 'a', 'issue': 'bogus'}
+    })
+
+    assert response.status_code == 400
+    assert 'bogus' in response.get_json()['message']
+
+
+def test_affected_rows_prefer_the_rule_over_a_builtin_check(write_csv):
+    path = write_csv('email\nok@example.com\nshort@x.io\nnot-an-email\n')
+    rules = [{'id': 'user_1', 'type': 'regex', 'column': 'email', 'pattern': '.{14,}', 'issue': 'invalid_email'}]
+
+    issue = next(issue for issue in AnalysisService.analyze_csv(path, rules=rules)['issues'] if issue.get('rule'))
+    rows = AnalysisService.get_affected_rows(path, issue['type'], 'email', rules=rules, rule_id=issue['rule'])
+
+    assert issue['type'] == 'Invalid Format'
+    assert rows['total_count'] == 2
+    assert [row['email'] for row in rows['rows']] == ['short@x.io', 'not-an-email']
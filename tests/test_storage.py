@@ -0,0 +1,102 @@
+import gzip
+import io
+import os
+import pytest
+from app.services.storage_service import StorageService, StorageLimitExceeded
+
+
+def test_compressed_write_records_original_size(tmp_path):
+    path = str(tmp_path / '1_a.csv')
+
+    written = StorageService.write(io.BytesIO(b'x' * 5000), path, codec='gzip')
+
+    assert written == 5000
+    assert StorageService.codec(path) == 'gzip'
+    assert os.path.exists(StorageService.size_path(path))
+    assert StorageService.size(path) == 5000
+
+
+def test_raw_write_needs_no_record(tmp_path):
+    path = str(tmp_path / '1_a.csv')
+
+    StorageService.write(io.BytesIO(b'abc'), path, codec=None)
+
+    assert not os.path.exists(StorageService.size_path(path))
+    assert StorageService.size(path) == 3
+
+
+def test_multi_member_gzip_is_measured_in_full(tmp_path):
+    path = tmp_path / '1_a.csv'
+    # Concatenated members: the ISIZE trailer only describes the last one
+    path.write_bytes(gzip.compress(b'a' * 3000) + gzip.compress(b'b' * 10))
+
+    assert StorageService.size(str(path)) == 3010
+    assert (tmp_path / '1_a.csv.size').read_text() == '3010'
+
+
+def test_recorded_size_wins_over_trailer(tmp_path):
+    path = tmp_path / '1_a.csv'
+    path.write_bytes(gzip.compress(b'a' * 10))
+    StorageService.record_size(str(path), 2 ** 32 + 10)
+
+    assert StorageService.size(str(path)) == 2 ** 32 + 10
+
+
+def test_limit_exceeded_leaves_nothing_behind(tmp_path):
+    path = str(tmp_path / '1_a.csv')
+
+    with pytest.raises(StorageLimitExceeded):
+        StorageService.write(io.BytesIO(b'x' * 100), path, codec='gzip', limit=10)
+
+    assert os.listdir(tmp_path) == []
+
+
+def test_compress_file_keeps_size_record(tmp_path):
+    path = tmp_path / '1_a.csv'
+    path.write_bytes(b'y' * 777)
+
+    assert StorageService.compress_file(str(path)) is True
+    assert StorageService.codec(str(path)) == 'gzip'
+    assert sorted(os.listdir(tmp_path)) == ['1_a.csv', '1_a.csv.size']
+    assert StorageService.size(str(path)) == 777
+
+
+def test_size_record_is_grouped_with_its_upload(tmp_path):
+    path = str(tmp_path / '1_a.csv')
+    StorageService.write(io.BytesIO(b'x' * 100), path, codec='gzip')
+
+    groups = StorageService.upload_groups(str(tmp_path))
+
+    assert list(groups) == [path]
+    assert sorted(groups[path][3]) == [path, StorageService.size_path(path)]
+
+
+def upload_group(owner, mtime, size):
+    return owner, mtime, size, []
+
+
+def test_select_expired_drops_old_uploads_then_oldest_over_quota():
+    groups = {
+        'old': upload_group(1, 0, 10),
+        'a': upload_group(1, 900, 60),
+        'b': upload_group(1, 950, 60),
+        'c': upload_group(2, 900, 60),
+        'anonymous': upload_group(None, 900, 500)
+    }
+
+    expired = StorageService.select_expired(groups, max_age_seconds=500, quota_bytes=100, now=1000)
+
+    assert expired == ['a', 'old']
+
+
+def test_enforce_retention_removes_uploads_with_sidecars(tmp_path):
+    old = tmp_path / '1_old.csv'
+    StorageService.write(io.BytesIO(b'x' * 100), str(old), codec='gzip')
+    (tmp_path / '1_old.csv.state.npz').write_bytes(b'state')
+    fresh = tmp_path / '1_new.csv'
+    fresh.write_bytes(b'a\n1\n')
+    for path in (old, tmp_path / '1_old.csv.state.npz', tmp_path / '1_old.csv.size'):
+        os.utime(path, (0, 0))
+
+    assert StorageService.enforce_retention(str(tmp_path), max_age_seconds=3600) == 1
+    assert os.listdir(tmp_path) == ['1_new.csv']
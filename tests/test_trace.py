@@ -0,0 +1,121 @@
+import json
+import pytest
+from app.services.trace_service import TraceService
+
+TRACE_SETTINGS = ('ENABLED', 'SAMPLE_RATE', 'EXPORTER', 'EXPORT_PATH', 'SLOW_SECONDS', 'SLOW_LOG_PATH', 'MAX_SPANS')
+
+
+@pytest.fixture
+def tracing(tmp_path):
+    """Tracing with file export of every trace to tmp_path; settings restored afterwards"""
+    saved = {name: getattr(TraceService, name) for name in TRACE_SETTINGS}
+    TraceService.ENABLED = True
+    TraceService.SAMPLE_RATE = 1.0
+    TraceService.EXPORTER = 'file'
+    TraceService.EXPORT_PATH = str(tmp_path / 'traces.ndjson')
+    TraceService.SLOW_SECONDS = 60
+    TraceService.SLOW_LOG_PATH = str(tmp_path / 'slow.log')
+    yield tmp_path
+    for name, value in saved.items():
+        setattr(TraceService, name, value)
+
+
+def exported(tmp_path):
+    with open(tmp_path / 'traces.ndjson') as handle:
+        return [json.loads(line) for line in handle]
+
+
+def test_parse_traceparent():
+    header = '00-0af7651916cd43dd8448eb211c80319c-b7ad6b7169203331-01'
+
+    assert TraceService.parse_traceparent(header) == {
+        'traceId': '0af7651916cd43dd8448eb211c80319c', 'spanId': 'b7ad6b7169203331', 'sampled': True
+    }
+    assert TraceService.parse_traceparent(header[:-1] + '0')['sampled'] is False
+    for bad in (None, '', '00-xyz-b7ad6b7169203331-01', '00-0af7651916cd43dd8448eb211c80319c-b7ad6b71692033zz-01'):
+        assert TraceService.parse_traceparent(bad) is None
+
+
+def test_spans_nest_under_the_current_span(tracing):
+    with TraceService.trace('job') as root:
+        with TraceService.span('parse', rows=3):
+            with TraceService.span('sniff'):
+                pass
+        with TraceService.span('detect'):
+            pass
+
+    spans = {span['name']: span for span in exported(tracing)[0]['spans']}
+    assert spans['parse']['parentId'] == root.span_id
+    assert spans['sniff']['parentId'] == spans['parse']['spanId']
+    assert spans['detect']['parentId'] == root.span_id
+    assert spans['parse']['attributes'] == {'rows': 3}
+    assert TraceService.context() is None
+
+
+def test_span_outside_a_trace_is_a_no_op():
+    with TraceService.span('orphan') as span:
+        assert span is None
+
+
+def test_errors_are_recorded_and_raised(tracing):
+    with pytest.raises(ValueError):
+        with TraceService.trace('job'):
+            with TraceService.span('step'):
+                raise ValueError('boom')
+
+    spans = {span['name']: span for span in exported(tracing)[0]['spans']}
+    assert spans['step']['error'] == 'ValueError: boom'
+    assert spans['job']['error'] == 'ValueError: boom'
+
+
+def test_remote_spans_are_grafted_into_the_callers_trace(tracing):
+    with TraceService.trace('request') as root:
+        context = TraceService.context()
+        with TraceService.remote(context, 'worker') as spans:
+            with TraceService.span('analyze'):
+                pass
+        TraceService.adopt(spans)
+
+    record = exported(tracing)
+    assert len(record) == 1
+    by_name = {span['name']: span for span in record[0]['spans']}
+    assert by_name['worker']['parentId'] == root.span_id
+    assert by_name['analyze']['parentId'] == by_name['worker']['spanId']
+
+
+def test_span_limit_counts_dropped_spans(tracing):
+    TraceService.MAX_SPANS = 3
+
+    with TraceService.trace('job'):
+        for _ in range(5):
+            with TraceService.span('step'):
+                pass
+
+    record = exported(tracing)[0]
+    assert len(record['spans']) == 3
+    assert record['droppedSpans'] == 3
+
+
+def test_unsampled_slow_trace_is_logged_with_its_tree(tracing):
+    TraceService.SAMPLE_RATE = 0.0
+    TraceService.SLOW_SECONDS = 0
+
+    with TraceService.trace('GET /api/x'):
+        with TraceService.span('query', table='analyses'):
+            pass
+
+    log = (tracing / 'slow.log').read_text()
+    assert 'GET /api/x' in log
+    assert '  query ' in log and '[table=analyses]' in log
+
+
+def test_propagated_context_keeps_trace_id(tracing):
+    parent = TraceService.parse_traceparent('00-0af7651916cd43dd8448eb211c80319c-b7ad6b7169203331-00')
+    TraceService.SAMPLE_RATE = 1.0
+
+    with TraceService.trace('joined', parent=parent) as root:
+        assert root.trace.trace_id == parent['traceId']
+        assert root.parent_id == parent['spanId']
+
+    # The caller decided not to sample, and the trace was not slow
+    assert not (tracing / 'traces.ndjson').exists()
@@ -0,0 +1,42 @@
+import pandas as pd
+from app.services.analysis_service import AnalysisService
+
+
+def test_text_types_and_confidence():
+    emails = AnalysisService.infer_type_details(pd.Series(['a@x.io'] * 9 + ['nope']))
+    dates = AnalysisService.infer_type_details(pd.Series(['2024-01-02', '2024-03-04']))
+
+    assert emails['type'] == 'email'
+    assert emails['mixedTypeRatio'] == 0.1
+    assert 0 < emails['typeConfidence'] < 0.9
+    assert emails['typeSampleSize'] == 10
+    assert (dates['type'], dates['dateFormat'], dates['mixedTypeRatio']) == ('date', '%Y-%m-%d', 0.0)
+
+
+def test_typed_columns_skip_text_inference():
+    assert AnalysisService.infer_type_details(pd.Series([1.5, 2.0]))['type'] == 'numeric'
+    assert AnalysisService.infer_type_details(pd.to_datetime(pd.Series(['2024-01-02'])))['type'] == 'date'
+    assert AnalysisService.infer_type_details(pd.Series([], dtype=object))['type'] == 'unknown'
+
+
+def test_type_sample_spans_the_whole_frame():
+    df = pd.DataFrame({'value': range(100000)})
+
+    sample = AnalysisService.type_sample(df)
+
+    assert len(sample) == AnalysisService.TYPE_SAMPLE_ROWS
+    assert sample.index.min() < 5000 and sample.index.max() > 95000
+    assert sample.index.equals(AnalysisService.type_sample(df).index)
+
+
+def test_late_type_change_is_seen_by_the_sample(write_csv):
+    # A head-only sample would call this column numeric
+    lines = ['code'] + [str(i) for i in range(3000)] + [f'user{i}@example.com' for i in range(3000)]
+    path = write_csv('\n'.join(lines) + '\n')
+
+    column = AnalysisService.analyze_csv(path)['columns'][0]
+    from_file = AnalysisService.infer_types_from_file(path)['code']
+
+    assert column['mixedTypeRatio'] > 0.3
+    assert from_file['mixedTypeRatio'] > 0.3
+    assert column['type'] == from_file['type']
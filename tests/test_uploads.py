@@ -0,0 +1,73 @@
+import gzip
+import io
+import os
+import zipfile
+import pytest
+from werkzeug.datastructures import FileStorage
+from app.services import storage_service
+from app.services.file_service import FileService
+from app.services.storage_service import StorageService, StorageLimitExceeded
+
+
+def upload(data, filename):
+    return FileStorage(stream=io.BytesIO(data), filename=filename)
+
+
+def bomb(size):
+    """A gzip member far smaller than what it decompresses to"""
+    return gzip.compress(b'a,b\n' + b'0' * size)
+
+
+def test_zst_upload_is_rejected_without_zstandard(app, monkeypatch):
+    monkeypatch.setattr(storage_service, 'zstandard', None)
+
+    result = FileService.validate_file(upload(b'\x28\xb5\x2f\xfd', 'data.csv.zst'), app.config)
+
+    assert result['valid'] is False
+    assert 'zstd' in result['message']
+    assert FileService.validate_file(upload(gzip.compress(b'a\n1\n'), 'data.csv.gz'), app.config)['valid']
+
+
+def test_gzip_bomb_is_rejected_once_decompressed(app):
+    data = bomb(10000)
+    file = upload(data, 'data.csv.gz')
+    folder = app.config['UPLOAD_FOLDER']
+
+    assert FileService.validate_file(file, dict(app.config, MAX_FILE_SIZE=5000))['valid']
+    with pytest.raises(StorageLimitExceeded):
+        FileService.save_file(file, folder, 1, limit=5000)
+
+    assert os.listdir(folder) == []
+
+
+def test_compressed_upload_within_limit_records_its_size(app):
+    info = FileService.save_file(upload(bomb(100), 'data.csv.gz'), app.config['UPLOAD_FOLDER'], 1, limit=5000)
+
+    assert info['file_size'] == 104
+    assert StorageService.size(info['file_path']) == 104
+
+
+def test_archive_skips_compressed_bombs(app):
+    archive = io.BytesIO()
+    with zipfile.ZipFile(archive, 'w') as writer:
+        writer.writestr('big.csv.gz', bomb(10000))
+        writer.writestr('small.csv.gz', bomb(10))
+    archive.seek(0)
+    config = dict(app.config, MAX_FILE_SIZE=5000)
+
+    saved, skipped = FileService.extract_archive(archive, app.config['UPLOAD_FOLDER'], 1, config)
+
+    assert [info['filename'] for info in saved] == ['small.csv.gz']
+    assert skipped == ['big.csv.gz']
+    assert sorted(os.listdir(app.config['UPLOAD_FOLDER'])) == sorted(
+        [saved[0]['file_id'], saved[0]['file_id'] + '.size'])
+
+
+def test_upload_route_reports_decompressed_limit(app, api_client):
+    app.config['MAX_FILE_SIZE'] = 5000
+
+    response = api_client(1).post('/api/upload', data={'file': (io.BytesIO(bomb(10000)), 'data.csv.gz')},
+                                  content_type='multipart/form-data')
+
+    assert response.status_code == 400
+    assert 'decompressed' in response.get_json()['message']
@@ -0,0 +1,61 @@
+from datetime import datetime
+from app.models.user import User, UserCache
+
+
+def test_cache_expires_entries_after_ttl(monkeypatch):
+    clock = [100.0]
+    monkeypatch.setattr('app.models.user.time.monotonic', lambda: clock[0])
+    cache = UserCache()
+    cache.put(User(id=1), max_size=10)
+
+    assert cache.get(1, ttl=60).id == 1
+    clock[0] += 61
+    assert cache.get(1, ttl=60) is None
+
+
+def test_cache_evicts_least_recently_used():
+    cache = UserCache()
+    for user_id in (1, 2):
+        cache.put(User(id=user_id), max_size=2)
+    cache.get(1, ttl=60)
+    cache.put(User(id=3), max_size=2)
+
+    assert cache.get(2, ttl=60) is None
+    assert cache.get(1, ttl=60) is not None and cache.get(3, ttl=60) is not None
+
+
+def test_get_cached_queries_the_database_once(app, monkeypatch):
+    calls = []
+    monkeypatch.setattr(User, 'get_by_id', classmethod(lambda cls, user_id: calls.append(user_id) or cls(id=user_id)))
+    monkeypatch.setattr(User, 'cache', UserCache())
+
+    with app.app_context():
+        User.get_cached(7)
+        User.get_cached(7)
+        User.cache.invalidate(7)
+        User.get_cached(7)
+
+    assert calls == [7, 7]
+
+
+def test_get_cached_bypasses_cache_when_disabled(app, monkeypatch):
+    calls = []
+    monkeypatch.setattr(User, 'get_by_id', classmethod(lambda cls, user_id: calls.append(user_id) or cls(id=user_id)))
+    app.config['USER_CACHE_TTL'] = 0
+
+    with app.app_context():
+        User.get_cached(7)
+        User.get_cached(7)
+
+    assert calls == [7, 7]
+
+
+def test_claims_round_trip_without_password_hash():
+    user = User(id=3, username='ana', email='ana@example.org', password_hash='secret',
+                created_at=datetime(2024, 5, 1, 12, 30))
+
+    restored = User.from_claims(user.to_claims())
+
+    assert (restored.id, restored.username, restored.email, restored.created_at) == \
+        (3, 'ana', 'ana@example.org', datetime(2024, 5, 1, 12, 30))
+    assert restored.password_hash is None